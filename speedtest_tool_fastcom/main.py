@@ -1,19 +1,33 @@
 from __future__ import annotations
 
 import os
+import sys
 from argparse import ArgumentParser, Namespace
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 
-from speedtest_tool_fastcom.module import logmng, recorder, reporter, speedtest, utility
+from speedtest_tool_fastcom.module import logmng, storage, utility
+from speedtest_tool_fastcom.module.result import (
+    FailureRecord,
+    PhaseTimings,
+    SpeedtestResult,
+)
 
+# サブコマンド、先頭に無い場合は measure とする
+# 各サブコマンドで使うモジュールはそのサブコマンドでのみ読み込み、計測だけの起動では
+# bokeh, NumPy, pyppeteer（ブラウザ起動まで）を読み込まない
+COMMANDS: tuple[str, ...] = ("measure", "report", "upload")
 
-def get_option() -> Namespace:
-    """オプション引数
+# サブコマンドを省略した場合に report とみなすオプション（期間レポートの旧指定方法）
+LEGACY_REPORT_OPTIONS: tuple[str, ...] = ("-R", "--range_from")
 
-    :return: オプション引数の名前空間
-    :rtype: Namespace
+
+def add_common_options(argparser: ArgumentParser) -> None:
+    """全てのサブコマンドに共通のオプション引数を追加する
+
+    Args:
+        argparser (ArgumentParser): 追加先
     """
-    argparser = ArgumentParser()
+
     argparser.add_argument(
         "-u",
         "--upload_path",
@@ -28,6 +42,50 @@ def get_option() -> Namespace:
         default="",
         help="collecting data save to path",
     )
+    argparser.add_argument(
+        "--trace_disable",
+        type=str,
+        default="",
+        help="comma separated function names whose calls are not logged",
+    )
+    argparser.add_argument(
+        "--trace_sample_every",
+        type=int,
+        default=1,
+        help="log one of every this many calls of each function",
+    )
+    argparser.add_argument(
+        "--log_async",
+        action="store_true",
+        help="write logs from a background thread through a bounded queue",
+    )
+    argparser.add_argument(
+        "--log_json",
+        action="store_true",
+        help="write logs as json lines",
+    )
+    argparser.add_argument(
+        "--log_queue_size",
+        type=int,
+        default=logmng.DEFAULT_QUEUE_SIZE,
+        help="number of log records the queue can hold with --log_async",
+    )
+    argparser.add_argument(
+        "--log_block",
+        action="store_true",
+        help="wait for the queue instead of dropping logs when it is full",
+    )
+
+
+def add_storage_options(argparser: ArgumentParser) -> None:
+    """計測結果の保存先を開くサブコマンドのオプション引数を追加する
+
+    Args:
+        argparser (ArgumentParser): 追加先
+    """
+
+    from speedtest_tool_fastcom.module import staticreport
+
     argparser.add_argument(
         "-c",
         "--convert_byte",
@@ -35,46 +93,744 @@ def get_option() -> Namespace:
         default=False,
         help="convert MBit/s to MByte/s",
     )
-    return argparser.parse_args()
+    argparser.add_argument(
+        "-f",
+        "--storage",
+        type=str,
+        choices=storage.STORAGE_KINDS,
+        default="csv",
+        help="storage format of collected data",
+    )
+    argparser.add_argument(
+        "--report_format",
+        type=str,
+        choices=staticreport.REPORT_FORMATS,
+        default="bokeh",
+        help="daily report as a bokeh html"
+        " or as data files for the shared static viewer",
+    )
 
 
-def main() -> None:
+def add_measure_options(argparser: ArgumentParser) -> None:
+    """measure サブコマンドのオプション引数を追加する
+
+    Args:
+        argparser (ArgumentParser): 追加先
     """
-    プログラムの実行起点となり処理フローを制御する。
+
+    from speedtest_tool_fastcom.module import (
+        adaptive,
+        browserpool,
+        datacap,
+        httpengine,
+        scheduler,
+        speedtest,
+        watchdog,
+    )
+
+    add_storage_options(argparser)
+    argparser.add_argument(
+        "-t",
+        "--timeout",
+        type=float,
+        default=speedtest.DEFAULT_TIMEOUT,
+        help="timeout seconds of one measurement attempt as a whole, 0 for no limit",
+    )
+    argparser.add_argument(
+        "--launch_timeout",
+        type=float,
+        default=watchdog.DEFAULT_LAUNCH_TIMEOUT,
+        help="timeout seconds to launch the browser, 0 for no limit",
+    )
+    argparser.add_argument(
+        "--navigation_timeout",
+        type=float,
+        default=watchdog.DEFAULT_NAVIGATION_TIMEOUT,
+        help="timeout seconds to open fast.com (to get test urls with --engine http)",
+    )
+    argparser.add_argument(
+        "--download_timeout",
+        type=float,
+        default=watchdog.DEFAULT_DOWNLOAD_TIMEOUT,
+        help="timeout seconds of the download phase, 0 for no limit",
+    )
+    argparser.add_argument(
+        "--upload_timeout",
+        type=float,
+        default=watchdog.DEFAULT_UPLOAD_TIMEOUT,
+        help="timeout seconds of the upload phase, 0 for no limit",
+    )
+    argparser.add_argument(
+        "--retries",
+        type=int,
+        default=watchdog.DEFAULT_RETRIES,
+        help="times to retry a failed measurement",
+    )
+    argparser.add_argument(
+        "--retry_backoff",
+        type=float,
+        default=watchdog.DEFAULT_RETRY_BACKOFF,
+        help="seconds to wait before the first retry, doubled on each retry",
+    )
+    argparser.add_argument(
+        "-p",
+        "--proxy",
+        type=str,
+        default=speedtest.DEFAULT_PROXY,
+        help="proxy server used for measurement, empty to connect directly",
+    )
+    argparser.add_argument(
+        "-T",
+        "--targets",
+        type=str,
+        default="",
+        help="json file listing measurement targets (label, proxy, interval)",
+    )
+    argparser.add_argument(
+        "-C",
+        "--concurrency",
+        type=int,
+        default=scheduler.DEFAULT_CONCURRENCY,
+        help="number of targets measured at the same time",
+    )
+    argparser.add_argument(
+        "-e",
+        "--engine",
+        type=str,
+        choices=httpengine.ENGINES,
+        default="browser",
+        help="measure in a headless browser or with plain http requests",
+    )
+    argparser.add_argument(
+        "--allow_url",
+        type=str,
+        action="append",
+        default=[],
+        help="url pattern the page may load, repeatable (all urls by default)",
+    )
+    argparser.add_argument(
+        "--block_url",
+        type=str,
+        action="append",
+        default=[],
+        help="url pattern the page must not load, repeatable",
+    )
+    argparser.add_argument(
+        "--no_js_cache",
+        action="store_true",
+        help="always fetch the fast.com script bundle instead of caching it on disk",
+    )
+    argparser.add_argument(
+        "-D",
+        "--daemon",
+        action="store_true",
+        help="keep the browser running and measure repeatedly",
+    )
+    argparser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=scheduler.DEFAULT_INTERVAL,
+        help="measurement interval seconds in daemon mode without targets file",
+    )
+    argparser.add_argument(
+        "-r",
+        "--recycle_after",
+        type=int,
+        default=browserpool.DEFAULT_RECYCLE_AFTER,
+        help="restart the browser after this many measurements in daemon mode",
+    )
+    argparser.add_argument(
+        "-A",
+        "--adaptive",
+        action="store_true",
+        help="in daemon mode, measure more often when results deviate"
+        " and less often when stable",
+    )
+    argparser.add_argument(
+        "--min_interval",
+        type=float,
+        default=adaptive.DEFAULT_MIN_INTERVAL,
+        help="shortest measurement interval seconds with --adaptive",
+    )
+    argparser.add_argument(
+        "--max_interval",
+        type=float,
+        default=adaptive.DEFAULT_MAX_INTERVAL,
+        help="longest measurement interval seconds with --adaptive",
+    )
+    argparser.add_argument(
+        "-Q",
+        "--quick",
+        action="store_true",
+        help="stop measuring once throughput is stable within --tolerance",
+    )
+    argparser.add_argument(
+        "--tolerance",
+        type=float,
+        default=datacap.DEFAULT_TOLERANCE,
+        help="relative spread of recent throughput regarded as stable with --quick",
+    )
+    argparser.add_argument(
+        "--max_test_mb",
+        type=float,
+        default=0,
+        help="megabytes one measurement may transfer, 0 for no limit",
+    )
+    argparser.add_argument(
+        "--daily_budget_mb",
+        type=float,
+        default=0,
+        help="megabytes all targets may transfer per day across runs, 0 for no limit",
+    )
+    argparser.add_argument(
+        "--no_report",
+        action="store_true",
+        help="do not make and upload yesterday's report after measuring",
+    )
+    argparser.add_argument(
+        "-M",
+        "--metrics_port",
+        type=int,
+        default=0,
+        help="serve latest results in OpenMetrics format on this local port",
+    )
+
+
+def add_report_options(argparser: ArgumentParser) -> None:
+    """report サブコマンドのオプション引数を追加する
+
+    Args:
+        argparser (ArgumentParser): 追加先
     """
 
-    args: Namespace = get_option()
+    from speedtest_tool_fastcom.module import downsample, reporter
 
-    logmng.set_logger(
-        os.path.abspath("{0}/log/speedtest_fastcom.log".format(args.save_path))
+    add_storage_options(argparser)
+    argparser.add_argument(
+        "-d",
+        "--date",
+        type=date.fromisoformat,
+        default=None,
+        help="date (yyyy-MM-dd) of the daily report, yesterday by default",
+    )
+    argparser.add_argument(
+        "--force",
+        action="store_true",
+        help="remake the daily report even if it already exists",
+    )
+    argparser.add_argument(
+        "-R",
+        "--range_from",
+        type=date.fromisoformat,
+        default=None,
+        help="make a downsampled report from this date (yyyy-MM-dd)"
+        " instead of a daily report",
+    )
+    argparser.add_argument(
+        "--range_to",
+        type=date.fromisoformat,
+        default=None,
+        help="last date (yyyy-MM-dd) of the range report, yesterday by default",
+    )
+    argparser.add_argument(
+        "--points",
+        type=int,
+        default=reporter.PLOT_WIDTH,
+        help="maximum number of points per series in the range report",
+    )
+    argparser.add_argument(
+        "--downsample",
+        type=str,
+        choices=downsample.DOWNSAMPLE_METHODS,
+        default="minmax",
+        help="downsampling method of the range report",
+    )
+    argparser.add_argument(
+        "-S",
+        "--summary",
+        action="store_true",
+        help="make the range report from hourly and daily rollups instead of raw data",
     )
 
-    logmng.logger.info("Start Program")
 
-    # オプション設定
-    record_dir_path: str = "{0}/dest".format(args.save_path)
-    record_dir_path = os.path.abspath(record_dir_path)
+def add_upload_options(argparser: ArgumentParser) -> None:
+    """upload サブコマンドのオプション引数を追加する
+
+    Args:
+        argparser (ArgumentParser): 追加先
+    """
+
+    argparser.add_argument(
+        "-d",
+        "--date",
+        type=date.fromisoformat,
+        default=None,
+        help="first date (yyyy-MM-dd) of the files to upload, yesterday by default",
+    )
+    argparser.add_argument(
+        "--range_to",
+        type=date.fromisoformat,
+        default=None,
+        help="last date (yyyy-MM-dd) of the files to upload, same as --date by default",
+    )
+
+
+def get_command(argv: list[str]) -> tuple[str, list[str]]:
+    """コマンドライン引数からサブコマンドを判別する
+
+    サブコマンドを省略した場合は従来通りの指定とみなし、期間レポートの指定が有れば report、
+    無ければ measure とする。
+
+    Args:
+        argv (list[str]): プログラム名を除いたコマンドライン引数
+
+    Returns:
+        tuple[str, list[str]]: サブコマンドとサブコマンドを除いたコマンドライン引数
+    """
+
+    if argv and argv[0] in COMMANDS:
+        return argv[0], argv[1:]
+
+    is_legacy_report: bool = any(
+        arg in LEGACY_REPORT_OPTIONS or arg.startswith("--range_from=") for arg in argv
+    )
+
+    return ("report" if is_legacy_report else "measure"), argv
+
+
+def get_option(argv: list[str] | None = None) -> Namespace:
+    """オプション引数
+
+    指定されたサブコマンドのオプション引数のみを組み立てる為、
+    他のサブコマンドで使うモジュールは読み込まない。
+
+    :param argv: プログラム名を除いたコマンドライン引数、None の場合は sys.argv
+    :type argv: list[str] | None
+    :return: オプション引数の名前空間（サブコマンドは command）
+    :rtype: Namespace
+    """
+    command, options = get_command(sys.argv[1:] if argv is None else argv)
+
+    argparser = ArgumentParser(
+        prog=f"python -m speedtest_tool_fastcom.main {command}",
+        description="commands: measure (default), report, upload",
+    )
+    add_common_options(argparser)
+
+    if command == "measure":
+        add_measure_options(argparser)
+    elif command == "report":
+        add_report_options(argparser)
+    else:
+        add_upload_options(argparser)
+
+    args: Namespace = argparser.parse_args(options)
+    args.command = command
+
+    return args
+
+
+def upload_daily_report(
+    record_storage: storage.Storage,
+    upload_dir_path: str,
+    target_date: date,
+    convert_byte: bool,
+    report_format: str = "bokeh",
+    is_force: bool = False,
+) -> None:
+    """指定日付の計測レポートを作成してアップロードする
+
+    bokeh の計測レポートが作成済みの場合は、bokeh を読み込まずに終える。
+
+    Args:
+        record_storage (storage.Storage): 計測結果の保存先
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+        convert_byte (bool): byte にするフラグ
+        report_format (str): 日毎の計測レポートの形式（bokeh, static）
+        is_force (bool): 既にレポートが有っても作り直すフラグ
+    """
+
+    # レポートは csv から作成する為、csv 以外の保存形式では書き出す
+    if not os.path.exists(record_storage.get_csv_path(target_date)):
+        record_storage.export_csv(target_date, convert_byte)
+
+    if report_format == "static":
+        from speedtest_tool_fastcom.module import staticreport
+
+        staticreport.upload_report(
+            record_storage.record_dir_path, upload_dir_path, target_date, is_force
+        )
+        return
+
+    file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+    report_path: str = os.path.join(
+        record_storage.record_dir_path, file_name + "_fastcom.html"
+    )
+
+    if os.path.exists(report_path) and not is_force:
+        return
+
+    from speedtest_tool_fastcom.module import reporter
+
+    reporter.upload_report(
+        record_storage.record_dir_path, upload_dir_path, target_date, is_force
+    )
+
+
+def record_and_upload(
+    record_storage: storage.Storage,
+    upload_dir_path: str,
+    tested_network_data: SpeedtestResult,
+    convert_byte: bool,
+    report_format: str = "bokeh",
+    is_report: bool = True,
+) -> None:
+    """計測結果を保存し、前日のレポートをアップロードする
+
+    保存とレポート作成の所要時間は計測結果の timings に記録する。
+
+    Args:
+        record_storage (storage.Storage): 計測結果の保存先
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        tested_network_data (SpeedtestResult): ネットワーク速度計測データ
+        convert_byte (bool): byte にするフラグ
+        report_format (str): 日毎の計測レポートの形式（bokeh, static）
+        is_report (bool): 前日のレポートを作成してアップロードするフラグ
+    """
+
+    today: date = tested_network_data.tested_datetime.date()
+    yesterday: date = today - timedelta(days=1)
+
+    timings: PhaseTimings = tested_network_data.timings
+
+    # 保存
+    with timings.measure("csv_write"):
+        record_storage.write(tested_network_data)
+        record_storage.update_rollup(tested_network_data)
+
+    if not is_report:
+        return
+
+    with timings.measure("report_build"):
+        # レポートアップロード
+        upload_daily_report(
+            record_storage, upload_dir_path, yesterday, convert_byte, report_format
+        )
+
+
+def make_range_report(
+    record_storage: storage.Storage,
+    upload_dir_path: str,
+    start_date: date,
+    end_date: date,
+    points: int,
+    method: str,
+    convert_byte: bool,
+    is_summary: bool = False,
+) -> None:
+    """期間の計測結果を間引いたレポートを作成してアップロードする
+
+    is_summary の場合は計測結果を読まず、日別・時間別の集計から要約レポートを作成する。
+
+    Args:
+        record_storage (storage.Storage): 計測結果の保存先
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+        points (int): 列毎の間引き後の点数の上限
+        method (str): 間引き方法（minmax, lttb）
+        convert_byte (bool): byte にするフラグ
+        is_summary (bool): 集計から要約レポートを作成するフラグ
+    """
+
+    from speedtest_tool_fastcom.module import reporter
+
+    if is_summary:
+        reporter.upload_summary_report(
+            record_storage.record_dir_path,
+            upload_dir_path,
+            record_storage.load_rollups(start_date, end_date),
+            start_date,
+            end_date,
+            points,
+        )
+        return
+
+    # レポートは csv から作成する為、csv 以外の保存形式では期間内の無い日を書き出す
+    target_date: date = start_date
+    while target_date <= end_date:
+        if not os.path.exists(record_storage.get_csv_path(target_date)):
+            record_storage.export_csv(target_date, convert_byte)
+        target_date += timedelta(days=1)
+
+    reporter.upload_range_report(
+        record_storage.record_dir_path,
+        upload_dir_path,
+        start_date,
+        end_date,
+        points,
+        method,
+    )
+
+
+def run_measure(args: Namespace, record_dir_path: str) -> None:
+    """measure サブコマンド: ネットワーク速度を計測して記録する
+
+    Args:
+        args (Namespace): オプション引数
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+    """
+
+    from speedtest_tool_fastcom.module import watchdog
+
+    # 他のプロセスが計測中の場合は重ねて計測しない
+    run_lock = watchdog.RunLock(os.path.join(record_dir_path, watchdog.LOCK_FILE_NAME))
+
+    try:
+        run_lock.acquire()
+    except watchdog.AlreadyRunningError as e:
+        logmng.logger.warning(f"計測を見送ります。 >> {e}")
+        return
+
+    watchdog.exit_on_terminate()
+
+    try:
+        # 前回異常終了したプロセスが残したブラウザを終了してから計測する
+        watchdog.watch_browsers(
+            os.path.join(record_dir_path, watchdog.BROWSER_PIDS_FILE_NAME)
+        )
+        measure_targets(args, record_dir_path)
+    finally:
+        watchdog.kill_browsers()
+        run_lock.release()
+
+
+def measure_targets(args: Namespace, record_dir_path: str) -> None:
+    """計測対象を計測し、計測結果と失敗した計測を記録する
+
+    Args:
+        args (Namespace): オプション引数
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+    """
+
+    import asyncio
+
+    from speedtest_tool_fastcom.module import (
+        adaptive,
+        datacap,
+        interception,
+        metrics,
+        scheduler,
+        watchdog,
+    )
+
+    # 計測ページのリクエストの絞り込み
+    interception.set_request_filter(
+        tuple(args.allow_url),
+        tuple(args.block_url),
+        ""
+        if args.no_js_cache
+        else os.path.abspath("{0}/cache/js".format(args.save_path)),
+    )
 
     upload_dir_path: str = args.upload_path
 
     convert_byte: bool = args.convert_byte
 
-    today: date = date.today()
-    file_path: str = os.path.join(
-        record_dir_path, f"{today.strftime(utility.FORMAT_DATE_SHORT)}_fastcom.csv"
+    timeout: float = args.timeout
+
+    targets: list[scheduler.Target] = (
+        scheduler.load_targets(args.targets)
+        if args.targets
+        else [scheduler.Target("default", args.proxy, args.interval)]
+    )
+
+    record_storage: storage.Storage = storage.open_storage(
+        args.storage, record_dir_path, convert_byte
     )
+
+    # 1 日の転送量は上限が無くても記録し、計測毎の転送量の合計を残す
+    stop_rule = datacap.StopRule(args.quick, args.tolerance, args.max_test_mb)
+    ledger: datacap.BudgetLedger = datacap.open_ledger(
+        record_dir_path, args.daily_budget_mb, len(targets)
+    )
+    phase_timeouts = watchdog.PhaseTimeouts(
+        args.launch_timeout,
+        args.navigation_timeout,
+        args.download_timeout,
+        args.upload_timeout,
+    )
+    retry = watchdog.RetryPolicy(max(0, args.retries), args.retry_backoff)
+
+    def on_result(tested_network_data: SpeedtestResult) -> None:
+        record_and_upload(
+            record_storage,
+            upload_dir_path,
+            tested_network_data,
+            convert_byte,
+            args.report_format,
+            not args.no_report,
+        )
+
+    def on_failure(failure: FailureRecord) -> None:
+        # 計測結果の統計を歪めないよう、失敗は計測結果とは別のファイルに記録する
+        record_storage.write_failure(failure)
+
+    if args.metrics_port:
+        metrics.start_exporter(args.metrics_port)
+
+    if args.daemon:
+        # 常駐して計測を繰り返す
+        asyncio.get_event_loop().run_until_complete(
+            scheduler.run_daemon(
+                targets,
+                on_result,
+                convert_byte,
+                timeout,
+                args.recycle_after,
+                args.concurrency,
+                args.engine,
+                adaptive.AdaptiveConfig(
+                    args.min_interval, args.max_interval, args.daily_budget_mb
+                )
+                if args.adaptive
+                else None,
+                stop_rule,
+                ledger,
+                phase_timeouts,
+                retry,
+                on_failure,
+            )
+        )
+    else:
+        # ネットワーク速度計測
+        asyncio.get_event_loop().run_until_complete(
+            scheduler.run_targets_once(
+                targets,
+                on_result,
+                convert_byte,
+                timeout,
+                args.concurrency,
+                args.engine,
+                stop_rule,
+                ledger,
+                phase_timeouts,
+                retry,
+                on_failure,
+            )
+        )
+
+
+def run_report(args: Namespace, record_dir_path: str) -> None:
+    """report サブコマンド: 日毎又は期間のレポートを作成してアップロードする
+
+    Args:
+        args (Namespace): オプション引数
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+    """
+
     yesterday: date = date.today() - timedelta(days=1)
 
-    # ネットワーク速度計測
-    tested_network_data: tuple[datetime, float, float] = speedtest.run_speedtest(
-        convert_byte
+    record_storage: storage.Storage = storage.open_storage(
+        args.storage, record_dir_path, args.convert_byte
     )
 
-    # 保存
-    recorder.record_to_csv(file_path, tested_network_data, convert_byte)
+    if args.range_from is not None:
+        # 計測せずに期間レポートを作成する
+        make_range_report(
+            record_storage,
+            args.upload_path,
+            args.range_from,
+            args.range_to or yesterday,
+            args.points,
+            args.downsample,
+            args.convert_byte,
+            args.summary,
+        )
+    else:
+        upload_daily_report(
+            record_storage,
+            args.upload_path,
+            args.date or yesterday,
+            args.convert_byte,
+            args.report_format,
+            args.force,
+        )
+
+
+def run_upload(args: Namespace, record_dir_path: str) -> None:
+    """upload サブコマンド: 作成済みの日毎のファイルをレポートを作り直さずにアップロードする
+
+    Args:
+        args (Namespace): オプション引数
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+    """
+
+    from speedtest_tool_fastcom.module import staticreport, uploadsync
+
+    start_date: date = args.date or date.today() - timedelta(days=1)
+    end_date: date = args.range_to or start_date
+    file_paths: list[str] = []
+
+    target_date: date = start_date
+    while target_date <= end_date:
+        file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+        file_paths.extend(
+            os.path.join(record_dir_path, file_name + suffix)
+            for suffix in (
+                "_fastcom.csv",
+                "_fastcom_failures.csv",
+                "_fastcom.html",
+                staticreport.DATA_FILE_SUFFIX,
+            )
+        )
+        target_date += timedelta(days=1)
+
+    file_paths.append(os.path.join(record_dir_path, staticreport.VIEWER_FILE_NAME))
+
+    uploadsync.sync_files(
+        [file_path for file_path in file_paths if os.path.exists(file_path)],
+        args.upload_path,
+    )
+
+
+def main() -> None:
+    """
+    プログラムの実行起点となり処理フローを制御する。
+    """
+
+    args: Namespace = get_option()
+
+    logmng.set_logger(
+        os.path.abspath("{0}/log/speedtest_fastcom.log".format(args.save_path)),
+        args.log_async,
+        args.log_json,
+        args.log_queue_size,
+        args.log_block,
+    )
+
+    logmng.logger.info(f"Start Program ({args.command})")
+
+    # 呼び出し記録の設定
+    utility.set_tracing(sample_every=args.trace_sample_every)
+    for name in filter(None, args.trace_disable.split(",")):
+        utility.set_tracing(name.strip(), enabled=False)
+
+    # オプション設定
+    record_dir_path: str = "{0}/dest".format(args.save_path)
+    record_dir_path = os.path.abspath(record_dir_path)
+
+    if args.command == "measure":
+        run_measure(args, record_dir_path)
+    elif args.command == "report":
+        run_report(args, record_dir_path)
+    else:
+        run_upload(args, record_dir_path)
 
-    # レポートアップロード
-    reporter.upload_report(record_dir_path, upload_dir_path, yesterday)
+    # 使ったモジュールを読み込み終えてから、一致しない関数名を知らせる
+    utility.warn_unmatched_tracing()
 
     logmng.logger.info("End Program")
 
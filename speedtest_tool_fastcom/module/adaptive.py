@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from speedtest_tool_fastcom.module import logmng
+from speedtest_tool_fastcom.module.result import SpeedtestResult
+
+# 基準からの外れ具合を見る列
+WATCHED_COLUMNS: tuple[str, ...] = ("download_speed", "upload_speed", "latency")
+
+# 計測間隔の下限の既定値 [s]
+DEFAULT_MIN_INTERVAL: float = 300
+
+# 計測間隔の上限の既定値 [s]
+DEFAULT_MAX_INTERVAL: float = 3600
+
+# 指数移動平均の重みの既定値（大きいほど直近の計測を重視する）
+DEFAULT_ALPHA: float = 0.2
+
+# 基準から外れたとみなす標準偏差の倍数の既定値
+DEFAULT_THRESHOLD: float = 3.0
+
+# 安定している場合に計測間隔を延ばす倍率の既定値
+DEFAULT_BACKOFF: float = 1.5
+
+# 基準から外れたか判定を始めるまでの計測回数
+WARMUP_COUNT: int = 5
+
+# 標準偏差の下限の平均に対する割合、安定した回線での僅かな揺らぎを外れとみなさない
+MIN_RELATIVE_STD: float = 0.05
+
+
+@dataclass
+class AdaptiveConfig:
+    """計測間隔の調整の設定
+
+    Args:
+        min_interval (float): 計測間隔の下限 [s]
+        max_interval (float): 計測間隔の上限 [s]
+        daily_budget_mb (float): 1 日の転送量の上限 [MB]、0 の場合は制限しない
+        alpha (float): 指数移動平均の重み
+        threshold (float): 基準から外れたとみなす標準偏差の倍数
+        backoff (float): 安定している場合に計測間隔を延ばす倍率
+    """
+
+    min_interval: float = DEFAULT_MIN_INTERVAL
+    max_interval: float = DEFAULT_MAX_INTERVAL
+    daily_budget_mb: float = 0
+    alpha: float = DEFAULT_ALPHA
+    threshold: float = DEFAULT_THRESHOLD
+    backoff: float = DEFAULT_BACKOFF
+
+
+@dataclass
+class Ewma:
+    """指数移動平均と指数移動分散
+
+    Args:
+        alpha (float): 指数移動平均の重み
+        mean (float): 平均
+        variance (float): 分散
+        count (int): 加えた値の数
+    """
+
+    alpha: float
+    mean: float = 0.0
+    variance: float = 0.0
+    count: int = 0
+
+    def get_score(self, value: float) -> float:
+        """値が平均から標準偏差の何倍離れているかを取得する
+
+        Args:
+            value (float): 値
+
+        Returns:
+            float: 標準偏差の倍数、WARMUP_COUNT 回に満たない場合は 0
+        """
+
+        if self.count < WARMUP_COUNT:
+            return 0.0
+
+        std: float = self.get_std()
+
+        return abs(value - self.mean) / std if std > 0 else 0.0
+
+    def get_std(self) -> float:
+        """標準偏差を取得する
+
+        Returns:
+            float: 標準偏差、平均の MIN_RELATIVE_STD 倍を下限とする
+        """
+
+        return max(math.sqrt(self.variance), MIN_RELATIVE_STD * abs(self.mean))
+
+    def add(self, value: float, limit: float = math.inf) -> None:
+        """値を加えて平均と分散を更新する
+
+        WARMUP_COUNT 回以降は平均から標準偏差の limit 倍に収めて加える為、
+        外れた値が続いても 1 回で基準に取り込まれず、外れとみなし続ける。
+
+        Args:
+            value (float): 値
+            limit (float): 加える値を収める標準偏差の倍数
+        """
+
+        if self.count >= WARMUP_COUNT and not math.isinf(limit):
+            width: float = limit * self.get_std()
+            value = min(max(value, self.mean - width), self.mean + width)
+
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff: float = value - self.mean
+            increment: float = self.alpha * diff
+            self.mean += increment
+            self.variance = (1 - self.alpha) * (self.variance + diff * increment)
+
+        self.count += 1
+
+
+@dataclass
+class DataBudget:
+    """計測対象間で共有する 1 日の転送量の上限
+
+    Args:
+        daily_mb (float): 1 日の転送量の上限 [MB]、0 の場合は制限しない
+        users (int): 上限を分け合う計測対象の数
+        budget_date (date | None): used_mb を数えている日付
+        used_mb (float): budget_date に転送した量 [MB]
+    """
+
+    daily_mb: float = 0
+    users: int = 1
+    budget_date: date | None = None
+    used_mb: float = 0.0
+
+    def roll(self, now: datetime) -> None:
+        """日付が変わっていれば転送量を数え直す
+
+        Args:
+            now (datetime): 現在日時
+        """
+
+        if self.budget_date != now.date():
+            self.budget_date = now.date()
+            self.used_mb = 0.0
+
+    def add(self, transferred_mb: float, now: datetime) -> None:
+        """転送した量を加える
+
+        Args:
+            transferred_mb (float): 1 回の計測で転送した量 [MB]
+            now (datetime): 現在日時
+        """
+
+        self.roll(now)
+        self.used_mb += transferred_mb
+
+    def get_interval(self, mb_per_test: float, now: datetime) -> float:
+        """残りの転送量を日付が変わるまでに均等に使う計測間隔を取得する
+
+        Args:
+            mb_per_test (float): 1 回の計測の転送量 [MB]
+            now (datetime): 現在日時
+
+        Returns:
+            float: 計測間隔の下限 [s]、上限が無いか転送量が分からない場合は 0
+        """
+
+        self.roll(now)
+
+        if self.daily_mb <= 0 or mb_per_test <= 0:
+            return 0.0
+
+        midnight: datetime = datetime.combine(
+            now.date() + timedelta(days=1), datetime.min.time()
+        )
+        seconds_left: float = (midnight - now).total_seconds()
+        remaining_mb: float = self.daily_mb - self.used_mb
+
+        # 上限に達した日は日付が変わるまで計測しない
+        if remaining_mb < mb_per_test:
+            return seconds_left
+
+        return seconds_left * mb_per_test * max(1, self.users) / remaining_mb
+
+
+@dataclass
+class AdaptiveSchedule:
+    """計測結果の基準からの外れ具合と転送量の上限から計測対象の次の計測間隔を決める
+
+    直近の計測結果が基準（列毎の指数移動平均と分散）から threshold 倍以上外れるか、
+    計測に失敗した場合は計測間隔を下限に縮め、外れなければ backoff 倍ずつ上限まで延ばす。
+    転送量の上限が有る場合は、その日の残りの転送量を日付が変わるまでに
+    全ての計測対象で均等に使う計測間隔より短くしない。
+    転送した量は budget に加えない為、datacap.BudgetLedger 等で別途加える。
+
+    Args:
+        config (AdaptiveConfig): 計測間隔の調整の設定
+        budget (DataBudget): 計測対象間で共有する 1 日の転送量の上限
+        interval (float): 現在の計測間隔 [s]
+        baselines (dict[str, Ewma]): 列毎の基準
+        transfer (Ewma | None): 1 回の計測の転送量 [MB] の基準
+        score (float | None): 直近の計測結果の基準からの外れ具合、計測に失敗した場合は None
+    """
+
+    config: AdaptiveConfig
+    budget: DataBudget
+    interval: float = DEFAULT_MIN_INTERVAL
+    baselines: dict[str, Ewma] = field(default_factory=dict)
+    transfer: Ewma | None = None
+    score: float | None = None
+
+    def __post_init__(self) -> None:
+        self.interval = min(
+            max(self.interval, self.config.min_interval), self.config.max_interval
+        )
+
+        for name in WATCHED_COLUMNS:
+            self.baselines.setdefault(name, Ewma(self.config.alpha))
+
+        if self.transfer is None:
+            self.transfer = Ewma(self.config.alpha)
+
+    def get_score(self, tested_network_data: SpeedtestResult) -> float:
+        """計測結果の基準からの外れ具合を取得する
+
+        Args:
+            tested_network_data (SpeedtestResult): ネットワーク速度計測データ
+
+        Returns:
+            float: 列毎の標準偏差の倍数の最大値
+        """
+
+        return max(
+            baseline.get_score(getattr(tested_network_data, name))
+            for name, baseline in self.baselines.items()
+        )
+
+    def next_interval(
+        self, tested_network_data: SpeedtestResult | None, now: datetime
+    ) -> float:
+        """計測結果を加えて次の計測までの間隔を決める
+
+        Args:
+            tested_network_data (SpeedtestResult | None): ネットワーク速度計測データ、計測に失敗した場合は None
+            now (datetime): 現在日時
+
+        Returns:
+            float: 次の計測までの間隔 [s]
+        """
+
+        self.score = None
+
+        if tested_network_data is not None:
+            self.score = self.get_score(tested_network_data)
+
+            for name, baseline in self.baselines.items():
+                baseline.add(getattr(tested_network_data, name), self.config.threshold)
+
+            self.transfer.add(
+                tested_network_data.downloaded + tested_network_data.uploaded
+            )
+
+        if self.score is None or self.score >= self.config.threshold:
+            self.interval = self.config.min_interval
+        else:
+            self.interval = min(
+                self.interval * self.config.backoff, self.config.max_interval
+            )
+
+        return max(self.interval, self.budget.get_interval(self.transfer.mean, now))
+
+
+def make_schedules(
+    config: AdaptiveConfig,
+    intervals: list[float],
+    budget: DataBudget | None = None,
+) -> list[AdaptiveSchedule]:
+    """計測対象毎の計測間隔の調整を、転送量の上限を共有して作成する
+
+    Args:
+        config (AdaptiveConfig): 計測間隔の調整の設定
+        intervals (list[float]): 計測対象毎の最初の計測間隔 [s]
+        budget (DataBudget | None): 共有する転送量の上限、None の場合は config から作成する
+
+    Returns:
+        list[AdaptiveSchedule]: 計測対象毎の計測間隔の調整
+    """
+
+    if budget is None:
+        budget = DataBudget(config.daily_budget_mb, len(intervals))
+
+    return [AdaptiveSchedule(config, budget, interval) for interval in intervals]
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
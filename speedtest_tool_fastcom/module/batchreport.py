@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable
+
+from speedtest_tool_fastcom.module import (
+    logmng,
+    reporter,
+    staticreport,
+    uploadsync,
+    utility,
+)
+
+# 一括作成の記録ファイル名
+MANIFEST_FILE_NAME: str = "report_manifest.json"
+
+# 一括作成の記録ファイルを保存し、作成したレポートをまとめてアップロードする間隔（作成した件数）
+MANIFEST_SAVE_EVERY: int = 10
+
+
+@dataclass
+class ReportProgress:
+    """一括作成の進捗
+
+    Args:
+        done (int): 作成し終えた件数
+        total (int): 作成する件数
+        skipped (int): 元ファイルが変わっていない為に飛ばした件数
+        failed (int): 作成に失敗した件数
+        source_bytes (int): 作成し終えたレポートの元ファイルの合計 [byte]
+        elapsed (float): 経過時間 [s]
+    """
+
+    done: int = 0
+    total: int = 0
+    skipped: int = 0
+    failed: int = 0
+    source_bytes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def reports_per_second(self) -> float:
+        """1 秒当たりの作成件数"""
+
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """1 秒当たりに処理した元ファイルの大きさ [MB/s]"""
+
+        return self.source_bytes / 10**6 / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def get_manifest_path(record_dir_path: str) -> str:
+    """一括作成の記録ファイルパスを取得する
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+
+    Returns:
+        str: 一括作成の記録ファイルパス
+    """
+
+    return os.path.join(record_dir_path, MANIFEST_FILE_NAME)
+
+
+def load_manifest(file_path: str) -> dict[str, dict[str, Any]]:
+    """一括作成の記録を読み込む
+
+    Args:
+        file_path (str): 一括作成の記録ファイルパス
+
+    Returns:
+        dict[str, dict[str, Any]]: 元ファイル名毎の mtime_ns, size, sha256, version
+    """
+
+    if not os.path.exists(file_path):
+        return {}
+
+    with open(file_path, mode="r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(file_path: str, manifest: dict[str, dict[str, Any]]) -> None:
+    """一括作成の記録を一時ファイルに書いてから置き換えて保存する
+
+    Args:
+        file_path (str): 一括作成の記録ファイルパス
+        manifest (dict[str, dict[str, Any]]): 一括作成の記録
+    """
+
+    temp_path: str = f"{file_path}.{os.getpid()}.tmp"
+
+    with open(temp_path, mode="w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    os.replace(temp_path, file_path)
+
+
+def get_report_version(report_format: str) -> int:
+    """レポートの形式毎の作り方のバージョンを取得する
+
+    Args:
+        report_format (str): レポートの形式（bokeh, static）
+
+    Returns:
+        int: bokeh は reporter.REPORT_VERSION、static は staticreport.DATA_VERSION
+    """
+
+    if report_format == "static":
+        return staticreport.DATA_VERSION
+
+    return reporter.REPORT_VERSION
+
+
+def get_report_path(record_dir_path: str, target_date: date, report_format: str) -> str:
+    """レポートの形式毎の日毎の成果物のファイルパスを取得する
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+        report_format (str): レポートの形式（bokeh, static）
+
+    Returns:
+        str: bokeh は計測レポートファイル、static はデータファイルのパス
+    """
+
+    if report_format == "static":
+        return staticreport.get_data_path(record_dir_path, target_date)
+
+    file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+
+    return os.path.join(record_dir_path, file_name + "_fastcom.html")
+
+
+def is_unchanged(
+    file_path: str,
+    report_path: str,
+    entry: dict[str, Any] | None,
+    report_format: str = "bokeh",
+) -> tuple[bool, dict[str, Any] | None]:
+    """前回の作成から元ファイルとレポートの作り方が変わっていないか判定する
+
+    更新日時と大きさが同じなら読み込まずに変わっていないとみなし、
+    更新日時のみ変わった場合はハッシュで比べる。
+
+    Args:
+        file_path (str): 計測データ記録ファイルパス
+        report_path (str): 計測レポートファイルパス
+        entry (dict[str, Any] | None): 前回作成時の記録
+        report_format (str): レポートの形式（bokeh, static）
+
+    Returns:
+        tuple[bool, dict[str, Any] | None]: 変わっていないフラグと、更新日時のみ変わった場合の新しい記録
+    """
+
+    if (
+        entry is None
+        or entry.get("format", "bokeh") != report_format
+        or entry.get("version") != get_report_version(report_format)
+        or not os.path.exists(report_path)
+    ):
+        return False, None
+
+    stat: os.stat_result = os.stat(file_path)
+
+    if stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]:
+        return True, None
+
+    if (
+        stat.st_size != entry["size"]
+        or uploadsync.hash_file(file_path) != entry["sha256"]
+    ):
+        return False, None
+
+    return True, {**entry, "mtime_ns": stat.st_mtime_ns}
+
+
+def regenerate_report(
+    record_dir_path: str, target_date: date, report_format: str = "bokeh"
+) -> tuple[dict[str, Any], list[str]]:
+    """指定日付のレポートを作り直す（子プロセスで実行する）
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+        report_format (str): レポートの形式（bokeh, static）
+
+    Returns:
+        tuple[dict[str, Any], list[str]]: 作成に使った元ファイルの
+                                          mtime_ns, size, sha256, format, version と
+                                          アップロードするファイルパス
+    """
+
+    file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+    file_path: str = os.path.join(record_dir_path, file_name + "_fastcom.csv")
+
+    # 作成中に追記された場合は次回作り直されるよう、読み込む前の状態を記録する
+    stat: os.stat_result = os.stat(file_path)
+    sha256: str = uploadsync.hash_file(file_path)
+
+    if report_format == "static":
+        upload_paths: list[str] = staticreport.make_report(
+            record_dir_path, target_date, True
+        )
+    else:
+        upload_paths = reporter.make_report(record_dir_path, target_date, True)
+
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": sha256,
+        "format": report_format,
+        "version": get_report_version(report_format),
+    }, upload_paths
+
+
+@utility.recording
+def regenerate_reports(
+    record_dir_path: str,
+    upload_dir_path: str,
+    start_date: date,
+    end_date: date,
+    jobs: int,
+    is_force: bool = False,
+    on_progress: Callable[[ReportProgress], None] | None = None,
+    report_format: str = "bokeh",
+) -> ReportProgress:
+    """期間内の日毎の計測レポートを複数プロセスで並行に作り直してアップロードする
+
+    前回の作成から計測データ記録ファイルもレポートの作り方（REPORT_VERSION）も
+    変わっていない日は飛ばす（形式を変えた場合も作り直す）。作成したレポートは MANIFEST_SAVE_EVERY 件毎と最後に
+    まとめてアップロードしてから記録ファイルへ保存する為、中断しても
+    アップロード済みの日は次回飛ばされる。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+        jobs (int): 並行に作成するプロセス数
+        is_force (bool): 変わっていない日も作り直すフラグ
+        on_progress (Callable[[ReportProgress], None] | None): 1 件作成する毎に呼ぶ処理
+        report_format (str): レポートの形式（bokeh, static）
+
+    Returns:
+        ReportProgress: 最終的な進捗
+    """
+
+    manifest_path: str = get_manifest_path(record_dir_path)
+    manifest: dict[str, dict[str, Any]] = load_manifest(manifest_path)
+    progress = ReportProgress()
+    targets: list[tuple[date, str, int]] = []
+
+    for offset in range((end_date - start_date).days + 1):
+        target_date: date = start_date + timedelta(days=offset)
+        file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+        file_path: str = os.path.join(record_dir_path, file_name + "_fastcom.csv")
+        report_path: str = get_report_path(record_dir_path, target_date, report_format)
+
+        if not os.path.exists(file_path):
+            continue
+
+        key: str = os.path.basename(file_path)
+        is_same, entry = is_unchanged(
+            file_path, report_path, manifest.get(key), report_format
+        )
+
+        if is_same and not is_force:
+            progress.skipped += 1
+
+            if entry is not None:
+                manifest[key] = entry
+            continue
+
+        targets.append((target_date, key, os.path.getsize(file_path)))
+
+    progress.total = len(targets)
+    logmng.logger.info(
+        "%s 件のレポートを作成し、%s 件は変更が無い為飛ばします。",
+        progress.total,
+        progress.skipped,
+    )
+
+    pending_paths: list[str] = []
+    pending_manifest: dict[str, dict[str, Any]] = {}
+
+    def flush() -> None:
+        # アップロードし終えた日のみ記録し、中断時に未アップロードの日を飛ばさない
+        if pending_paths:
+            uploadsync.sync_files(pending_paths, upload_dir_path)
+        manifest.update(pending_manifest)
+        save_manifest(manifest_path, manifest)
+        pending_paths.clear()
+        pending_manifest.clear()
+
+    started: float = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures: dict[Future, tuple[date, str, int]] = {}
+
+            for target in targets:
+                future = executor.submit(
+                    regenerate_report, record_dir_path, target[0], report_format
+                )
+                futures[future] = target
+
+            for future in as_completed(futures):
+                day, key, size = futures[future]
+
+                try:
+                    pending_manifest[key], upload_paths = future.result()
+                    pending_paths.extend(upload_paths)
+                    progress.done += 1
+                    progress.source_bytes += size
+                except Exception:
+                    logmng.logger.exception(f"{day} のレポートの作成に失敗しました。")
+                    progress.failed += 1
+
+                progress.elapsed = time.perf_counter() - started
+
+                if (progress.done + progress.failed) % MANIFEST_SAVE_EVERY == 0:
+                    flush()
+
+                if on_progress is not None:
+                    on_progress(progress)
+    finally:
+        flush()
+
+    logmng.logger.info(
+        f"{progress.done} 件のレポートを {progress.elapsed:.1f} 秒で作成しました。"
+        f"（{progress.reports_per_second:.2f} 件/s, "
+        f"{progress.megabytes_per_second:.2f} MB/s, 失敗 {progress.failed} 件）"
+    )
+
+    return progress
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from speedtest_tool_fastcom.module import logmng, speedtest, watchdog
+
+if TYPE_CHECKING:
+    from pyppeteer.browser import Browser
+
+# ブラウザを再起動するまでの計測回数の既定値
+DEFAULT_RECYCLE_AFTER: int = 20
+
+
+class BrowserPool:
+    """計測用ブラウザを起動したまま保持して使い回す
+
+    指定回数計測した場合、又はブラウザが落ちた場合に再起動する。
+    同時に複数の計測で使われている間は、全て返却されるまで再起動を待つ。
+
+    Args:
+        proxy (str): ブラウザが使うプロキシ、空文字の場合は直接接続する
+        recycle_after (int): ブラウザを再起動するまでの計測回数
+        launch_timeout (float): ブラウザの起動を待つ時間 [s]
+    """
+
+    def __init__(
+        self,
+        proxy: str = speedtest.DEFAULT_PROXY,
+        recycle_after: int = DEFAULT_RECYCLE_AFTER,
+        launch_timeout: float = watchdog.DEFAULT_LAUNCH_TIMEOUT,
+    ) -> None:
+        self.proxy: str = proxy
+        self.recycle_after: int = recycle_after
+        self.launch_timeout: float = launch_timeout
+        self.launch_count: int = 0
+        self.last_launch_seconds: float = 0
+
+        self._browser: Browser | None = None
+        self._run_count: int = 0
+        self._in_use: int = 0
+        self._is_expired: bool = False
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> Browser:
+        """計測に使うブラウザを取得する
+
+        起動済みのブラウザが無ければ起動する。起動に掛かった時間は
+        last_launch_seconds に残し、起動済みを使い回した場合は 0 とする。
+
+        Returns:
+            Browser: 起動済みのブラウザ
+        """
+
+        async with self._lock:
+            if self._browser is not None and self._is_expired and self._in_use == 0:
+                await self.close()
+
+            if self._browser is None:
+                started: float = time.perf_counter()
+                browser: Browser = await speedtest.launch_browser(
+                    self.proxy, self.launch_timeout
+                )
+                browser.on("disconnected", lambda: self._on_disconnected(browser))
+                self._browser = browser
+                self.last_launch_seconds = time.perf_counter() - started
+                self.launch_count += 1
+                logmng.logger.info(f"ブラウザを起動しました。({self.last_launch_seconds:.2f} 秒)")
+            else:
+                self.last_launch_seconds = 0
+
+            self._in_use += 1
+
+            return self._browser
+
+    async def release(self, is_crashed: bool = False) -> None:
+        """計測に使ったブラウザを返却する
+
+        Args:
+            is_crashed (bool): 計測中にブラウザが異常終了したフラグ
+        """
+
+        self._in_use -= 1
+        self._run_count += 1
+
+        if is_crashed or self._run_count >= self.recycle_after:
+            self._is_expired = True
+
+        if self._is_expired and self._in_use == 0:
+            logmng.logger.info(f"{self._run_count} 回計測したブラウザを終了します。")
+            await self.close()
+
+    async def close(self) -> None:
+        """保持しているブラウザを終了し、残ったプロセスを強制終了する"""
+
+        browser: Browser | None = self._browser
+
+        self._browser = None
+        self._run_count = 0
+        self._is_expired = False
+
+        if browser is None:
+            return
+
+        # 既に落ちているブラウザの終了失敗は watchdog が記録し、次の起動に進む
+        await watchdog.close_browser(browser)
+
+    def _on_disconnected(self, browser: Browser) -> None:
+        # 終了済みの古いブラウザからの通知は無視する
+        if browser is self._browser:
+            logmng.logger.warning("ブラウザとの接続が切れた為、再起動します。")
+            self._is_expired = True
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from speedtest_tool_fastcom.module import logmng
+from speedtest_tool_fastcom.module.adaptive import DataBudget
+
+# 計測を跨いで 1 日の転送量を記録するファイル名
+BUDGET_FILE_NAME: str = "data_budget.json"
+
+# スループットが安定したとみなす、直近の区間毎のスループットの幅の平均に対する割合の既定値
+DEFAULT_TOLERANCE: float = 0.05
+
+# スループットを見る間隔 [s]
+SAMPLE_INTERVAL: float = 0.5
+
+# スループットを求める直近の区間の長さ [s]、短いと転送の粗密で安定しない
+ROLLING_WINDOW: float = 2.0
+
+# 安定したか判定する直近の区間の数
+STABLE_SAMPLES: int = 4
+
+# 安定したとみなすまでの最短の計測時間 [s]、接続直後の立ち上がりで止めない
+MIN_QUICK_DURATION: float = 3.0
+
+
+@dataclass(frozen=True)
+class StopRule:
+    """計測を途中で止める条件
+
+    Args:
+        is_quick (bool): スループットが安定したら止めるフラグ
+        tolerance (float): 安定したとみなす直近の区間毎のスループットの幅の平均に対する割合
+        max_test_mb (float): 1 回の計測の転送量の上限 [MB]、0 の場合は制限しない
+    """
+
+    is_quick: bool = False
+    tolerance: float = DEFAULT_TOLERANCE
+    max_test_mb: float = 0
+
+    def is_active(self) -> bool:
+        """途中で止める条件が有るか判定する
+
+        Returns:
+            bool: 安定したら止めるか、転送量の上限が有る場合は True
+        """
+
+        return self.is_quick or self.max_test_mb > 0
+
+    def limit(self, remaining_mb: float) -> StopRule:
+        """1 日の残りの転送量を超えないよう、1 回の計測の転送量の上限を絞る
+
+        Args:
+            remaining_mb (float): 1 日の残りの転送量 [MB]
+
+        Returns:
+            StopRule: 転送量の上限を残りの転送量以下にした条件
+        """
+
+        if math.isinf(remaining_mb):
+            return self
+
+        max_test_mb: float = (
+            remaining_mb
+            if self.max_test_mb <= 0
+            else min(self.max_test_mb, remaining_mb)
+        )
+
+        return StopRule(self.is_quick, self.tolerance, max_test_mb)
+
+
+class StabilityDetector:
+    """区間毎のスループットを受け取り、安定したか判定する
+
+    直近 STABLE_SAMPLES 区間のスループットの最大と最小の差が平均の tolerance 倍以内で、
+    計測を始めてから MIN_QUICK_DURATION 秒以上経っていれば安定したとみなす。
+
+    Args:
+        tolerance (float): 安定したとみなす幅の平均に対する割合
+    """
+
+    def __init__(self, tolerance: float) -> None:
+        self.tolerance: float = tolerance
+        self.speeds: list[float] = []
+        self.elapsed: float = 0.0
+
+    def add(self, speed: float, elapsed: float) -> None:
+        """1 区間のスループットを加える
+
+        Args:
+            speed (float): 区間のスループット
+            elapsed (float): 計測を始めてからの経過時間 [s]
+        """
+
+        self.speeds.append(speed)
+        self.elapsed = elapsed
+
+    def is_stable(self) -> bool:
+        """スループットが安定したか判定する
+
+        Returns:
+            bool: 安定した場合は True
+        """
+
+        if self.elapsed < MIN_QUICK_DURATION or len(self.speeds) < STABLE_SAMPLES:
+            return False
+
+        recent: list[float] = self.speeds[-STABLE_SAMPLES:]
+        mean: float = sum(recent) / len(recent)
+
+        return mean > 0 and max(recent) - min(recent) <= self.tolerance * mean
+
+    def get_speed(self) -> float:
+        """直近の区間のスループットの平均を取得する
+
+        Returns:
+            float: 直近 STABLE_SAMPLES 区間のスループットの平均
+        """
+
+        recent: list[float] = self.speeds[-STABLE_SAMPLES:]
+
+        return sum(recent) / len(recent) if recent else 0.0
+
+
+class BudgetLedger:
+    """1 日の転送量をファイルに記録し、計測（プロセス）を跨いで上限を守る
+
+    cron から 1 回ずつ起動する場合も常駐する場合も同じファイルを読み書きし、
+    加える度に読み直す為、他のプロセスが加えた転送量も数える。
+
+    Args:
+        file_path (str): 転送量の記録ファイルパス
+        budget (DataBudget): 1 日の転送量の上限と記録した転送量
+    """
+
+    def __init__(self, file_path: str, budget: DataBudget) -> None:
+        self.file_path: str = file_path
+        self.budget: DataBudget = budget
+
+    def load(self) -> None:
+        """記録ファイルから記録した日付と転送量を読み直す"""
+
+        if not os.path.exists(self.file_path):
+            return
+
+        try:
+            with open(self.file_path, mode="r", encoding="utf-8") as f:
+                stored: dict = json.load(f)
+
+            self.budget.budget_date = date.fromisoformat(stored["date"])
+            self.budget.used_mb = float(stored["used_mb"])
+        except (ValueError, KeyError, TypeError):
+            logmng.logger.warning(f"転送量の記録が読めない為、無視します。 >> {self.file_path}")
+
+    def save(self) -> None:
+        """記録した日付と転送量を一時ファイルに書いてから置き換えて保存する"""
+
+        if self.budget.budget_date is None:
+            return
+
+        temp_path: str = f"{self.file_path}.{os.getpid()}.tmp"
+
+        with open(temp_path, mode="w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "date": self.budget.budget_date.isoformat(),
+                    "used_mb": round(self.budget.used_mb, 3),
+                    "daily_mb": self.budget.daily_mb,
+                },
+                f,
+            )
+
+        os.replace(temp_path, self.file_path)
+
+    def get_remaining_mb(self, now: datetime) -> float:
+        """その日の残りの転送量を取得する
+
+        Args:
+            now (datetime): 現在日時
+
+        Returns:
+            float: 残りの転送量 [MB]、上限が無い場合は無限大
+        """
+
+        if self.budget.daily_mb <= 0:
+            return math.inf
+
+        self.load()
+        self.budget.roll(now)
+
+        return max(0.0, self.budget.daily_mb - self.budget.used_mb)
+
+    def consume(self, transferred_mb: float, now: datetime) -> None:
+        """1 回の計測で転送した量を加えて保存する
+
+        Args:
+            transferred_mb (float): 1 回の計測で転送した量 [MB]
+            now (datetime): 現在日時
+        """
+
+        self.load()
+        self.budget.add(transferred_mb, now)
+        self.save()
+
+
+def open_ledger(record_dir_path: str, daily_mb: float, users: int = 1) -> BudgetLedger:
+    """計測結果ディレクトリの転送量の記録を開く
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        daily_mb (float): 1 日の転送量の上限 [MB]、0 の場合は制限せずに記録のみ行う
+        users (int): 上限を分け合う計測対象の数
+
+    Returns:
+        BudgetLedger: 記録済みの転送量を読み込んだ記録
+    """
+
+    os.makedirs(record_dir_path, exist_ok=True)
+
+    ledger = BudgetLedger(
+        os.path.join(record_dir_path, BUDGET_FILE_NAME), DataBudget(daily_mb, users)
+    )
+    ledger.load()
+
+    return ledger
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, Sequence
+
+from speedtest_tool_fastcom.module import logmng
+
+try:
+    import numpy
+except ImportError:
+    # NumPy は任意の依存関係とし、無ければ 1 件ずつ集計する
+    numpy = None
+
+# 選択可能な間引き方法
+DOWNSAMPLE_METHODS: tuple[str, ...] = ("minmax", "lttb")
+
+
+def to_epoch_milliseconds(values: Any) -> Any:
+    """計測日時の列をエポックミリ秒の列にする
+
+    Args:
+        values (Any): reporter.get_result_csv の計測日時の列
+
+    Returns:
+        Any: エポックミリ秒の列
+    """
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values.astype("datetime64[ms]").astype(numpy.float64)
+
+    return values
+
+
+class BucketAggregator:
+    """時間軸を等幅のバケットに分け、バケット毎に件数・最小・最大・合計を逐次集計する
+
+    データを少しずつ追加でき、保持するのはバケット数分の集計値だけとなる為、
+    入力の件数に依らずメモリ使用量は一定となる。
+
+    Args:
+        start_ms (float): 集計期間の開始日時のエポックミリ秒（含む）
+        end_ms (float): 集計期間の終了日時のエポックミリ秒（含まない）
+        buckets (int): バケット数
+    """
+
+    def __init__(self, start_ms: float, end_ms: float, buckets: int) -> None:
+        self.start_ms: float = start_ms
+        self.buckets: int = max(1, buckets)
+        self.width_ms: float = max(1.0, (end_ms - start_ms) / self.buckets)
+
+        self.counts: array = array("q", [0]) * self.buckets
+        self.minimums: array = array("d", [math.inf]) * self.buckets
+        self.maximums: array = array("d", [-math.inf]) * self.buckets
+        self.sums: array = array("d", [0.0]) * self.buckets
+
+    def add(self, x_ms: Sequence[float], y: Sequence[float]) -> None:
+        """データを追加する
+
+        集計期間外のデータは無視する。
+
+        Args:
+            x_ms (Sequence[float]): エポックミリ秒の列
+            y (Sequence[float]): 値の列
+        """
+
+        if numpy is not None:
+            self._add_vectorized(numpy.asarray(x_ms), numpy.asarray(y))
+            return
+
+        for x_value, y_value in zip(x_ms, y):
+            index: int = int((x_value - self.start_ms) // self.width_ms)
+
+            if 0 <= index < self.buckets:
+                self.counts[index] += 1
+                self.sums[index] += y_value
+                self.minimums[index] = min(self.minimums[index], y_value)
+                self.maximums[index] = max(self.maximums[index], y_value)
+
+    def _add_vectorized(self, x_ms: Any, y: Any) -> None:
+        indexes = ((x_ms - self.start_ms) // self.width_ms).astype(numpy.int64)
+        mask = (indexes >= 0) & (indexes < self.buckets)
+        indexes = indexes[mask]
+        y = y[mask]
+
+        counts = numpy.frombuffer(self.counts, dtype=numpy.int64)
+        sums = numpy.frombuffer(self.sums, dtype=numpy.float64)
+        minimums = numpy.frombuffer(self.minimums, dtype=numpy.float64)
+        maximums = numpy.frombuffer(self.maximums, dtype=numpy.float64)
+
+        numpy.add.at(counts, indexes, 1)
+        numpy.add.at(sums, indexes, y)
+        numpy.minimum.at(minimums, indexes, y)
+        numpy.maximum.at(maximums, indexes, y)
+
+    def results(self) -> dict[str, list[float]]:
+        """データの有るバケットの集計結果を取得する
+
+        Returns:
+            dict[str, list[float]]: バケット中央のエポックミリ秒（key: x）
+                                    最小値（key: min）
+                                    最大値（key: max）
+                                    平均値（key: mean）
+        """
+
+        indexes: list[int] = [
+            index for index, count in enumerate(self.counts) if count > 0
+        ]
+
+        return {
+            "x": [self.start_ms + (index + 0.5) * self.width_ms for index in indexes],
+            "min": [self.minimums[index] for index in indexes],
+            "max": [self.maximums[index] for index in indexes],
+            "mean": [self.sums[index] / self.counts[index] for index in indexes],
+        }
+
+
+def lttb(
+    x: Sequence[float], y: Sequence[float], threshold: int
+) -> tuple[list[float], list[float]]:
+    """Largest-Triangle-Three-Buckets で見た目の形を保ったまま点数を減らす
+
+    Args:
+        x (Sequence[float]): 昇順の x の列
+        y (Sequence[float]): y の列
+        threshold (int): 間引き後の点数
+
+    Returns:
+        tuple[list[float], list[float]]: 間引き後の x の列と y の列
+    """
+
+    length: int = len(x)
+
+    if threshold >= length or threshold < 3:
+        return list(x), list(y)
+
+    sampled_x: list[float] = [x[0]]
+    sampled_y: list[float] = [y[0]]
+    every: float = (length - 2) / (threshold - 2)
+    selected: int = 0
+
+    for bucket in range(threshold - 2):
+        # 次のバケットの平均点
+        next_start: int = int((bucket + 1) * every) + 1
+        next_end: int = min(int((bucket + 2) * every) + 1, length)
+        next_count: int = max(1, next_end - next_start)
+        average_x: float = sum(x[next_start:next_end]) / next_count
+        average_y: float = sum(y[next_start:next_end]) / next_count
+
+        # 現在のバケットから、前の選択点と次の平均点との三角形が最大となる点を選ぶ
+        start: int = int(bucket * every) + 1
+        end: int = int((bucket + 1) * every) + 1
+        best_area: float = -1.0
+        best_index: int = start
+
+        for index in range(start, end):
+            area: float = abs(
+                (x[selected] - average_x) * (y[index] - y[selected])
+                - (x[selected] - x[index]) * (average_y - y[selected])
+            )
+
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        sampled_x.append(x[best_index])
+        sampled_y.append(y[best_index])
+        selected = best_index
+
+    sampled_x.append(x[length - 1])
+    sampled_y.append(y[length - 1])
+
+    return sampled_x, sampled_y
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,936 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import ssl
+import statistics
+import time
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlencode, urlsplit
+
+from speedtest_tool_fastcom.module import datacap, logmng, utility, watchdog
+from speedtest_tool_fastcom.module.result import PhaseTimings
+
+# 選択可能な計測エンジン
+ENGINES: tuple[str, ...] = ("browser", "http")
+
+# Fast.com のトップページ
+FASTCOM_URL: str = "https://fast.com/"
+
+# 計測先 URL を払い出す API
+API_URL: str = "https://api.fast.com/netflix/speedtest/v2"
+
+# 並行に使う接続数（計測先 URL 数）の既定値
+DEFAULT_CONNECTIONS: int = 5
+
+# ダウンロード・アップロードそれぞれの計測時間の既定値 [s]
+DEFAULT_DURATION: float = 10
+
+# 1 回のリクエストで転送する範囲の大きさ [byte]
+RANGE_SIZE: int = 25 * 1024 * 1024
+
+# 読み書きの単位 [byte]
+CHUNK_SIZE: int = 64 * 1024
+
+# アップロードの 1 回のリクエストで送る大きさの下限 [byte]
+UPLOAD_MIN_SIZE: int = 256 * 1024
+
+# アップロードの 1 回のリクエストに掛ける時間の目安 [s]、応答までの時間から次に送る大きさを決める
+UPLOAD_TARGET_SECONDS: float = 0.25
+
+# プロキシへの接続と CONNECT の応答を待つ時間 [s]、スレッドで待つ為に段階のタイムアウトでは止まらない
+TUNNEL_TIMEOUT: float = 30
+
+# 遅延を計測する回数
+LATENCY_PROBES: int = 5
+
+# 負荷時の遅延を計測する間隔 [s]
+LOADED_PROBE_INTERVAL: float = 0.25
+
+# トップページから読み込むスクリプトと、スクリプト中のトークン
+SCRIPT_PATTERN = re.compile(r'<script src="([^"]*app-[^"]*\.js)"')
+TOKEN_PATTERN = re.compile(r'token:"([A-Za-z0-9]+)"')
+
+
+class HttpConnection:
+    """asyncio のストリームで 1 つのホストと HTTP/1.1 で通信する
+
+    Keep-Alive で同じ接続を使い回す。プロキシを指定した場合、https は CONNECT で
+    トンネルを張り、http は絶対 URI でプロキシに要求する。
+
+    Args:
+        url (str): 接続先の URL（スキームとホストのみ使う）
+        proxy (str): プロキシ、空文字の場合は直接接続する
+    """
+
+    def __init__(self, url: str, proxy: str = "") -> None:
+        parts = urlsplit(url)
+
+        self.scheme: str = parts.scheme
+        self.host: str = parts.hostname or ""
+        self.port: int = parts.port or (443 if parts.scheme == "https" else 80)
+        self.proxy: str = proxy
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def connect(self) -> None:
+        """接続する"""
+
+        ssl_context: ssl.SSLContext | None = (
+            ssl.create_default_context() if self.scheme == "https" else None
+        )
+        server_hostname: str | None = self.host if ssl_context else None
+
+        if not self.proxy:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port, ssl=ssl_context, server_hostname=server_hostname
+            )
+            return
+
+        proxy_parts = urlsplit(self.proxy)
+        proxy_host: str = proxy_parts.hostname or ""
+        proxy_port: int = proxy_parts.port or 8080
+
+        if ssl_context is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                proxy_host, proxy_port
+            )
+            return
+
+        # CONNECT 後の既存ソケットの上で TLS を始める
+        sock: socket.socket = await asyncio.get_event_loop().run_in_executor(
+            None, open_tunnel, proxy_host, proxy_port, self.host, self.port
+        )
+        self.reader, self.writer = await asyncio.open_connection(
+            sock=sock, ssl=ssl_context, server_hostname=server_hostname
+        )
+
+    def close(self) -> None:
+        """切断する"""
+
+        if self.writer is not None:
+            self.writer.close()
+
+        self.reader = None
+        self.writer = None
+
+    def _request_target(self, path: str) -> str:
+        if self.proxy and self.scheme == "http":
+            return f"http://{self.host}:{self.port}{path}"
+
+        return path
+
+    async def send_head(self, method: str, path: str, content_length: int = 0) -> None:
+        """リクエスト行とヘッダを送る
+
+        Args:
+            method (str): メソッド
+            path (str): パスとクエリ
+            content_length (int): 送る本文の大きさ [byte]
+        """
+
+        if self.writer is None:
+            await self.connect()
+
+        lines: list[str] = [
+            f"{method} {self._request_target(path)} HTTP/1.1",
+            f"Host: {self.host}",
+            "User-Agent: speedtest_tool_fastcom",
+            "Accept: */*",
+            "Connection: keep-alive",
+        ]
+
+        if method == "POST":
+            lines.append("Content-Type: application/octet-stream")
+            lines.append(f"Content-Length: {content_length}")
+
+        head: bytes = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        self.writer.write(head)  # type: ignore
+        await self.writer.drain()  # type: ignore
+
+    async def read_head(self) -> tuple[int, dict[str, str]]:
+        """レスポンスのステータスとヘッダを読む
+
+        Raises:
+            ConnectionError: 接続が切れた場合
+
+        Returns:
+            tuple[int, dict[str, str]]: ステータスコードと小文字のヘッダ名に対する値
+        """
+
+        status_line: bytes = await self.reader.readline()  # type: ignore
+
+        if not status_line:
+            raise ConnectionError(f"{self.host} との接続が切れました。")
+
+        status: int = int(status_line.split()[1])
+        headers: dict[str, str] = {}
+
+        while True:
+            line: bytes = await self.reader.readline()  # type: ignore
+
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        return status, headers
+
+    async def read_body(
+        self,
+        headers: dict[str, str],
+        on_chunk: Callable[[int], bool] | None = None,
+    ) -> bytes:
+        """レスポンスの本文を読む
+
+        on_chunk を指定した場合は本文を溜めずに読んだ大きさを渡し、
+        False が返ると読むのを止めて切断する。
+
+        Args:
+            headers (dict[str, str]): レスポンスのヘッダ
+            on_chunk (Callable[[int], bool] | None): 読んだ大きさを受け取る処理
+
+        Returns:
+            bytes: 本文、on_chunk を指定した場合は空
+        """
+
+        reader: asyncio.StreamReader = self.reader  # type: ignore
+        body: list[bytes] = []
+
+        def receive(chunk: bytes) -> bool:
+            if on_chunk is None:
+                body.append(chunk)
+                return True
+
+            return on_chunk(len(chunk))
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size: int = int((await reader.readline()).split(b";")[0], 16)
+
+                if size == 0:
+                    await reader.readline()
+                    break
+
+                chunk: bytes = await reader.readexactly(size)
+                await reader.readline()
+
+                if not receive(chunk):
+                    self.close()
+                    break
+        else:
+            remaining: int = int(headers.get("content-length", "-1"))
+
+            while remaining != 0:
+                chunk = await reader.read(
+                    CHUNK_SIZE if remaining < 0 else min(CHUNK_SIZE, remaining)
+                )
+
+                if not chunk:
+                    if remaining > 0:
+                        raise ConnectionError(f"{self.host} との接続が切れました。")
+                    break
+
+                remaining -= len(chunk) if remaining > 0 else 0
+
+                if not receive(chunk):
+                    self.close()
+                    break
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+
+        return b"".join(body)
+
+    async def request(self, method: str, path: str) -> tuple[int, bytes]:
+        """本文の無いリクエストを送り、レスポンスを全て読む
+
+        Args:
+            method (str): メソッド
+            path (str): パスとクエリ
+
+        Returns:
+            tuple[int, bytes]: ステータスコードと本文
+        """
+
+        await self.send_head(method, path)
+        status, headers = await self.read_head()
+
+        return status, await self.read_body(headers)
+
+
+def open_tunnel(
+    proxy_host: str,
+    proxy_port: int,
+    host: str,
+    port: int,
+    timeout: float = TUNNEL_TIMEOUT,
+) -> socket.socket:
+    """プロキシに CONNECT でトンネルを張ったソケットを作成する
+
+    executor のスレッドで呼ぶ為、応答しないプロキシでスレッドが残らないよう
+    接続と CONNECT のやり取りは timeout で打ち切る。
+
+    Args:
+        proxy_host (str): プロキシのホスト
+        proxy_port (int): プロキシのポート
+        host (str): 接続先のホスト
+        port (int): 接続先のポート
+        timeout (float): 接続と CONNECT の応答を待つ時間 [s]
+
+    Raises:
+        ConnectionError: プロキシが CONNECT を受け付けなかった場合
+        socket.timeout: timeout までにプロキシに接続できないか応答が無い場合
+
+    Returns:
+        socket.socket: ノンブロッキングにしたソケット
+    """
+
+    sock: socket.socket = socket.create_connection((proxy_host, proxy_port), timeout)
+
+    try:
+        sock.settimeout(timeout)
+        sock.sendall(
+            f"CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n".encode(
+                "latin-1"
+            )
+        )
+
+        response: bytes = b""
+        while b"\r\n\r\n" not in response:
+            received: bytes = sock.recv(4096)
+
+            if not received:
+                break
+            response += received
+    except OSError:
+        sock.close()
+        raise
+
+    if not response.startswith(b"HTTP/1.") or response.split()[1] != b"200":
+        sock.close()
+        raise ConnectionError(f"プロキシが {host}:{port} への CONNECT を拒否しました。")
+
+    sock.setblocking(False)
+
+    return sock
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """URL を接続先（スキームとホスト）とパス・クエリに分ける
+
+    Args:
+        url (str): URL
+
+    Returns:
+        tuple[str, str]: 接続先とパス・クエリ
+    """
+
+    parts = urlsplit(url)
+    path: str = parts.path or "/"
+
+    if parts.query:
+        path += "?" + parts.query
+
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+def make_range_path(path: str, size: int) -> str:
+    """計測先 URL のパスを範囲指定のパスにする
+
+    Args:
+        path (str): 計測先 URL のパスとクエリ
+        size (int): 範囲の大きさ [byte]
+
+    Returns:
+        str: /speedtest/range/0-<size> 形式のパスとクエリ
+    """
+
+    return path.replace("/speedtest", f"/speedtest/range/0-{size}", 1)
+
+
+async def fetch(url: str, proxy: str) -> bytes:
+    """URL を GET して本文を取得する
+
+    Args:
+        url (str): URL
+        proxy (str): プロキシ、空文字の場合は直接接続する
+
+    Raises:
+        ConnectionError: ステータスコードが 200 以外の場合
+
+    Returns:
+        bytes: 本文
+    """
+
+    origin, path = split_url(url)
+    connection = HttpConnection(origin, proxy)
+
+    try:
+        status, body = await connection.request("GET", path)
+    finally:
+        connection.close()
+
+    if status != 200:
+        raise ConnectionError(f"{url} の取得に失敗しました。({status})")
+
+    return body
+
+
+async def get_targets(
+    proxy: str, connections: int, base_url: str, api_url: str
+) -> dict[str, Any]:
+    """トップページのスクリプトからトークンを取得し、計測先 URL を払い出してもらう
+
+    Args:
+        proxy (str): プロキシ、空文字の場合は直接接続する
+        connections (int): 払い出してもらう計測先 URL 数
+        base_url (str): Fast.com のトップページ
+        api_url (str): 計測先 URL を払い出す API
+
+    Raises:
+        ValueError: スクリプト又はトークンが見つからない場合
+
+    Returns:
+        dict[str, Any]: API の応答（client, targets）
+    """
+
+    page: str = (await fetch(base_url, proxy)).decode("utf-8", "replace")
+    script = SCRIPT_PATTERN.search(page)
+
+    if script is None:
+        raise ValueError("Fast.com のスクリプトが見つかりません。")
+
+    origin, _ = split_url(base_url)
+    script_url: str = script.group(1)
+    if script_url.startswith("/"):
+        script_url = origin + script_url
+
+    token = TOKEN_PATTERN.search(
+        (await fetch(script_url, proxy)).decode("utf-8", "replace")
+    )
+
+    if token is None:
+        raise ValueError("Fast.com のトークンが見つかりません。")
+
+    query: str = urlencode(
+        {"https": "true", "token": token.group(1), "urlCount": connections}
+    )
+
+    return json.loads(await fetch(f"{api_url}?{query}", proxy))
+
+
+async def probe_latency(connection: HttpConnection, path: str) -> float:
+    """1 byte の範囲を要求して往復時間を計る
+
+    Args:
+        connection (HttpConnection): 計測先への接続
+        path (str): 計測先 URL のパスとクエリ
+
+    Returns:
+        float: 往復時間 [ms]
+    """
+
+    started: float = time.perf_counter()
+    await connection.request("GET", make_range_path(path, 0))
+
+    return (time.perf_counter() - started) * 1000
+
+
+class TransferMeter:
+    """計測先毎の並行な転送の転送量を数え、止めるか判定する
+
+    アップロードは送る前に大きさを予約し、予約と転送済みの合計が max_bytes を超える
+    リクエストは送らない為、転送量の上限で送信中のリクエストを切らずに済む。
+
+    Args:
+        duration (float): 計測時間 [s]
+        max_bytes (float): 転送量の上限 [byte]
+        detector (datacap.StabilityDetector | None): スループットが安定したか判定する処理
+        on_first_byte (Callable[[], None] | None): 最初に転送できた時に呼ぶ処理
+    """
+
+    def __init__(
+        self,
+        duration: float,
+        max_bytes: float = math.inf,
+        detector: datacap.StabilityDetector | None = None,
+        on_first_byte: Callable[[], None] | None = None,
+    ) -> None:
+        self.max_bytes: float = max_bytes
+        self.detector: datacap.StabilityDetector | None = detector
+        self.on_first_byte: Callable[[], None] | None = on_first_byte
+        self.started: float = time.perf_counter()
+        self.deadline: float = self.started + duration
+        self.transferred: int = 0
+        self.reserved: int = 0
+        self.last_transferred: float = self.started
+
+    def is_running(self) -> bool:
+        """転送を続けるか判定する
+
+        Returns:
+            bool: 期限前で、転送量が上限未満で、スループットが安定していない場合は True
+        """
+
+        return (
+            self.transferred < self.max_bytes
+            and time.perf_counter() < self.deadline
+            and not (self.detector is not None and self.detector.is_stable())
+        )
+
+    def add(self, size: int) -> None:
+        """転送できた大きさを加える
+
+        Args:
+            size (int): 転送できた大きさ [byte]
+        """
+
+        if self.transferred == 0 and self.on_first_byte is not None:
+            self.on_first_byte()
+
+        self.transferred += size
+        self.last_transferred = time.perf_counter()
+
+    def reserve(self, size: int) -> int:
+        """送る大きさを上限の残りの範囲で予約する
+
+        Args:
+            size (int): 送りたい大きさ [byte]
+
+        Returns:
+            int: 予約できた大きさ [byte]、上限の残りが UPLOAD_MIN_SIZE 未満の場合は 0
+        """
+
+        available: float = self.max_bytes - self.transferred - self.reserved
+        reserved: int = int(min(size, available))
+
+        if reserved < min(size, UPLOAD_MIN_SIZE):
+            return 0
+
+        self.reserved += reserved
+
+        return reserved
+
+    def release(self, size: int, is_transferred: bool) -> None:
+        """予約した大きさを解放し、送れた場合は転送量に加える
+
+        Args:
+            size (int): 予約した大きさ [byte]
+            is_transferred (bool): 計測先が受け取った場合は True
+        """
+
+        self.reserved -= size
+
+        if is_transferred:
+            self.add(size)
+
+    def get_speed(self) -> float:
+        """最後に転送できた時点までのスループットを取得する
+
+        Returns:
+            float: スループット [Mbps]
+        """
+
+        return (
+            self.transferred
+            * 8
+            / max(self.last_transferred - self.started, 1e-9)
+            / 10**utility.ValuePrefix.M.value
+        )
+
+
+async def download(url: str, proxy: str, meter: TransferMeter) -> None:
+    """止められるまで計測先から範囲指定でダウンロードを繰り返す
+
+    Args:
+        url (str): 計測先 URL
+        proxy (str): プロキシ、空文字の場合は直接接続する
+        meter (TransferMeter): 転送量を数え、止めるか判定する処理
+
+    Raises:
+        watchdog.PhaseError: 計測先が 200, 206 以外を返した場合（エラーページを速度に数えない）
+    """
+
+    origin, path = split_url(url)
+    connection = HttpConnection(origin, proxy)
+
+    def on_chunk(size: int) -> bool:
+        meter.add(size)
+        return meter.is_running()
+
+    try:
+        while meter.is_running():
+            await connection.send_head("GET", make_range_path(path, RANGE_SIZE))
+            status, headers = await connection.read_head()
+
+            if status not in (200, 206):
+                raise watchdog.PhaseError(
+                    "download", f"{origin} がダウンロードに {status} を返しました。"
+                )
+
+            await connection.read_body(headers, on_chunk)
+    finally:
+        connection.close()
+
+
+def get_next_upload_size(size: int, elapsed: float) -> int:
+    """前回のアップロードの応答までの時間から、次のリクエストで送る大きさを決める
+
+    1 回のリクエストが UPLOAD_TARGET_SECONDS 程度で終わる大きさとし、
+    1 回毎の変化は半分から倍まで、全体は UPLOAD_MIN_SIZE から RANGE_SIZE までに収める。
+
+    Args:
+        size (int): 前回送った大きさ [byte]
+        elapsed (float): 前回の送信開始から応答までの時間 [s]
+
+    Returns:
+        int: 次に送る大きさ [byte]
+    """
+
+    scaled: float = size * UPLOAD_TARGET_SECONDS / max(elapsed, 1e-3)
+
+    return int(min(max(scaled, size / 2, UPLOAD_MIN_SIZE), size * 2, RANGE_SIZE))
+
+
+async def upload(url: str, proxy: str, meter: TransferMeter) -> None:
+    """止められるまで計測先へ範囲指定でアップロードを繰り返す
+
+    送る大きさは送る前に予約し、計測先の応答を受け取ってから転送量に加える。書き込みが返った時点では
+    手元の送信バッファに入っただけの為、止めた時点で送信中のリクエストの分は数えずに切断する。
+    送る本文は使い回す 1 つの乱数の塊とし、計測中にメモリを確保しない。
+
+    Args:
+        url (str): 計測先 URL
+        proxy (str): プロキシ、空文字の場合は直接接続する
+        meter (TransferMeter): 転送量を数え、止めるか判定する処理
+
+    Raises:
+        ConnectionError: 計測先がアップロードを受け付けなかった場合
+    """
+
+    origin, path = split_url(url)
+    connection = HttpConnection(origin, proxy)
+    payload: bytes = os.urandom(CHUNK_SIZE)
+    size: int = UPLOAD_MIN_SIZE
+
+    try:
+        while meter.is_running():
+            reserved: int = meter.reserve(size)
+
+            if reserved == 0:
+                break
+
+            started: float = time.perf_counter()
+            is_acknowledged: bool = False
+
+            try:
+                await connection.send_head(
+                    "POST", make_range_path(path, reserved), reserved
+                )
+                remaining: int = reserved
+
+                while remaining > 0 and meter.is_running():
+                    chunk: bytes = payload[: min(CHUNK_SIZE, remaining)]
+                    connection.writer.write(chunk)  # type: ignore
+                    await connection.writer.drain()  # type: ignore
+                    remaining -= len(chunk)
+
+                if remaining > 0:
+                    break
+
+                status, headers = await connection.read_head()
+                await connection.read_body(headers)
+
+                if status // 100 != 2:
+                    raise ConnectionError(f"{origin} がアップロードを受け付けませんでした。({status})")
+
+                is_acknowledged = True
+            finally:
+                meter.release(reserved, is_acknowledged)
+
+            size = get_next_upload_size(reserved, time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+async def run_transfers(
+    transfer: Callable[[str, str, TransferMeter], Awaitable[None]],
+    urls: list[str],
+    proxy: str,
+    duration: float,
+    on_first_byte: Callable[[], None] | None = None,
+    stop_rule: datacap.StopRule | None = None,
+    max_bytes: float = math.inf,
+) -> tuple[float, int]:
+    """計測先毎に並行して転送し、全体のスループットを求める
+
+    stop_rule.is_quick の場合は SAMPLE_INTERVAL 毎に直近 ROLLING_WINDOW 秒のスループットを求め、
+    安定した時点で止めて、立ち上がりを除いた直近の値の平均をスループットとする。
+    転送量が max_bytes に達した場合も止める。ダウンロードは接続毎に読み書きの単位 1 つ分まで
+    超えうるが、アップロードは予約した範囲でのみ送る為に超えない。
+    スループットは最後に転送できた時点までの転送量と時間から求める為、アップロードで
+    止めた時点に送信中だったリクエストの時間は含めない。
+
+    Args:
+        transfer (Callable[[str, str, TransferMeter], Awaitable[None]]):
+            download 又は upload
+        urls (list[str]): 計測先 URL のリスト
+        proxy (str): プロキシ、空文字の場合は直接接続する
+        duration (float): 計測時間 [s]
+        on_first_byte (Callable[[], None] | None): 最初に転送できた時に呼ぶ処理
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        max_bytes (float): 転送量の上限 [byte]
+
+    Returns:
+        tuple[float, int]: スループット [Mbps] と計測先が受け取った（受信した）転送量 [byte]
+    """
+
+    detector: datacap.StabilityDetector | None = (
+        datacap.StabilityDetector(stop_rule.tolerance)
+        if stop_rule is not None and stop_rule.is_quick
+        else None
+    )
+    meter = TransferMeter(duration, max_bytes, detector, on_first_byte)
+
+    async def sample() -> None:
+        history: list[tuple[float, int]] = [(meter.started, 0)]
+
+        while meter.is_running():
+            await asyncio.sleep(datacap.SAMPLE_INTERVAL)
+            now: float = time.perf_counter()
+            history.append((now, meter.transferred))
+
+            # 直近 ROLLING_WINDOW 秒の区間のスループットにする
+            while now - history[1][0] >= datacap.ROLLING_WINDOW:
+                history.pop(0)
+
+            oldest_time, oldest_bytes = history[0]
+            detector.add(  # type: ignore
+                (meter.transferred - oldest_bytes)
+                * 8
+                / (now - oldest_time)
+                / 10**utility.ValuePrefix.M.value,
+                now - meter.started,
+            )
+
+    sampler: asyncio.Future | None = (
+        asyncio.ensure_future(sample()) if detector is not None else None
+    )
+
+    try:
+        await asyncio.gather(*(transfer(url, proxy, meter) for url in urls))
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+
+    elapsed: float = time.perf_counter() - meter.started
+    speed: float = meter.get_speed()
+
+    if detector is not None and detector.is_stable():
+        speed = detector.get_speed()
+        logmng.logger.info(f"{transfer.__name__} のスループットが安定した為、{elapsed:.1f} 秒で止めました。")
+    elif meter.transferred + UPLOAD_MIN_SIZE > max_bytes:
+        logmng.logger.info(f"{transfer.__name__} の転送量が上限に達した為、{elapsed:.1f} 秒で止めました。")
+
+    return speed, meter.transferred
+
+
+async def measure_loaded_latency(
+    url: str, proxy: str, stop: asyncio.Event
+) -> list[float]:
+    """止められるまで一定間隔で遅延を計る
+
+    Args:
+        url (str): 計測先 URL
+        proxy (str): プロキシ、空文字の場合は直接接続する
+        stop (asyncio.Event): 計測を止める合図
+
+    Returns:
+        list[float]: 往復時間 [ms] のリスト
+    """
+
+    origin, path = split_url(url)
+    connection = HttpConnection(origin, proxy)
+    latencies: list[float] = []
+
+    try:
+        while not stop.is_set():
+            latencies.append(await probe_latency(connection, path))
+
+            try:
+                await asyncio.wait_for(stop.wait(), LOADED_PROBE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        connection.close()
+
+    return latencies
+
+
+@utility.recording
+async def get_network_info(
+    timeout: float,
+    proxy: str,
+    timings: PhaseTimings | None = None,
+    connections: int = DEFAULT_CONNECTIONS,
+    duration: float = DEFAULT_DURATION,
+    base_url: str = FASTCOM_URL,
+    api_url: str = API_URL,
+    stop_rule: datacap.StopRule | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+) -> dict[str, float | str]:
+    """ブラウザを使わずに Fast.com の API と計測先に直接 HTTP で計測する
+
+    トップページのスクリプトからトークンを取得して計測先 URL を払い出してもらい、
+    無負荷時の遅延、ダウンロード（負荷時の遅延を並行して計測）、アップロードの順に計測する。
+    stop_rule が有る場合、ダウンロード・アップロードはそれぞれスループットが安定した時点で止め、
+    1 回の計測の転送量の上限の半分をダウンロードに、残りをアップロードに割り当てる。
+    計測先 URL の取得（navigation）、ダウンロード、アップロードは段階毎のタイムアウトで打ち切る。
+
+    Args:
+        timeout (float): 計測全体のタイムアウト [s]、0 の場合は待ち続ける
+        proxy (str): 計測に使うプロキシ、空文字の場合は直接接続する
+        timings (PhaseTimings | None): 段階毎の所要時間を記録する先
+        connections (int): 並行に使う接続数
+        duration (float): ダウンロード・アップロードそれぞれの計測時間 [s]
+        base_url (str): Fast.com のトップページ
+        api_url (str): 計測先 URL を払い出す API
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+
+    Raises:
+        watchdog.PhaseTimeoutError: タイムアウトまでに計測が完了しなかった場合
+        watchdog.PhaseError: いずれかの段階で失敗した場合
+
+    Returns:
+        dict[str, float | str]: speedtest.get_network_info_from_fastcom と同じ形式の計測結果
+    """
+
+    if timings is None:
+        timings = PhaseTimings()
+
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
+
+    return await watchdog.run_phase(
+        "total",
+        _measure(
+            proxy,
+            timings,
+            connections,
+            duration,
+            base_url,
+            api_url,
+            stop_rule,
+            phase_timeouts,
+        ),
+        timeout,
+    )
+
+
+async def _measure(
+    proxy: str,
+    timings: PhaseTimings,
+    connections: int,
+    duration: float,
+    base_url: str,
+    api_url: str,
+    stop_rule: datacap.StopRule | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+) -> dict[str, float | str]:
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
+
+    started: float = time.perf_counter()
+    max_bytes: float = (
+        stop_rule.max_test_mb * 10**utility.ValuePrefix.M.value
+        if stop_rule is not None and stop_rule.max_test_mb > 0
+        else math.inf
+    )
+
+    with timings.measure("navigation"):
+        targets: dict[str, Any] = await watchdog.run_phase(
+            "navigation",
+            get_targets(proxy, connections, base_url, api_url),
+            phase_timeouts.navigation,
+        )
+
+    urls: list[str] = [target["url"] for target in targets["targets"]]
+    client: dict[str, Any] = targets.get("client", {})
+    location: dict[str, Any] = client.get("location", {})
+
+    # 無負荷時の遅延
+    origin, path = split_url(urls[0])
+    connection = HttpConnection(origin, proxy)
+    try:
+        latencies: list[float] = [
+            await probe_latency(connection, path) for _ in range(LATENCY_PROBES)
+        ]
+    finally:
+        connection.close()
+
+    # ダウンロードと並行して負荷時の遅延を計測する
+    def on_first_download() -> None:
+        timings.first_download = time.perf_counter() - started
+
+    stop = asyncio.Event()
+    loaded_task = asyncio.ensure_future(measure_loaded_latency(urls[0], proxy, stop))
+
+    try:
+        download_speed, downloaded = await watchdog.run_phase(
+            "download",
+            run_transfers(
+                download,
+                urls,
+                proxy,
+                duration,
+                on_first_download,
+                stop_rule,
+                max_bytes / 2,
+            ),
+            phase_timeouts.download,
+        )
+    finally:
+        stop.set()
+        loaded_latencies: list[float] = await loaded_task
+
+    timings.download_done = time.perf_counter() - started
+
+    upload_speed, uploaded = await watchdog.run_phase(
+        "upload",
+        run_transfers(
+            upload, urls, proxy, duration, None, stop_rule, max_bytes - downloaded
+        ),
+        phase_timeouts.upload,
+    )
+    timings.upload_done = time.perf_counter() - started
+
+    result: dict[str, float | str] = {
+        "download_speed": round(download_speed, 2),
+        "download_units": "Mbps",
+        "downloaded": round(downloaded / 10**utility.ValuePrefix.M.value, 2),
+        "upload_speed": round(upload_speed, 2),
+        "upload_units": "Mbps",
+        "uploaded": round(uploaded / 10**utility.ValuePrefix.M.value, 2),
+        "latency": round(min(latencies), 2),
+        "buffer_bloat": round(
+            statistics.median(loaded_latencies) if loaded_latencies else 0, 2
+        ),
+        "user_location": ", ".join(
+            value for value in (location.get("city"), location.get("country")) if value
+        ),
+        "user_ip": client.get("ip", ""),
+    }
+    logmng.logger.info(result)
+
+    return result
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import os
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING
+
+from speedtest_tool_fastcom.module import logmng
+
+if TYPE_CHECKING:
+    from pyppeteer.network_manager import Request, Response
+
+# 読み込みを許可するリソースタイプ
+ALLOWED_RESOURCE_TYPES: tuple[str, ...] = ("document", "script", "xhr")
+
+# 取得した転送量を数えるリソースタイプ（計測の通信は含めない）
+STATIC_RESOURCE_TYPES: tuple[str, ...] = ("document", "script")
+
+# ディスクにキャッシュするスクリプトの URL パターン
+# Fast.com の JS バンドルはファイル名に内容のハッシュを含む為、URL 毎にキャッシュできる
+CACHE_URL_PATTERNS: tuple[str, ...] = ("https://fast.com/app-*.js",)
+
+# キャッシュディレクトリに残すファイル数の上限
+MAX_CACHE_FILES: int = 8
+
+
+@dataclass
+class InterceptStats:
+    """1 回の計測でのリクエスト割り込みの集計
+
+    Args:
+        allowed (int): 通信を許可したリクエスト数
+        blocked (int): 中止したリクエスト数
+        cache_hits (int): ディスクのキャッシュから応答したリクエスト数
+        fetched_bytes (int): 通信で取得した html とスクリプトの本文の量（展開後）[byte]
+        cached_bytes (int): キャッシュから応答した量 [byte]
+        cached_urls (set[str]): キャッシュから応答した URL（ログには残さない）
+    """
+
+    allowed: int = 0
+    blocked: int = 0
+    cache_hits: int = 0
+    fetched_bytes: int = 0
+    cached_bytes: int = 0
+    cached_urls: set[str] = field(default_factory=set, repr=False)
+
+    def to_dict(self) -> dict[str, int]:
+        """ログに残す形式にする
+
+        Returns:
+            dict[str, int]: 集計の内容
+        """
+
+        values: dict = asdict(self)
+        values.pop("cached_urls")
+
+        return values
+
+
+class RequestFilter:
+    """計測ページのリクエストを URL パターンで絞り込み、JS バンドルをキャッシュする
+
+    リソースタイプが ALLOWED_RESOURCE_TYPES 以外、deny_patterns に一致、
+    又は allow_patterns が有り一致しない URL は中止する。
+    パターンは fnmatch 形式とし、deny_patterns を優先する。
+
+    Args:
+        allow_patterns (tuple[str, ...]): 許可する URL パターン、空の場合は全て許可する
+        deny_patterns (tuple[str, ...]): 中止する URL パターン
+        cache_dir_path (str): JS バンドルのキャッシュディレクトリパス、空文字の場合はキャッシュしない
+    """
+
+    def __init__(
+        self,
+        allow_patterns: tuple[str, ...] = (),
+        deny_patterns: tuple[str, ...] = (),
+        cache_dir_path: str = "",
+    ) -> None:
+        self.allow_patterns: tuple[str, ...] = allow_patterns
+        self.deny_patterns: tuple[str, ...] = deny_patterns
+        self.cache_dir_path: str = cache_dir_path
+
+    def is_allowed(self, url: str, resource_type: str) -> bool:
+        """リクエストを許可するか判定する
+
+        Args:
+            url (str): リクエストの URL
+            resource_type (str): リソースタイプ
+
+        Returns:
+            bool: 許可する場合は True
+        """
+
+        if resource_type not in ALLOWED_RESOURCE_TYPES:
+            return False
+
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.deny_patterns):
+            return False
+
+        return not self.allow_patterns or any(
+            fnmatch.fnmatchcase(url, pattern) for pattern in self.allow_patterns
+        )
+
+    def get_cache_path(self, url: str) -> str:
+        """URL のキャッシュファイルパスを取得する
+
+        Args:
+            url (str): スクリプトの URL
+
+        Returns:
+            str: キャッシュファイルパス、キャッシュしない URL の場合は空文字
+        """
+
+        if not self.cache_dir_path or not any(
+            fnmatch.fnmatchcase(url, pattern) for pattern in CACHE_URL_PATTERNS
+        ):
+            return ""
+
+        name: str = hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+        return os.path.join(self.cache_dir_path, f"{name}.js")
+
+    async def handle_request(self, stats: InterceptStats, request: Request) -> None:
+        """リクエストを許可、中止、又はキャッシュから応答する
+
+        Args:
+            stats (InterceptStats): 集計先
+            request (Request): pyppeteer でのリクエスト
+        """
+
+        if not self.is_allowed(request.url, request.resourceType):
+            stats.blocked += 1
+            await request.abort()
+            return
+
+        cache_path: str = self.get_cache_path(request.url)
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, mode="rb") as f:
+                body: bytes = f.read()
+
+            stats.cache_hits += 1
+            stats.cached_bytes += len(body)
+            stats.cached_urls.add(request.url)
+            await request.respond(
+                {
+                    "status": 200,
+                    "contentType": "application/javascript; charset=utf-8",
+                    "body": body,
+                }
+            )
+            return
+
+        stats.allowed += 1
+        # continue_() なのはおそらく予約語と被るため
+        await request.continue_()
+
+    async def handle_response(self, stats: InterceptStats, response: Response) -> None:
+        """取得した量を数え、キャッシュ対象の JS バンドルを保存する
+
+        Args:
+            stats (InterceptStats): 集計先
+            response (Response): pyppeteer でのレスポンス
+        """
+
+        if response.url in stats.cached_urls:
+            return
+
+        cache_path: str = self.get_cache_path(response.url)
+        is_static: bool = response.request.resourceType in STATIC_RESOURCE_TYPES
+        is_cacheable: bool = bool(cache_path) and response.status == 200
+
+        if not is_static and not is_cacheable:
+            return
+
+        try:
+            body: bytes = await response.buffer()
+        except Exception:
+            # ページの遷移等で本文が取得できない場合は数えず、キャッシュもしない
+            return
+
+        # chunked や圧縮された応答は content-length が無い為、本文の長さで数える
+        if is_static:
+            stats.fetched_bytes += len(body)
+
+        if not is_cacheable:
+            return
+
+        save_cache(cache_path, body)
+
+
+def save_cache(file_path: str, body: bytes) -> None:
+    """キャッシュファイルを保存し、古いキャッシュを MAX_CACHE_FILES 件まで削除する
+
+    Args:
+        file_path (str): キャッシュファイルパス
+        body (bytes): 本文
+    """
+
+    dir_path: str = os.path.dirname(file_path)
+    os.makedirs(dir_path, exist_ok=True)
+
+    temp_path: str = f"{file_path}.{os.getpid()}.tmp"
+
+    with open(temp_path, mode="wb") as f:
+        f.write(body)
+
+    os.replace(temp_path, file_path)
+    logmng.logger.info(f"JS バンドルをキャッシュしました。 >> {file_path}")
+
+    cache_paths: list[str] = sorted(
+        (
+            os.path.join(dir_path, name)
+            for name in os.listdir(dir_path)
+            if name.endswith(".js")
+        ),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+
+    for old_path in cache_paths[MAX_CACHE_FILES:]:
+        os.remove(old_path)
+
+
+# 計測ページのリクエストの絞り込みの設定
+request_filter = RequestFilter()
+
+
+def set_request_filter(
+    allow_patterns: tuple[str, ...] = (),
+    deny_patterns: tuple[str, ...] = (),
+    cache_dir_path: str = "",
+) -> None:
+    """計測ページのリクエストの絞り込みを設定する
+
+    Args:
+        allow_patterns (tuple[str, ...]): 許可する URL パターン、空の場合は全て許可する
+        deny_patterns (tuple[str, ...]): 中止する URL パターン
+        cache_dir_path (str): JS バンドルのキャッシュディレクトリパス、空文字の場合はキャッシュしない
+    """
+
+    request_filter.allow_patterns = allow_patterns
+    request_filter.deny_patterns = deny_patterns
+    request_filter.cache_dir_path = cache_dir_path
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -1,17 +1,139 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
 import logging.config
+import logging.handlers
+import queue
+from typing import Any
 
 log_formatter = (
     "%(levelname)s %(asctime)s %(filename)s::%(module)s::%(funcName)s - %(message)s"
 )
 
+# 非同期出力時のキューに溜められるログの件数の既定値
+DEFAULT_QUEUE_SIZE: int = 10000
+
+# キューが一杯の時に待つ秒数（block 指定時）
+BLOCK_TIMEOUT: float = 1.0
+
 
 logger = logging.getLogger("basicLogger")
 
+# 非同期出力時にファイルへ書き出すリスナー
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """1 件のログを 1 行の json にする
+
+    メッセージが dict の場合は文字列にせず、そのまま json のオブジェクトとして出力する。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line: dict[str, Any] = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "file": record.filename,
+            "module": record.module,
+            "function": record.funcName,
+            "message": record.msg
+            if isinstance(record.msg, dict)
+            else record.getMessage(),
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line["exception"] = record.exc_text
+
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """上限付きのキューにログを積む
+
+    キューが一杯の場合、既定では新しいログを破棄して件数を数え、
+    次に空きが有る時に破棄した件数を警告として積む。
+    is_blocking の場合は空くまで BLOCK_TIMEOUT 秒待ち、それでも空かなければ破棄する。
+
+    Args:
+        log_queue (queue.Queue): 上限付きのキュー
+        is_blocking (bool): キューが空くまで待つフラグ
+    """
+
+    def __init__(self, log_queue: queue.Queue, is_blocking: bool = False) -> None:
+        super().__init__(log_queue)
+        self.is_blocking: bool = is_blocking
+        self.dropped: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 引数は呼び出し元で文字列にし、書き出し側の書式化に任せる
+        record = copy.copy(record)
+
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # 破棄した件数は、破棄した後のログより先に積む
+        if self.dropped:
+            warning: logging.LogRecord = logger.makeRecord(
+                logger.name,
+                logging.WARNING,
+                __file__,
+                0,
+                f"ログのキューが一杯の為、{self.dropped} 件のログを破棄しました。",
+                None,
+                None,
+                func="enqueue",
+            )
+
+            try:
+                self.queue.put_nowait(warning)
+                self.dropped = 0
+            except queue.Full:
+                pass
+
+        try:
+            if self.is_blocking:
+                self.queue.put(record, timeout=BLOCK_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def set_logger(
+    file_path: str,
+    is_async: bool = False,
+    is_json: bool = False,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    is_blocking: bool = False,
+):
+    """ログの出力先を設定する
+
+    is_async の場合はロガーにはキューへ積むハンドラのみを付け、
+    ファイルへの書き出しは別スレッドの QueueListener で行う。
+
+    Args:
+        file_path (str): ログファイルパス
+        is_async (bool): 別スレッドでファイルに書き出すフラグ
+        is_json (bool): 1 行 1 件の json で書き出すフラグ
+        queue_size (int): 非同期出力時にキューに溜められるログの件数
+        is_blocking (bool): 非同期出力時にキューが一杯なら空くまで待つフラグ
+    """
+
+    stop_logger()
 
-def set_logger(file_path: str):
     logging.config.dictConfig(
         {
             "version": 1,
@@ -19,7 +141,11 @@ def set_logger(file_path: str):
                 "basicFormatter": {
                     "format": log_formatter,
                     "datefmt": "%Y-%m-%d %H:%M:%S",
-                }
+                },
+                "jsonFormatter": {
+                    "()": JsonLinesFormatter,
+                    "datefmt": "%Y-%m-%dT%H:%M:%S%z",
+                },
             },
             "handlers": {
                 "streamHandler": {
@@ -30,7 +156,7 @@ def set_logger(file_path: str):
                 "fileHandler": {
                     "class": "logging.handlers.TimedRotatingFileHandler",
                     "level": logging.INFO,
-                    "formatter": "basicFormatter",
+                    "formatter": "jsonFormatter" if is_json else "basicFormatter",
                     "filename": file_path,
                     "when": "MIDNIGHT",
                 },
@@ -54,6 +180,54 @@ def set_logger(file_path: str):
         }
     )
 
+    if is_async:
+        start_queue_listener(queue_size, is_blocking)
+
+
+def start_queue_listener(queue_size: int, is_blocking: bool) -> None:
+    """設定済みのハンドラを QueueListener に移し、ロガーにはキューへ積むハンドラを付ける
+
+    Args:
+        queue_size (int): キューに溜められるログの件数
+        is_blocking (bool): キューが一杯なら空くまで待つフラグ
+    """
+
+    global _listener
+
+    loggers: list[logging.Logger] = [
+        logging.getLogger(),
+        logger,
+        logging.getLogger("debugLogger"),
+    ]
+    handlers: list[logging.Handler] = []
+
+    for target_logger in loggers:
+        for handler in target_logger.handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue, is_blocking)
+
+    for target_logger in loggers:
+        target_logger.handlers = [queue_handler]
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+@atexit.register
+def stop_logger() -> None:
+    """非同期出力中であれば、キューに残ったログを書き出してからリスナーを止める"""
+
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 if __name__ == "__main__":
     logger.info(f"{__file__} はモジュールをインポートして使ってください。")
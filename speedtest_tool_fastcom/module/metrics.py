@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from speedtest_tool_fastcom.module import logmng, utility
+from speedtest_tool_fastcom.module.result import SpeedtestResult
+
+# OpenMetrics のテキスト形式の Content-Type
+CONTENT_TYPE: str = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# 計測時間のヒストグラムのバケット上限 [s]
+MEASURE_BUCKETS: tuple[float, ...] = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180)
+
+# ブラウザ起動時間のヒストグラムのバケット上限 [s]
+LAUNCH_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+
+# 計測対象毎の最新の計測結果のゲージ（メトリクス名, 説明）
+GAUGES: tuple[tuple[str, str], ...] = (
+    ("fastcom_download_bytes_per_second", "Latest download speed."),
+    ("fastcom_upload_bytes_per_second", "Latest upload speed."),
+    ("fastcom_latency_seconds", "Latest unloaded latency."),
+    ("fastcom_loaded_latency_seconds", "Latest loaded latency (bufferbloat)."),
+    ("fastcom_downloaded_bytes", "Bytes downloaded by the latest measurement."),
+    ("fastcom_uploaded_bytes", "Bytes uploaded by the latest measurement."),
+    ("fastcom_last_measurement_timestamp_seconds", "Time of the latest measurement."),
+)
+
+
+def escape_label(value: str) -> str:
+    """ラベルの値をエスケープする
+
+    Args:
+        value (str): ラベルの値
+
+    Returns:
+        str: エスケープした値
+    """
+
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """計測対象毎の値の分布を累積バケットで数える
+
+    Args:
+        buckets (tuple[float, ...]): 昇順のバケット上限（+Inf は自動で加える）
+    """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: dict[str, list[int]] = {}
+        self.sums: dict[str, float] = {}
+
+    def observe(self, target: str, value: float) -> None:
+        """値を 1 件数える
+
+        Args:
+            target (str): 計測対象のラベル
+            value (float): 値
+        """
+
+        counts: list[int] = self.counts.setdefault(
+            target, [0] * (len(self.buckets) + 1)
+        )
+
+        for index, upper in enumerate(self.buckets):
+            if value <= upper:
+                counts[index] += 1
+        counts[-1] += 1
+
+        self.sums[target] = self.sums.get(target, 0.0) + value
+
+    def render(self, name: str, help_text: str) -> list[str]:
+        """OpenMetrics のテキスト形式の行にする
+
+        Args:
+            name (str): メトリクス名
+            help_text (str): 説明
+
+        Returns:
+            list[str]: 行のリスト
+        """
+
+        lines: list[str] = [
+            f"# TYPE {name} histogram",
+            f"# UNIT {name} seconds",
+            f"# HELP {name} {help_text}",
+        ]
+
+        for target, counts in self.counts.items():
+            label: str = f'target="{escape_label(target)}"'
+
+            bounds: list[str] = [str(float(upper)) for upper in self.buckets]
+
+            for upper, count in zip((*bounds, "+Inf"), counts):
+                lines.append(f'{name}_bucket{{{label},le="{upper}"}} {count}')
+
+            lines.append(f"{name}_count{{{label}}} {counts[-1]}")
+            lines.append(f"{name}_sum{{{label}}} {self.sums[target]}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """計測結果と計測時間を OpenMetrics 形式で出力する為に保持する
+
+    計測はイベントループ、出力は HTTP サーバのスレッドから呼ばれる為、ロックで保護する。
+    """
+
+    def __init__(self) -> None:
+        self.gauges: dict[str, dict[str, float]] = {name: {} for name, _ in GAUGES}
+        self.runs: dict[tuple[str, str], int] = {}
+        self.measure_seconds = Histogram(MEASURE_BUCKETS)
+        self.launch_seconds = Histogram(LAUNCH_BUCKETS)
+        self._lock = threading.Lock()
+
+    def set_result(
+        self, tested_network_data: SpeedtestResult, convert_byte: bool
+    ) -> None:
+        """計測対象の最新の計測結果を更新する
+
+        速度は byte/s、遅延は秒、転送量は byte の基本単位に揃える。
+
+        Args:
+            tested_network_data (SpeedtestResult): ネットワーク速度計測データ
+            convert_byte (bool): 速度が byte/s かのフラグ
+        """
+
+        speed_scale: float = 1 if convert_byte else 1 / 8
+        values: tuple[float, ...] = (
+            tested_network_data.download_speed * speed_scale,
+            tested_network_data.upload_speed * speed_scale,
+            tested_network_data.latency / 1000,
+            tested_network_data.buffer_bloat / 1000,
+            tested_network_data.downloaded * 10**utility.ValuePrefix.M.value,
+            tested_network_data.uploaded * 10**utility.ValuePrefix.M.value,
+            tested_network_data.tested_datetime.timestamp(),
+        )
+
+        with self._lock:
+            for (name, _), value in zip(GAUGES, values):
+                self.gauges[name][tested_network_data.target] = value
+
+    def observe_run(
+        self,
+        target: str,
+        launch_seconds: float | None,
+        measure_seconds: float | None,
+    ) -> None:
+        """1 回の計測の所要時間と成否を数える
+
+        Args:
+            target (str): 計測対象のラベル
+            launch_seconds (float | None): ブラウザの起動に掛かった時間 [s]、
+                起動済みのブラウザを使い回したか、ブラウザを使わなかった場合は None
+            measure_seconds (float | None): 計測に掛かった時間 [s]、失敗した場合は None
+        """
+
+        outcome: str = "failure" if measure_seconds is None else "success"
+
+        with self._lock:
+            self.runs[(target, outcome)] = self.runs.get((target, outcome), 0) + 1
+
+            # 起動しなかった計測を 0 秒として数えると起動時間の分布が 0 に寄る為、数えない
+            if launch_seconds is not None:
+                self.launch_seconds.observe(target, launch_seconds)
+
+            if measure_seconds is not None:
+                self.measure_seconds.observe(target, measure_seconds)
+
+    def render(self) -> str:
+        """OpenMetrics のテキスト形式にする
+
+        Returns:
+            str: OpenMetrics のテキスト
+        """
+
+        lines: list[str] = []
+
+        with self._lock:
+            for name, help_text in GAUGES:
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"# HELP {name} {help_text}")
+
+                for target, value in self.gauges[name].items():
+                    lines.append(f'{name}{{target="{escape_label(target)}"}} {value}')
+
+            lines.append("# TYPE fastcom_measurements counter")
+            lines.append("# HELP fastcom_measurements Measurements by outcome.")
+
+            for (target, outcome), count in self.runs.items():
+                lines.append(
+                    f'fastcom_measurements_total{{target="{escape_label(target)}",'
+                    f'outcome="{outcome}"}} {count}'
+                )
+
+            lines.extend(
+                self.measure_seconds.render(
+                    "fastcom_measure_duration_seconds",
+                    "Time from page load to measurement completion.",
+                )
+            )
+            lines.extend(
+                self.launch_seconds.render(
+                    "fastcom_browser_launch_duration_seconds",
+                    "Time to acquire a browser, including launch.",
+                )
+            )
+
+        lines.append("# EOF")
+
+        return "\n".join(lines) + "\n"
+
+
+# 計測処理が更新するレジストリ
+registry = MetricsRegistry()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """/metrics への GET にレジストリの内容を返す"""
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body: bytes = registry.render().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # スクレイプ毎のアクセスログは残さない
+        pass
+
+
+@utility.recording
+def start_exporter(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """/metrics を返す HTTP サーバを別スレッドで起動する
+
+    Args:
+        port (int): 待ち受けるポート
+        host (str): 待ち受けるアドレス
+
+    Returns:
+        ThreadingHTTPServer: 起動した HTTP サーバ
+    """
+
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-exporter", daemon=True
+    )
+    thread.start()
+
+    logmng.logger.info(f"http://{host}:{server.server_port}/metrics で計測結果を公開します。")
+
+    return server
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
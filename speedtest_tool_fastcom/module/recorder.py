@@ -2,10 +2,9 @@ from __future__ import annotations
 
 import csv
 import os
-from datetime import datetime
 from typing import Any
 
-from speedtest_tool_fastcom.module import logmng, utility
+from speedtest_tool_fastcom.module import logmng, result, rollup, utility
 
 
 @utility.recording
@@ -37,26 +36,15 @@ def check_record_file(file_path: str, convert_byte: bool) -> str:
         logmng.logger.info("csv ファイルが見つかりません。")
         logmng.logger.info(f">> {file_path}")
 
-        with open(file_path, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-
-            if convert_byte:
-                writer.writerow(
-                    (
-                        "Tested Datetime",
-                        "Download Speed(MByte/s)",
-                        "Upload Speed(MByte/s)",
-                    )
-                )
-            else:
-                writer.writerow(
-                    (
-                        "Tested Datetime",
-                        "Download Speed(MBit/s)",
-                        "Upload Speed(MBit/s)",
-                    )
-                )
-            logmng.logger.info("csv ファイル作成及びヘッダ行を追加しました。")
+        # 他プロセスが先に作成していた場合に上書きしないよう排他的に作成する
+        try:
+            with open(file_path, mode="x", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(result.make_csv_header(convert_byte))
+                logmng.logger.info("csv ファイル作成及びヘッダ行を追加しました。")
+                logmng.logger.info(f">> {file_path}")
+        except FileExistsError:
+            logmng.logger.info("csv ファイルは他のプロセスが作成済みでした。")
             logmng.logger.info(f">> {file_path}")
     else:
         pass
@@ -84,42 +72,17 @@ def write_line_to_csv(dir_path: str, record: tuple[Any, ...]) -> None:
             writer.writerow(record)
 
 
-def format_tested_network_data(
-    tested_network_data: tuple[datetime, float, float]
-) -> tuple[str, str, str]:
-    """ネットワーク速度計測データを整形する
-
-    Args:
-        tested_network_data (tuple[datetime, float, float]): ネットワーク速度計測データ
-
-    Returns:
-        tuple[str, str, str]: 整形後ネットワーク速度計測データ
-    """
-
-    tested_datetime: datetime = tested_network_data[0]
-    download_speed: float = tested_network_data[1]
-    upload_speed: float = tested_network_data[2]
-
-    download_speed = utility.change_order(download_speed, utility.ValuePrefix.M)
-    upload_speed = utility.change_order(upload_speed, utility.ValuePrefix.M)
-
-    return (
-        tested_datetime.strftime(utility.FORMAT_DATE_LONG),
-        str(download_speed),
-        str(upload_speed),
-    )
-
-
 def record_to_csv(
     file_path: str,
-    tested_network_data: tuple[datetime, float, float],
+    tested_network_data: result.SpeedtestResult,
     convert_byte: bool,
 ) -> None:
     """ネットワーク速度計測データを csv ファイルへ記録する
 
     Args:
         file_path (str): ネットワーク速度計測結果記録 csv ファイル
-        tested_network_data (tuple[datetime, float, float]): ネットワーク速度計測データ
+        tested_network_data (result.SpeedtestResult): ネットワーク速度計測データ
+        convert_byte (bool): byte にするフラグ
     """
 
     check_record_file(file_path, convert_byte)
@@ -127,9 +90,53 @@ def record_to_csv(
     with open(file_path, mode="a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
 
-        record: tuple[str, str, str] = format_tested_network_data(tested_network_data)
+        writer.writerow(tested_network_data.to_csv_row())
 
-        writer.writerow(record)
+
+def record_failure(file_path: str, failure: result.FailureRecord) -> None:
+    """失敗した計測を計測失敗記録 csv ファイルへ記録する
+
+    ファイルが無ければヘッダ行を付けて作成する。
+
+    Args:
+        file_path (str): 計測失敗記録 csv ファイル
+        failure (result.FailureRecord): 失敗した計測の記録
+    """
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    # 他プロセスが先に作成していた場合に上書きしないよう排他的に作成する
+    try:
+        with open(file_path, mode="x", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(result.FAILURE_CSV_HEADER)
+    except FileExistsError:
+        pass
+
+    with open(file_path, mode="a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(failure.to_csv_row())
+
+
+@utility.recording
+def record_to_rollup(
+    record_dir_path: str, tested_network_data: result.SpeedtestResult
+) -> None:
+    """ネットワーク速度計測データを計測日の集計ファイルに加える
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        tested_network_data (result.SpeedtestResult): ネットワーク速度計測データ
+    """
+
+    target_date = tested_network_data.tested_datetime.date()
+    file_path: str = rollup.get_rollup_path(record_dir_path, target_date)
+
+    day_rollup: rollup.DayRollup = rollup.load_rollup(file_path, target_date)
+    day_rollup.add(
+        tested_network_data.target,
+        tested_network_data.tested_datetime,
+        tested_network_data.to_record_values(),
+    )
+    rollup.save_rollup(file_path, day_rollup)
 
 
 if __name__ == "__main__":
@@ -2,25 +2,156 @@ from __future__ import annotations
 
 import csv
 import os
-import shutil
-from datetime import date, datetime
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Iterator, Sequence
 
+import bokeh.layouts
 import bokeh.models
 import bokeh.plotting
 
-from speedtest_tool_fastcom.module import logmng, utility
+from speedtest_tool_fastcom.module import (
+    downsample,
+    logmng,
+    rollup,
+    uploadsync,
+    utility,
+)
+from speedtest_tool_fastcom.module.result import (
+    CSV_SCHEMAS,
+    SCHEMA_VERSION,
+    SpeedtestResult,
+)
+
+try:
+    import numpy
+except ImportError:
+    # NumPy は任意の依存関係とし、無ければ標準の array で代替する
+    numpy = None
+
+# 日毎の計測レポートの作り方のバージョン、グラフの設定を変えたら上げると一括作成で作り直す
+REPORT_VERSION: int = 4
+
+# 期間レポートのグラフの幅 [px]、間引き後の点数の既定値も兼ねる
+PLOT_WIDTH: int = 1600
+
+# 計測データ記録ファイルを逐次読み込みでグラフにする大きさの下限 [byte]
+STREAMING_THRESHOLD_BYTES: int = 64 * 1024 * 1024
+
+# 逐次読み込みで 1 度に変換する行数
+STREAM_CHUNK_ROWS: int = 10000
+
+# 期間レポートでグラフにする列と凡例
+RANGE_REPORT_SERIES: dict[str, tuple[tuple[str, str, str], ...]] = {
+    "speed": (
+        ("download_speed", "Download speed [MByte/s]", "#8682F5"),
+        ("upload_speed", "Upload speed [MByte/s]", "#F57E76"),
+    ),
+    "latency": (
+        ("latency", "Unloaded latency [ms]", "#8682F5"),
+        ("buffer_bloat", "Loaded latency (bufferbloat) [ms]", "#F57E76"),
+    ),
+}
+
+# 2 つ目以降の計測対象の系列の色（RANGE_REPORT_SERIES の系列の順）、足りない場合は繰り返す
+TARGET_COLORS: tuple[tuple[str, str], ...] = (
+    ("#3BA272", "#E8A33D"),
+    ("#2F7FC1", "#C0504D"),
+    ("#8C564B", "#17BECF"),
+)
+
+
+@utility.recording
+def load_results(file_path: str) -> list[SpeedtestResult]:
+    """ネットワーク速度計測結果 csv ファイルを開いて計測結果のリストとして取得する。
+
+    古いスキーマ（3 列, 4 列）の行もそのまま読み込む。
+
+    Args:
+        file_path (str): ネットワーク速度計測結果 csv ファイルパス
+
+    Returns:
+        list[SpeedtestResult]: 計測結果のリスト（速度は M オーダー）
+    """
+
+    with open(file_path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+
+        reader.__next__()
+
+        return [SpeedtestResult.from_csv_row(row) for row in reader if row]
+
+
+def parse_datetime_column(values: Sequence[str]) -> Any:
+    """計測日時の文字列の列をまとめて変換する
+
+    NumPy が有れば datetime64[s] の配列、無ければナイーブな日時を UTC とみなした
+    エポックミリ秒の array（bokeh の日時軸でそのまま使える値）にする。
+    NumPy が無い場合も strptime は使わず、日付部分毎にキャッシュして変換する。
+
+    Args:
+        values (Sequence[str]): yyyy-MM-dd HH:mm:ss 形式の文字列の列
+
+    Returns:
+        Any: 変換後の配列
+    """
+
+    if numpy is not None:
+        return numpy.array(values, dtype="datetime64[s]")
+
+    epoch_date: date = date(1970, 1, 1)
+    day_seconds: dict[str, int] = {}
+    epochs: array = array("d")
+
+    for value in values:
+        day: str = value[:10]
+        base: int | None = day_seconds.get(day)
+
+        if base is None:
+            base = (date.fromisoformat(day) - epoch_date).days * 86400
+            day_seconds[day] = base
+
+        seconds: int = (
+            base + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+        )
+        epochs.append(seconds * 1000)
+
+    return epochs
+
+
+def parse_float_column(values: Sequence[str]) -> Any:
+    """数値の文字列の列をまとめて変換する
+
+    Args:
+        values (Sequence[str]): 数値の文字列の列
+
+    Returns:
+        Any: NumPy が有れば float64 の配列、無ければ array
+    """
+
+    if numpy is not None:
+        return numpy.array(values, dtype=numpy.float64)
+
+    return array("d", map(float, values))
 
 
 @utility.recording
-def get_result_csv(file_path: str) -> dict[str, list[tuple[datetime, float]]]:
-    """ネットワーク速度計測結果 csv ファイルを開いて中身をタプルのリストとして取得する。
+def get_result_csv(file_path: str) -> dict[str, Any]:
+    """ネットワーク速度計測結果 csv ファイルを開いて中身を列毎の配列として取得する。
+
+    ファイルを 1 度だけ読み込んで列毎に転置し、列単位でまとめて変換する。
+    古いスキーマ（3 列, 4 列）の行は不足する列を補って読み込む。
 
     Args:
         file_path (str): ネットワーク速度計測結果 csv ファイルパス
 
     Returns:
-        dict[str, list[tuple[datetime, float]]]: 日時に対するダウンロード速度（key: download_speed）
-                                                 日時に対するアップロード速度（key: upload_speed）
+        dict[str, Any]: 計測日時（key: tested_datetime）
+                        ダウンロード速度（key: download_speed）
+                        アップロード速度（key: upload_speed）
+                        遅延（key: latency）
+                        負荷時の遅延（key: buffer_bloat）
+                        計測対象のラベル（key: target）
     """
 
     with open(file_path, mode="r", newline="", encoding="utf-8") as f:
@@ -28,23 +159,205 @@ def get_result_csv(file_path: str) -> dict[str, list[tuple[datetime, float]]]:
 
         reader.__next__()
 
-        download_speed_list: list[tuple[datetime, float]] = []
-        upload_speed_list: list[tuple[datetime, float]] = []
+        return convert_rows([row for row in reader if row])
+
+
+# 古いスキーマの行に補う列の値
+ROW_PADDING: list[str] = ["", "0", "0", "", "0", "0", "0", "0", "", ""]
+
+
+def convert_rows(rows: list[list[str]]) -> dict[str, Any]:
+    """計測データ記録ファイルの行を列毎に転置し、列単位でまとめて変換する
+
+    Args:
+        rows (list[list[str]]): 見出し行を除いた行
+
+    Returns:
+        dict[str, Any]: get_result_csv の戻り値と同じ形式の列
+    """
+
+    schema: tuple[str, ...] = CSV_SCHEMAS[SCHEMA_VERSION]
+    padded: list[list[str]] = [row + ROW_PADDING[len(row) :] for row in rows]
+
+    cells: list[Sequence[str]] = list(zip(*padded)) or [()] * len(schema)
+    columns: dict[str, Sequence[str]] = dict(zip(schema, cells))
+
+    return {
+        "tested_datetime": parse_datetime_column(columns["tested_datetime"]),
+        "download_speed": parse_float_column(columns["download_speed"]),
+        "upload_speed": parse_float_column(columns["upload_speed"]),
+        "latency": parse_float_column(columns["latency"]),
+        "buffer_bloat": parse_float_column(columns["buffer_bloat"]),
+        "target": list(columns["target"]),
+    }
+
+
+def take_rows(values: Any, indexes: list[int]) -> Any:
+    """列から指定した行だけを取り出す
+
+    Args:
+        values (Any): NumPy の配列、array 又は list の列
+        indexes (list[int]): 取り出す行番号
+
+    Returns:
+        Any: 元の列と同じ種類の列
+    """
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values[indexes]
+
+    if isinstance(values, array):
+        return array(values.typecode, [values[index] for index in indexes])
+
+    return [values[index] for index in indexes]
+
+
+def group_by_target(tested_data: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """列毎の計測結果を計測対象毎に分ける
+
+    計測対象が 1 つ以下の場合は分けずにそのまま返す。
+
+    Args:
+        tested_data (dict[str, Any]): get_result_csv の戻り値と同じ形式の列
+
+    Returns:
+        dict[str, dict[str, Any]]: 計測対象のラベル毎（現れた順）の同じ形式の列
+    """
+
+    indexes: dict[str, list[int]] = {}
+
+    for index, target in enumerate(tested_data["target"]):
+        indexes.setdefault(target, []).append(index)
+
+    if len(indexes) <= 1:
+        return {next(iter(indexes), ""): tested_data}
+
+    return {
+        target: {
+            name: take_rows(values, target_indexes)
+            for name, values in tested_data.items()
+        }
+        for target, target_indexes in indexes.items()
+    }
+
+
+def get_target_series(
+    legend_label: str, color: str, series_index: int, target: str, target_index: int
+) -> tuple[str, str]:
+    """計測対象毎の系列の凡例と色を取得する
+
+    Args:
+        legend_label (str): 系列の凡例
+        color (str): 1 つ目の計測対象の系列の色
+        series_index (int): グラフ内での系列の順番
+        target (str): 計測対象のラベル
+        target_index (int): 計測対象の順番
+
+    Returns:
+        tuple[str, str]: 計測対象のラベルを付けた凡例と色
+    """
+
+    if target:
+        legend_label = f"{legend_label} ({target})"
+
+    if target_index > 0:
+        color = TARGET_COLORS[(target_index - 1) % len(TARGET_COLORS)][series_index]
+
+    return legend_label, color
+
+
+def iter_result_chunks(
+    file_path: str, chunk_rows: int = STREAM_CHUNK_ROWS
+) -> Iterator[dict[str, Any]]:
+    """ネットワーク速度計測結果 csv ファイルを chunk_rows 行ずつ読み込む
+
+    Args:
+        file_path (str): ネットワーク速度計測結果 csv ファイルパス
+        chunk_rows (int): 1 度に変換する行数
+
+    Yields:
+        Iterator[dict[str, Any]]: chunk_rows 行分の get_result_csv と同じ形式の列
+    """
+
+    with open(file_path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+
+        reader.__next__()
+
+        rows: list[list[str]] = []
 
         for row in reader:
-            download_speed: tuple[datetime, float] = (
-                datetime.strptime(row[0], utility.FORMAT_DATE_LONG),
-                float(row[1]),
-            )
-            upload_speed: tuple[datetime, float] = (
-                datetime.strptime(row[0], utility.FORMAT_DATE_LONG),
-                float(row[2]),
-            )
+            if not row:
+                continue
+
+            rows.append(row)
+
+            if len(rows) >= chunk_rows:
+                yield convert_rows(rows)
+                rows = []
+
+        if rows:
+            yield convert_rows(rows)
+
+
+def get_day_range(file_path: str) -> tuple[float, float] | None:
+    """計測データ記録ファイル名の日付から、その日の開始と終了の日時を取得する
+
+    Args:
+        file_path (str): yyyy-MM-dd_fastcom.csv 形式のネットワーク速度計測結果 csv ファイルパス
+
+    Returns:
+        tuple[float, float] | None: 日付の開始と翌日の開始の日時のエポックミリ秒、
+                                    ファイル名が日付で始まらない場合は None
+    """
+
+    try:
+        target_date: date = datetime.strptime(
+            os.path.basename(file_path)[:10], utility.FORMAT_DATE_SHORT
+        ).date()
+    except ValueError:
+        return None
 
-            download_speed_list.append(download_speed)
-            upload_speed_list.append(upload_speed)
+    start_ms: float = (target_date - date(1970, 1, 1)).days * 86400000.0
 
-    return {"download_speed": download_speed_list, "upload_speed": upload_speed_list}
+    return start_ms, start_ms + 86400000.0
+
+
+def scan_time_range(file_path: str) -> tuple[float, float] | None:
+    """ネットワーク速度計測結果 csv ファイルの最初と最後の計測日時を取得する
+
+    計測日時は固定長の書式の為、変換せずに文字列のまま比較する。
+
+    Args:
+        file_path (str): ネットワーク速度計測結果 csv ファイルパス
+
+    Returns:
+        tuple[float, float] | None: 最初と最後の計測日時のエポックミリ秒、行が無い場合は None
+    """
+
+    first: str = ""
+    last: str = ""
+
+    with open(file_path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+
+        reader.__next__()
+
+        for row in reader:
+            if not row:
+                continue
+
+            if not first or row[0] < first:
+                first = row[0]
+            if row[0] > last:
+                last = row[0]
+
+    if not first:
+        return None
+
+    epochs: Any = downsample.to_epoch_milliseconds(parse_datetime_column([first, last]))
+
+    return float(epochs[0]), float(epochs[1])
 
 
 @utility.recording
@@ -54,15 +367,14 @@ def make_network_speed_graph(
 ) -> None:
     """ネットワーク速度計測結果からグラフを html で出力する
 
+    計測対象毎に別の系列（凡例）とする。
+
     Args:
         csv_file_path (str): ネットワーク速度計測結果ファイルパス
         dest_path (str): 出力レポートファイルパス
     """
 
-    tested_data: dict[str, list[tuple[datetime, float]]] = get_result_csv(csv_file_path)
-
-    download_speed_list: list[tuple[datetime, float]] = tested_data["download_speed"]
-    upload_speed_list: list[tuple[datetime, float]] = tested_data["upload_speed"]
+    targets: dict[str, dict[str, Any]] = group_by_target(get_result_csv(csv_file_path))
 
     bokeh.plotting.reset_output()
 
@@ -97,55 +409,637 @@ def make_network_speed_graph(
         years=[x_format],
     )
 
-    p.vbar(
-        x=[x_value[0] for x_value in download_speed_list],
-        top=[y_value[1] for y_value in download_speed_list],
-        width=20000,
-        fill_color="#8682F5",
-        legend_label="Download speed [MByte/s]",
+    for target_index, (target, tested_data) in enumerate(targets.items()):
+        for series_index, (column, legend_label, color) in enumerate(
+            RANGE_REPORT_SERIES["speed"]
+        ):
+            legend_label, color = get_target_series(
+                legend_label, color, series_index, target, target_index
+            )
+            p.vbar(
+                x=tested_data["tested_datetime"],
+                top=tested_data[column],
+                width=20000,
+                fill_color=color,
+                legend_label=legend_label,
+            )
+
+    p.legend.click_policy = "hide"
+
+    latency_hover_tool = bokeh.models.HoverTool(
+        tooltips=[("Datetime", "@x{%T}"), ("Latency", "@y [ms]")],
+        formatters={"@x": "datetime"},
+        mode="vline",
     )
 
-    p.vbar(
-        x=[x_value[0] for x_value in upload_speed_list],
-        top=[y_value[1] for y_value in upload_speed_list],
-        width=20000,
-        fill_color="#F57E76",
-        legend_label="Upload speed [MByte/s]",
+    latency_p = bokeh.plotting.figure(
+        tools=[latency_hover_tool, "save", "pan", "zoom_in", "zoom_out", "reset"],
+        title="Latency at {0}".format(os.path.basename(csv_file_path)),
+        x_axis_label="Datetime",
+        x_axis_type="datetime",
+        x_range=p.x_range,
+        y_axis_label="Latency [ms]",
+        plot_width=1600,
+        plot_height=400,
     )
+    latency_p.xaxis.formatter = p.xaxis.formatter
 
-    p.legend.click_policy = "hide"
+    for target_index, (target, tested_data) in enumerate(targets.items()):
+        for series_index, (column, legend_label, color) in enumerate(
+            RANGE_REPORT_SERIES["latency"]
+        ):
+            legend_label, color = get_target_series(
+                legend_label, color, series_index, target, target_index
+            )
+            latency_p.line(
+                x=tested_data["tested_datetime"],
+                y=tested_data[column],
+                line_color=color,
+                legend_label=legend_label,
+            )
+
+    latency_p.legend.click_policy = "hide"
+
+    bokeh.plotting.save(bokeh.layouts.column(p, latency_p), filename=dest_path)
+
+
+def iter_day_results(
+    record_dir_path: str, start_date: date, end_date: date
+) -> Iterator[tuple[date, dict[str, Any]]]:
+    """期間内の日付毎のネットワーク速度計測結果を順に読み込む
+
+    1 日分ずつ読み込む為、期間が長くても一度に保持するのは 1 日分となる。
+    計測データ記録ファイルが無い日は飛ばす。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+
+    Yields:
+        Iterator[tuple[date, dict[str, Any]]]: 日付と get_result_csv の結果
+    """
+
+    target_date: date = start_date
 
-    bokeh.plotting.save(p, filename=dest_path)
+    while target_date <= end_date:
+        file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+        file_path: str = os.path.join(record_dir_path, file_name + "_fastcom.csv")
+
+        if os.path.exists(file_path):
+            yield target_date, get_result_csv(file_path)
+
+        target_date += timedelta(days=1)
 
 
 @utility.recording
-def upload_report(
+def downsample_range(
     record_dir_path: str,
-    upload_dir_path: str,
-    target_date: date,
-    is_force: bool = False,
+    start_date: date,
+    end_date: date,
+    points: int = PLOT_WIDTH,
+    method: str = "minmax",
+) -> dict[str, dict[str, dict[str, list[float]]]]:
+    """期間内のネットワーク速度計測結果を日付毎に読み込みながら計測対象毎に間引く
+
+    minmax は期間を points 個のバケットに分け、バケット毎の最小・最大・平均を残す。
+    lttb は 1 日毎に points を日数で割った点数まで Largest-Triangle-Three-Buckets で間引く。
+    別の経路の計測結果が混ざった値とならないよう、どちらも計測対象毎に間引く。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+        points (int): 計測対象・列毎の間引き後の点数の上限
+        method (str): 間引き方法（minmax, lttb）
+
+    Returns:
+        dict[str, dict[str, dict[str, list[float]]]]:
+            計測対象のラベル毎（現れた順）の列名毎の間引き結果、
+            minmax は x, min, max, mean、lttb は x, mean
+    """
+
+    if method not in ("minmax", "lttb"):
+        raise ValueError(f"間引き方法 {method} は不明です。")
+
+    columns: list[str] = [
+        column for series in RANGE_REPORT_SERIES.values() for column, _, _ in series
+    ]
+    epoch_date: date = date(1970, 1, 1)
+    start_ms: float = (start_date - epoch_date).days * 86400000.0
+    end_ms: float = ((end_date - epoch_date).days + 1) * 86400000.0
+    day_points: int = max(3, points // ((end_date - start_date).days + 1))
+
+    aggregators: dict[str, dict[str, downsample.BucketAggregator]] = {}
+    sampled: dict[str, dict[str, dict[str, list[float]]]] = {}
+
+    for _, day_data in iter_day_results(record_dir_path, start_date, end_date):
+        for target, tested_data in group_by_target(day_data).items():
+            if method == "minmax":
+                target_aggregators = aggregators.setdefault(
+                    target,
+                    {
+                        column: downsample.BucketAggregator(start_ms, end_ms, points)
+                        for column in columns
+                    },
+                )
+                x_ms: Any = downsample.to_epoch_milliseconds(
+                    tested_data["tested_datetime"]
+                )
+
+                for column, aggregator in target_aggregators.items():
+                    aggregator.add(x_ms, tested_data[column])
+                continue
+
+            target_sampled = sampled.setdefault(
+                target, {column: {"x": [], "mean": []} for column in columns}
+            )
+            x_list: list[float] = list(
+                downsample.to_epoch_milliseconds(tested_data["tested_datetime"])
+            )
+
+            for column in columns:
+                sampled_x, sampled_y = downsample.lttb(
+                    x_list, list(tested_data[column]), day_points
+                )
+                target_sampled[column]["x"].extend(sampled_x)
+                target_sampled[column]["mean"].extend(sampled_y)
+
+    if method == "minmax":
+        sampled = {
+            target: {
+                column: aggregator.results()
+                for column, aggregator in target_aggregators.items()
+            }
+            for target, target_aggregators in aggregators.items()
+        }
+
+    return sampled
+
+
+@utility.recording
+def make_range_report(
+    record_dir_path: str,
+    start_date: date,
+    end_date: date,
+    dest_path: str,
+    points: int = PLOT_WIDTH,
+    method: str = "minmax",
 ) -> None:
-    """指定日付のネットワーク速度計測結果とグラフをアップロードする
+    """期間内のネットワーク速度計測結果を間引いてグラフを html で出力する
+
+    グラフの点数は列毎に points 以下となる為、期間が長くても html の大きさは一定に収まる。
 
     Args:
-        data_path (str): ネットワーク速度計測結果ディレクトリパス
-        upload_path (str): レポートをアップロード先ディレクトリパス
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+        dest_path (str): 出力レポートファイルパス
+        points (int): 列毎の間引き後の点数の上限
+        method (str): 間引き方法（minmax, lttb）
+    """
+
+    sampled: dict[str, dict[str, dict[str, list[float]]]] = downsample_range(
+        record_dir_path, start_date, end_date, points, method
+    )
+
+    # 計測結果が無い場合も空のグラフを出力する
+    if not sampled:
+        sampled = {
+            "": {
+                column: {"x": [], "min": [], "max": [], "mean": []}
+                for series in RANGE_REPORT_SERIES.values()
+                for column, _, _ in series
+            }
+        }
+
+    period: str = "{0} - {1}".format(
+        start_date.strftime(utility.FORMAT_DATE_SHORT),
+        end_date.strftime(utility.FORMAT_DATE_SHORT),
+    )
+
+    save_sampled_report(sampled, dest_path, f"from {period}")
+
+
+def save_sampled_report(
+    sampled: dict[str, dict[str, dict[str, list[float]]]], dest_path: str, subtitle: str
+) -> None:
+    """間引いたネットワーク速度計測結果のグラフを html で出力する
+
+    計測対象毎に別の系列（凡例）とする。
+
+    Args:
+        sampled (dict[str, dict[str, dict[str, list[float]]]]):
+            計測対象のラベル毎の downsample_range の戻り値と同じ形式の列
+        dest_path (str): 出力レポートファイルパス
+        subtitle (str): グラフのタイトルに付ける期間等
+    """
+
+    bokeh.plotting.reset_output()
+    bokeh.plotting.output_file(dest_path, os.path.basename(dest_path).split(".")[0])
+
+    x_format = "%Y-%m-%d %H:%M"
+    x_formatter = bokeh.models.DatetimeTickFormatter(
+        minutes=[x_format],
+        hours=[x_format],
+        days=["%Y-%m-%d"],
+        months=["%Y-%m"],
+        years=["%Y"],
+    )
+
+    figures: list[Any] = []
+
+    for name, title, y_axis_label, plot_height in (
+        ("speed", "Network Speed", "Network speed [MByte/s]", 800),
+        ("latency", "Latency", "Latency [ms]", 400),
+    ):
+        hover_tool = bokeh.models.HoverTool(
+            tooltips=[("Datetime", "@x{%F %T}"), (title, "@y")],
+            formatters={"@x": "datetime"},
+            mode="vline",
+        )
+
+        p = bokeh.plotting.figure(
+            tools=[hover_tool, "save", "pan", "xwheel_zoom", "reset"],
+            title=f"{title} {subtitle}",
+            x_axis_label="Datetime",
+            x_axis_type="datetime",
+            x_range=figures[0].x_range if figures else None,
+            y_axis_label=y_axis_label,
+            plot_width=PLOT_WIDTH,
+            plot_height=plot_height,
+        )
+        p.xaxis.formatter = x_formatter
+
+        for target_index, (target, target_sampled) in enumerate(sampled.items()):
+            for series_index, (column, legend_label, color) in enumerate(
+                RANGE_REPORT_SERIES[name]
+            ):
+                legend_label, color = get_target_series(
+                    legend_label, color, series_index, target, target_index
+                )
+                values: dict[str, list[float]] = target_sampled[column]
+
+                # バケット内の最小から最大までを帯で示し、外れ値を平均で埋もれさせない
+                if "min" in values:
+                    p.varea(
+                        x=values["x"],
+                        y1=values["min"],
+                        y2=values["max"],
+                        fill_color=color,
+                        fill_alpha=0.3,
+                        legend_label=legend_label,
+                    )
+
+                p.line(
+                    x=values["x"],
+                    y=values["mean"],
+                    line_color=color,
+                    legend_label=legend_label,
+                )
+
+        p.legend.click_policy = "hide"
+        figures.append(p)
+
+    bokeh.plotting.save(bokeh.layouts.column(*figures), filename=dest_path)
+
+
+@utility.recording
+def make_streaming_graph(
+    csv_file_path: str,
+    dest_path: str,
+    bins: int = PLOT_WIDTH,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> None:
+    """ネットワーク速度計測結果を逐次読み込みながら集計し、グラフを html で出力する
+
+    ファイルを chunk_rows 行ずつ読み込んで bins 個の時間幅の区間に集計する為、
+    保持するのは chunk_rows 行と bins 個の集計値となり、ファイルの大きさに依らず
+    メモリ使用量は一定となる。区間毎の平均を線、最小から最大を帯で示し、
+    計測対象毎に別の系列とする。区間はファイル名の日付の 1 日を分けたものとし、ファイル名が日付で始まらない場合のみ
+    ファイルを 1 度読み通して最初と最後の計測日時を求める。
+
+    Args:
+        csv_file_path (str): ネットワーク速度計測結果ファイルパス
+        dest_path (str): 出力レポートファイルパス
+        bins (int): 区間数
+        chunk_rows (int): 1 度に変換する行数
+    """
+
+    columns: list[str] = [
+        column for series in RANGE_REPORT_SERIES.values() for column, _, _ in series
+    ]
+    time_range: tuple[float, float] | None = get_day_range(csv_file_path)
+
+    if time_range is None:
+        time_range = scan_time_range(csv_file_path)
+
+        if time_range is not None:
+            time_range = (time_range[0], time_range[1] + 1)
+
+    start_ms, end_ms = time_range if time_range is not None else (0.0, 1.0)
+
+    aggregators: dict[str, dict[str, downsample.BucketAggregator]] = {}
+
+    for chunk in iter_result_chunks(csv_file_path, chunk_rows):
+        for target, tested_data in group_by_target(chunk).items():
+            if target not in aggregators:
+                aggregators[target] = {
+                    column: downsample.BucketAggregator(start_ms, end_ms, bins)
+                    for column in columns
+                }
+
+            x_ms: Any = downsample.to_epoch_milliseconds(tested_data["tested_datetime"])
+
+            for column, aggregator in aggregators[target].items():
+                aggregator.add(x_ms, tested_data[column])
+
+    # 行が無い場合も空のグラフを出力する
+    if not aggregators:
+        aggregators[""] = {
+            column: downsample.BucketAggregator(start_ms, end_ms, bins)
+            for column in columns
+        }
+
+    save_sampled_report(
+        {
+            target: {
+                column: aggregator.results()
+                for column, aggregator in target_aggregators.items()
+            }
+            for target, target_aggregators in aggregators.items()
+        },
+        dest_path,
+        "at {0}".format(os.path.basename(csv_file_path)),
+    )
+
+
+# 集計レポートの表に出す列と見出し
+SUMMARY_TABLE_COLUMNS: tuple[tuple[str, str, str], ...] = (
+    ("download_speed", "mean", "Download mean"),
+    ("download_speed", "p50", "Download p50"),
+    ("download_speed", "p95", "Download p95"),
+    ("upload_speed", "mean", "Upload mean"),
+    ("upload_speed", "p50", "Upload p50"),
+    ("upload_speed", "p95", "Upload p95"),
+    ("latency", "mean", "Latency mean"),
+    ("latency", "p95", "Latency p95"),
+    ("buffer_bloat", "p95", "Bufferbloat p95"),
+)
+
+
+def merge_aggregates(
+    aggregates: Iterable[dict[str, rollup.Aggregate]]
+) -> dict[str, rollup.Aggregate]:
+    """列毎の集計を列毎に併合する
+
+    Args:
+        aggregates (Iterable[dict[str, rollup.Aggregate]]): 列名に対する集計の並び
+
+    Returns:
+        dict[str, rollup.Aggregate]: 列名に対する併合後の集計
+    """
+
+    merged: dict[str, rollup.Aggregate] = {}
+
+    for columns in aggregates:
+        for name, aggregate in columns.items():
+            merged.setdefault(name, rollup.Aggregate()).merge(aggregate)
+
+    return merged
+
+
+@utility.recording
+def make_summary_report(
+    day_rollups: Iterable[rollup.DayRollup],
+    dest_path: str,
+    title: str,
+    points: int = PLOT_WIDTH,
+) -> None:
+    """日別・時間別の集計から要約の表とグラフを html で出力する
+
+    計測データ記録ファイルは読まず、集計ファイルの件数・最小・最大・平均・分位点だけで作成する。
+    グラフは時間別の点数が points を超える場合に日別とする。
+
+    Args:
+        day_rollups (Iterable[rollup.DayRollup]): 日付順の 1 日分の集計
+        dest_path (str): 出力レポートファイルパス
+        title (str): レポートの表題
+        points (int): 系列毎の点数の上限
+    """
+
+    epoch_date: date = date(1970, 1, 1)
+    hourly: list[tuple[float, dict[str, rollup.Aggregate]]] = []
+    daily: list[tuple[float, dict[str, rollup.Aggregate]]] = []
+    table: dict[str, list[Any]] = {"date": [], "target": [], "count": []}
+    table.update({f"{name}_{stat}": [] for name, stat, _ in SUMMARY_TABLE_COLUMNS})
+    totals: dict[str, list[dict[str, rollup.Aggregate]]] = {}
+
+    def add_table_row(
+        label: str, target: str, columns: dict[str, rollup.Aggregate]
+    ) -> None:
+        summaries: dict[str, dict[str, float]] = {
+            name: aggregate.summary() for name, aggregate in columns.items()
+        }
+        table["date"].append(label)
+        table["target"].append(target)
+        table["count"].append(summaries["download_speed"]["count"])
+
+        for name, stat, _ in SUMMARY_TABLE_COLUMNS:
+            table[f"{name}_{stat}"].append(round(summaries[name][stat], 2))
+
+    for day_rollup in day_rollups:
+        if not day_rollup.days:
+            continue
+
+        day_ms: float = (day_rollup.target_date - epoch_date).days * 86400000.0
+        daily.append((day_ms, merge_aggregates(day_rollup.days.values())))
+
+        for hour in range(24):
+            columns: list[dict[str, rollup.Aggregate]] = [
+                hours[hour] for hours in day_rollup.hours.values() if hour in hours
+            ]
+            if columns:
+                hourly.append((day_ms + hour * 3600000.0, merge_aggregates(columns)))
+
+        for target, day in day_rollup.days.items():
+            add_table_row(
+                day_rollup.target_date.strftime(utility.FORMAT_DATE_SHORT), target, day
+            )
+            totals.setdefault(target, []).append(day)
+
+    for target, days in totals.items():
+        add_table_row("Total", target, merge_aggregates(days))
+
+    buckets = hourly if len(hourly) <= points else daily
+    summaries: list[tuple[float, dict[str, dict[str, float]]]] = [
+        (x, {name: aggregate.summary() for name, aggregate in columns.items()})
+        for x, columns in buckets
+    ]
+    x_values: list[float] = [x for x, _ in summaries]
+
+    bokeh.plotting.reset_output()
+    bokeh.plotting.output_file(dest_path, os.path.basename(dest_path).split(".")[0])
+
+    figures: list[Any] = []
+
+    for name, figure_title, y_axis_label in (
+        ("speed", "Network Speed", "Network speed [MByte/s]"),
+        ("latency", "Latency", "Latency [ms]"),
+    ):
+        p = bokeh.plotting.figure(
+            tools=["save", "pan", "xwheel_zoom", "reset"],
+            title=f"{figure_title} of {title}",
+            x_axis_label="Datetime",
+            x_axis_type="datetime",
+            x_range=figures[0].x_range if figures else None,
+            y_axis_label=y_axis_label,
+            plot_width=PLOT_WIDTH,
+            plot_height=400,
+        )
+
+        for column, legend_label, color in RANGE_REPORT_SERIES[name]:
+            p.varea(
+                x=x_values,
+                y1=[values[column]["min"] for _, values in summaries],
+                y2=[values[column]["max"] for _, values in summaries],
+                fill_color=color,
+                fill_alpha=0.2,
+                legend_label=legend_label,
+            )
+            p.line(
+                x=x_values,
+                y=[values[column]["mean"] for _, values in summaries],
+                line_color=color,
+                legend_label=legend_label,
+            )
+            p.line(
+                x=x_values,
+                y=[values[column]["p95"] for _, values in summaries],
+                line_color=color,
+                line_dash="dashed",
+                legend_label=f"{legend_label} p95",
+            )
+
+        p.legend.click_policy = "hide"
+        figures.append(p)
+
+    data_table = bokeh.models.DataTable(
+        source=bokeh.models.ColumnDataSource(table),
+        columns=[
+            bokeh.models.TableColumn(field="date", title="Date"),
+            bokeh.models.TableColumn(field="target", title="Target"),
+            bokeh.models.TableColumn(field="count", title="Count"),
+            *(
+                bokeh.models.TableColumn(field=f"{name}_{stat}", title=column_title)
+                for name, stat, column_title in SUMMARY_TABLE_COLUMNS
+            ),
+        ],
+        width=PLOT_WIDTH,
+        height=400,
+    )
+
+    bokeh.plotting.save(bokeh.layouts.column(*figures, data_table), filename=dest_path)
+
+
+@utility.recording
+def upload_range_report(
+    record_dir_path: str,
+    upload_dir_path: str,
+    start_date: date,
+    end_date: date,
+    points: int = PLOT_WIDTH,
+    method: str = "minmax",
+) -> str:
+    """期間のネットワーク速度計測結果のグラフを作成してアップロードする
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+        points (int): 列毎の間引き後の点数の上限
+        method (str): 間引き方法（minmax, lttb）
+
+    Returns:
+        str: 作成したレポートファイルパス
+    """
+
+    file_name: str = "{0}_{1}_fastcom.html".format(
+        start_date.strftime(utility.FORMAT_DATE_SHORT),
+        end_date.strftime(utility.FORMAT_DATE_SHORT),
+    )
+    report_path: str = os.path.join(record_dir_path, file_name)
+
+    make_range_report(
+        record_dir_path, start_date, end_date, report_path, points, method
+    )
+    logmng.logger.info(f"{start_date} から {end_date} のグラフを {report_path} に作成しました。")
+
+    if upload_dir_path:
+        uploadsync.sync_files([report_path], upload_dir_path)
+
+    return report_path
+
+
+@utility.recording
+def upload_summary_report(
+    record_dir_path: str,
+    upload_dir_path: str,
+    day_rollups: Iterable[rollup.DayRollup],
+    start_date: date,
+    end_date: date,
+    points: int = PLOT_WIDTH,
+) -> str:
+    """期間の集計から要約レポートを作成してアップロードする
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        day_rollups (Iterable[rollup.DayRollup]): 期間内の日付順の 1 日分の集計
+        start_date (date): 開始日付（含む）
+        end_date (date): 終了日付（含む）
+        points (int): 系列毎の点数の上限
+
+    Returns:
+        str: 作成したレポートファイルパス
+    """
+
+    period: str = "{0}_{1}".format(
+        start_date.strftime(utility.FORMAT_DATE_SHORT),
+        end_date.strftime(utility.FORMAT_DATE_SHORT),
+    )
+    report_path: str = os.path.join(record_dir_path, f"{period}_summary_fastcom.html")
+
+    make_summary_report(day_rollups, report_path, period.replace("_", " - "), points)
+    logmng.logger.info(f"{start_date} から {end_date} の要約を {report_path} に作成しました。")
+
+    if upload_dir_path:
+        uploadsync.sync_files([report_path], upload_dir_path)
+
+    return report_path
+
+
+@utility.recording
+def make_report(
+    record_dir_path: str, target_date: date, is_force: bool = False
+) -> list[str]:
+    """指定日付のネットワーク速度計測結果のグラフを作成する
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
         target_date (date): ネットワーク速度計測結果日付
+        is_force (bool): 既にグラフが有っても作り直すフラグ
+
+    Returns:
+        list[str]: アップロードするファイルパス（計測データ記録ファイルと計測レポート）、
+                   グラフを作成しなかった場合は空のリスト
     """
 
     file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
     file_path: str = os.path.join(record_dir_path, file_name + "_fastcom.csv")
     report_path: str = os.path.join(record_dir_path, file_name + "_fastcom.html")
 
-    # アップロード先確認
-    is_upload_dir_exists: bool = os.path.exists(
-        upload_dir_path
-    ) or upload_dir_path.__contains__(r"\\")
-    if is_upload_dir_exists:
-        os.makedirs(upload_dir_path, exist_ok=True)
-        logmng.logger.info("アップロード先ディレクトリが見つからない為作成しました。")
-        logmng.logger.info(f">> {upload_dir_path}")
-
     # レポート作成
     is_file_exists: bool = os.path.exists(file_path)
     is_report_exists: bool = os.path.exists(report_path)
@@ -154,18 +1048,52 @@ def upload_report(
         logmng.logger.warn("指定日付のネットワーク速度計測結果ファイルが無い為グラフは作成していません。")
         logmng.logger.warn(f">> {file_path}")
     elif not is_report_exists or is_force:
-        make_network_speed_graph(file_path, report_path)
+        # 大きなファイルは全件を保持せず、区間毎に集計したグラフにする
+        if os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES:
+            make_streaming_graph(file_path, report_path)
+        else:
+            make_network_speed_graph(file_path, report_path)
         logmng.logger.info(f"{file_path} のグラフを {report_path} に作成しました。")
 
-        shutil.copy(file_path, upload_dir_path)
-        shutil.copy(report_path, upload_dir_path)
-        logmng.logger.info(
-            f"{file_path} 及び {report_path} を {upload_dir_path} にアップロードしました。"
-        )
+        return [file_path, report_path]
     else:
         logmng.logger.warn("既にグラフが有り、強制作成フラグが False の為グラフは作成していません。")
         logmng.logger.warn(f">> {file_path}")
 
+    return []
+
+
+@utility.recording
+def upload_report(
+    record_dir_path: str,
+    upload_dir_path: str,
+    target_date: date,
+    is_force: bool = False,
+) -> None:
+    """指定日付のネットワーク速度計測結果とグラフをアップロードする
+
+    アップロード先と同じ内容のファイルはコピーしない。
+
+    Args:
+        data_path (str): ネットワーク速度計測結果ディレクトリパス
+        upload_path (str): レポートをアップロード先ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+    """
+
+    # アップロード先確認
+    is_upload_dir_exists: bool = os.path.exists(
+        upload_dir_path
+    ) or upload_dir_path.__contains__(r"\\")
+    if is_upload_dir_exists:
+        os.makedirs(upload_dir_path, exist_ok=True)
+        logmng.logger.info("アップロード先ディレクトリが見つからない為作成しました。")
+        logmng.logger.info(f">> {upload_dir_path}")
+
+    upload_paths: list[str] = make_report(record_dir_path, target_date, is_force)
+
+    if upload_paths:
+        uploadsync.sync_files(upload_paths, upload_dir_path)
+
 
 if __name__ == "__main__":
     logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
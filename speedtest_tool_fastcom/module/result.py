@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import time
+from array import array
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Iterator
+
+from speedtest_tool_fastcom.module import logmng, utility
+
+# 計測データ記録ファイルの現行スキーマバージョン
+SCHEMA_VERSION: int = 3
+
+# スキーマバージョン毎の計測データ記録ファイルの列（SpeedtestResult の属性名）
+# 新しいバージョンは古いバージョンの列の後ろに列を追加する
+CSV_SCHEMAS: dict[int, tuple[str, ...]] = {
+    1: ("tested_datetime", "download_speed", "upload_speed"),
+    2: ("tested_datetime", "download_speed", "upload_speed", "target"),
+    3: (
+        "tested_datetime",
+        "download_speed",
+        "upload_speed",
+        "target",
+        "latency",
+        "buffer_bloat",
+        "downloaded",
+        "uploaded",
+        "user_location",
+        "user_ip",
+    ),
+}
+
+# 列毎の配列で保持する数値の列（SpeedtestResult の属性名）
+NUMERIC_COLUMNS: tuple[str, ...] = (
+    "download_speed",
+    "upload_speed",
+    "latency",
+    "buffer_bloat",
+    "downloaded",
+    "uploaded",
+)
+
+# 計測データ記録ファイルのヘッダ行（速度単位は書式指定で埋める）
+CSV_HEADER: tuple[str, ...] = (
+    "Tested Datetime",
+    "Download Speed({0})",
+    "Upload Speed({0})",
+    "Target",
+    "Latency(ms)",
+    "Bufferbloat(ms)",
+    "Downloaded(MB)",
+    "Uploaded(MB)",
+    "User Location",
+    "User IP",
+)
+
+# 計測失敗記録ファイルのヘッダ行
+FAILURE_CSV_HEADER: tuple[str, ...] = (
+    "Tested Datetime",
+    "Target",
+    "Attempt",
+    "Phase",
+    "Error",
+    "Elapsed(s)",
+)
+
+
+@dataclass
+class PhaseTimings:
+    """1 回の計測の段階毎の所要時間 [s]
+
+    ページ内の段階（first_download, download_done, upload_done）はページ遷移開始からの経過時間、
+    それ以外は段階自体に掛かった時間とする。行われなかった段階は None とする。
+
+    Args:
+        launch (float | None): ブラウザの起動（起動済みを使い回した場合は取得）
+        navigation (float | None): Fast.com への遷移（page.goto）
+        first_download (float | None): 最初のダウンロード速度が表示されるまで
+        download_done (float | None): ダウンロードの計測が完了するまで
+        upload_done (float | None): アップロードの計測が完了するまで
+        close (float | None): ブラウザ（コンテキスト）の終了
+        csv_write (float | None): 計測結果と集計の保存
+        report_build (float | None): レポートの作成とアップロード
+    """
+
+    launch: float | None = None
+    navigation: float | None = None
+    first_download: float | None = None
+    download_done: float | None = None
+    upload_done: float | None = None
+    close: float | None = None
+    csv_write: float | None = None
+    report_build: float | None = None
+
+    @contextlib.contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """with 文の中の処理時間を段階の所要時間に加える
+
+        同じ段階を複数回計った場合は合計する。
+
+        Args:
+            phase (str): 段階名（属性名）
+        """
+
+        started: float = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed: float = time.perf_counter() - started
+            setattr(self, phase, (getattr(self, phase) or 0) + elapsed)
+
+    def set_page_phases(self, page_phases: dict[str, float]) -> None:
+        """ページ内で記録した段階の時刻を取り込む
+
+        Args:
+            page_phases (dict[str, float]): 段階名に対するページ遷移開始からの経過時間 [ms]
+        """
+
+        for phase in ("first_download", "download_done", "upload_done"):
+            if phase in page_phases:
+                setattr(self, phase, page_phases[phase] / 1000)
+
+    def to_dict(self) -> dict[str, float | None]:
+        """ログに出力する形式にする
+
+        Returns:
+            dict[str, float | None]: 段階名に対する所要時間 [s]
+        """
+
+        return asdict(self)
+
+
+@dataclass
+class SpeedtestResult:
+    """ネットワーク速度計測結果
+
+    Args:
+        tested_datetime (datetime): 計測日時
+        download_speed (float): ダウンロード速度 [bit/s] 又は [byte/s]
+        upload_speed (float): アップロード速度 [bit/s] 又は [byte/s]
+        target (str): 計測対象のラベル
+        latency (float): 遅延 [ms]
+        buffer_bloat (float): 負荷時の遅延 [ms]
+        downloaded (float): ダウンロードサイズ [MB]
+        uploaded (float): アップロードサイズ [MB]
+        user_location (str): ユーザ地域
+        user_ip (str): ユーザIP
+        timings (PhaseTimings): 段階毎の所要時間（記録はしない）
+    """
+
+    tested_datetime: datetime
+    download_speed: float
+    upload_speed: float
+    target: str = ""
+    latency: float = 0
+    buffer_bloat: float = 0
+    downloaded: float = 0
+    uploaded: float = 0
+    user_location: str = ""
+    user_ip: str = ""
+    timings: PhaseTimings = field(default_factory=PhaseTimings, compare=False)
+
+    def to_record_values(self) -> tuple[float, ...]:
+        """記録する単位に揃えた数値の列を取得する
+
+        速度は M オーダーに変換する。
+
+        Returns:
+            tuple[float, ...]: NUMERIC_COLUMNS の列順に並べた数値
+        """
+
+        return (
+            utility.change_order(self.download_speed, utility.ValuePrefix.M),
+            utility.change_order(self.upload_speed, utility.ValuePrefix.M),
+            self.latency,
+            self.buffer_bloat,
+            self.downloaded,
+            self.uploaded,
+        )
+
+    def to_csv_row(self) -> tuple[str, ...]:
+        """計測データ記録ファイルの 1 行に整形する
+
+        速度は M オーダーに変換して記録する。
+
+        Returns:
+            tuple[str, ...]: 現行スキーマの列順に並べた文字列
+        """
+
+        return format_csv_row(
+            self.tested_datetime,
+            self.target,
+            self.to_record_values(),
+            self.user_location,
+            self.user_ip,
+        )
+
+    @classmethod
+    def from_csv_row(cls, row: list[str]) -> SpeedtestResult:
+        """計測データ記録ファイルの 1 行から計測結果を復元する
+
+        スキーマは列数で判別する為、古いスキーマの行が混在していても読める。
+        速度は記録されている M オーダーの値のまま復元する。
+
+        Args:
+            row (list[str]): 計測データ記録ファイルの 1 行
+
+        Raises:
+            ValueError: 列数がどのスキーマにも一致しない場合
+
+        Returns:
+            SpeedtestResult: 計測結果
+        """
+
+        version: int | None = get_schema_version(len(row))
+
+        if version is None:
+            raise ValueError(f"計測データ記録ファイルの列数 {len(row)} は不明です。")
+
+        values: dict[str, str] = dict(zip(CSV_SCHEMAS[version], row))
+
+        return cls(
+            tested_datetime=datetime.strptime(
+                values["tested_datetime"], utility.FORMAT_DATE_LONG
+            ),
+            download_speed=float(values["download_speed"]),
+            upload_speed=float(values["upload_speed"]),
+            target=values.get("target", ""),
+            latency=float(values.get("latency", 0)),
+            buffer_bloat=float(values.get("buffer_bloat", 0)),
+            downloaded=float(values.get("downloaded", 0)),
+            uploaded=float(values.get("uploaded", 0)),
+            user_location=values.get("user_location", ""),
+            user_ip=values.get("user_ip", ""),
+        )
+
+
+@dataclass
+class FailureRecord:
+    """失敗した計測の記録
+
+    計測結果の統計を歪めないよう、計測結果とは別のファイルに記録する。
+
+    Args:
+        tested_datetime (datetime): 計測日時
+        target (str): 計測対象のラベル
+        attempt (int): 何回目の試行か（1 始まり）
+        phase (str): 失敗した段階（launch, navigation, download, upload, total）、不明な場合は空文字
+        error (str): エラーの内容
+        elapsed (float): 失敗するまでの所要時間 [s]
+    """
+
+    tested_datetime: datetime
+    target: str
+    attempt: int
+    phase: str
+    error: str
+    elapsed: float
+
+    def to_csv_row(self) -> tuple[str, ...]:
+        """計測失敗記録ファイルの 1 行に整形する
+
+        Returns:
+            tuple[str, ...]: FAILURE_CSV_HEADER の列順に並べた文字列
+        """
+
+        return (
+            self.tested_datetime.strftime(utility.FORMAT_DATE_LONG),
+            self.target,
+            str(self.attempt),
+            self.phase,
+            self.error,
+            f"{self.elapsed:.2f}",
+        )
+
+
+def get_schema_version(column_count: int) -> int | None:
+    """列数から計測データ記録ファイルのスキーマバージョンを判別する
+
+    Args:
+        column_count (int): 列数
+
+    Returns:
+        int | None: スキーマバージョン、一致するスキーマが無い場合は None
+    """
+
+    for version, columns in CSV_SCHEMAS.items():
+        if len(columns) == column_count:
+            return version
+
+    return None
+
+
+def format_csv_row(
+    tested_datetime: datetime,
+    target: str,
+    values: tuple[float, ...],
+    user_location: str = "",
+    user_ip: str = "",
+) -> tuple[str, ...]:
+    """計測データ記録ファイルの 1 行に整形する
+
+    Args:
+        tested_datetime (datetime): 計測日時
+        target (str): 計測対象のラベル
+        values (tuple[float, ...]): 記録する単位に揃えた NUMERIC_COLUMNS の列順の数値
+        user_location (str): ユーザ地域
+        user_ip (str): ユーザIP
+
+    Returns:
+        tuple[str, ...]: 現行スキーマの列順に並べた文字列
+    """
+
+    return (
+        tested_datetime.strftime(utility.FORMAT_DATE_LONG),
+        str(values[0]),
+        str(values[1]),
+        target,
+        *(str(value) for value in values[2:]),
+        user_location,
+        user_ip,
+    )
+
+
+def make_csv_header(convert_byte: bool) -> tuple[str, ...]:
+    """現行スキーマの計測データ記録ファイルのヘッダ行を作成する
+
+    Args:
+        convert_byte (bool): byte にするフラグ
+
+    Returns:
+        tuple[str, ...]: ヘッダ行
+    """
+
+    unit: str = "MByte/s" if convert_byte else "MBit/s"
+
+    return tuple(column.format(unit) for column in CSV_HEADER)
+
+
+class ResultColumns:
+    """1 つの計測対象の計測結果を列毎の配列で保持する
+
+    計測日時はエポック秒の整数、数値は倍精度浮動小数点の array で保持する為、
+    保持している array は numpy.frombuffer でコピー無しに NumPy 配列として扱える
+    （ファイルからの読み込み自体は array へのコピーとなる）。
+    速度は記録時と同じ M オーダーとする。
+    """
+
+    __slots__ = ("timestamps", "columns")
+
+    def __init__(self) -> None:
+        self.timestamps: array = array("q")
+        self.columns: dict[str, array] = {name: array("d") for name in NUMERIC_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: int, values: tuple[float, ...]) -> None:
+        """1 件追加する
+
+        Args:
+            timestamp (int): 計測日時のエポック秒
+            values (tuple[float, ...]): NUMERIC_COLUMNS の列順に並べた数値
+        """
+
+        self.timestamps.append(timestamp)
+
+        for name, value in zip(NUMERIC_COLUMNS, values):
+            self.columns[name].append(value)
+
+    def extend(self, other: ResultColumns) -> None:
+        """別の計測結果を後ろに連結する
+
+        Args:
+            other (ResultColumns): 連結する計測結果
+        """
+
+        self.timestamps.extend(other.timestamps)
+
+        for name in NUMERIC_COLUMNS:
+            self.columns[name].extend(other.columns[name])
+
+    def slice_by_time(self, start: int, end: int) -> ResultColumns:
+        """計測日時が範囲内の計測結果を取り出す
+
+        計測日時は昇順に並んでいる前提で二分探索する。
+
+        Args:
+            start (int): 開始日時のエポック秒（含む）
+            end (int): 終了日時のエポック秒（含まない）
+
+        Returns:
+            ResultColumns: 範囲内の計測結果
+        """
+
+        lower: int = bisect.bisect_left(self.timestamps, start)
+        upper: int = bisect.bisect_left(self.timestamps, end)
+
+        sliced = ResultColumns()
+        sliced.timestamps = self.timestamps[lower:upper]
+        sliced.columns = {
+            name: column[lower:upper] for name, column in self.columns.items()
+        }
+
+        return sliced
+
+    def iter_csv_rows(self, target: str) -> Iterator[tuple[str, ...]]:
+        """計測データ記録ファイルの行として出力する
+
+        Args:
+            target (str): 計測対象のラベル
+
+        Yields:
+            Iterator[tuple[str, ...]]: 現行スキーマの列順に並べた文字列
+        """
+
+        columns: list[array] = [self.columns[name] for name in NUMERIC_COLUMNS]
+
+        for timestamp, *values in zip(self.timestamps, *columns):
+            yield format_csv_row(
+                datetime.fromtimestamp(timestamp), target, tuple(values)
+            )
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
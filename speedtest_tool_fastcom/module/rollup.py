@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from datetime import date, datetime
+from typing import Any
+
+from speedtest_tool_fastcom.module import logmng, utility
+from speedtest_tool_fastcom.module.result import NUMERIC_COLUMNS
+
+# 集計ファイルの形式バージョン
+ROLLUP_VERSION: int = 1
+
+# 分位点スケッチの相対誤差の既定値
+DEFAULT_RELATIVE_ACCURACY: float = 0.01
+
+# 集計結果として出力する分位点
+SUMMARY_QUANTILES: dict[str, float] = {"p50": 0.5, "p95": 0.95}
+
+
+class QuantileSketch:
+    """値を対数幅のビンに数えて分位点を近似する（DDSketch）
+
+    ビンの境界を gamma = (1 + a) / (1 - a) のべき乗とする為、
+    近似した分位点の相対誤差は a 以下となる。保持するのはビン毎の件数のみで、
+    同じ相対誤差のスケッチ同士はビン毎に足し合わせるだけで併合できる。
+
+    Args:
+        relative_accuracy (float): 分位点の相対誤差
+    """
+
+    # これ以下の値は 0 とみなして数える
+    MIN_VALUE: float = 1e-9
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        self.relative_accuracy: float = relative_accuracy
+        self.gamma: float = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma: float = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count: int = 0
+        self.count: int = 0
+
+    def add(self, value: float) -> None:
+        """値を 1 件追加する
+
+        Args:
+            value (float): 値（0 以上）
+        """
+
+        self.count += 1
+
+        if value <= self.MIN_VALUE:
+            self.zero_count += 1
+            return
+
+        index: int = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        """別のスケッチを併合する
+
+        Args:
+            other (QuantileSketch): 同じ相対誤差のスケッチ
+        """
+
+        self.count += other.count
+        self.zero_count += other.zero_count
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float:
+        """分位点を取得する
+
+        Args:
+            q (float): 0 から 1 の分位
+
+        Returns:
+            float: 分位点の近似値、値が無い場合は 0
+        """
+
+        if self.count == 0:
+            return 0.0
+
+        rank: float = q * (self.count - 1)
+
+        if rank < self.zero_count:
+            return 0.0
+
+        seen: int = self.zero_count
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+
+            if seen > rank:
+                # ビン (gamma^(i-1), gamma^i] の相対誤差が最小となる代表値
+                return 2 * self.gamma**index / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        """json に保存できる形式にする
+
+        Returns:
+            dict[str, Any]: スケッチの内容
+        """
+
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "bins": {str(index): count for index, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> QuantileSketch:
+        """to_dict の結果から復元する
+
+        Args:
+            values (dict[str, Any]): スケッチの内容
+
+        Returns:
+            QuantileSketch: スケッチ
+        """
+
+        sketch = cls(values["relative_accuracy"])
+        sketch.zero_count = values["zero_count"]
+        sketch.bins = {int(index): count for index, count in values["bins"].items()}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+
+        return sketch
+
+
+class Aggregate:
+    """1 つの列の件数・最小・最大・合計と分位点スケッチを逐次集計する"""
+
+    __slots__ = ("count", "minimum", "maximum", "total", "sketch")
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.minimum: float = math.inf
+        self.maximum: float = -math.inf
+        self.total: float = 0.0
+        self.sketch = QuantileSketch()
+
+    def add(self, value: float) -> None:
+        """値を 1 件追加する
+
+        Args:
+            value (float): 値
+        """
+
+        self.count += 1
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.total += value
+        self.sketch.add(value)
+
+    def merge(self, other: Aggregate) -> None:
+        """別の集計を併合する
+
+        Args:
+            other (Aggregate): 併合する集計
+        """
+
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.total += other.total
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> dict[str, float]:
+        """集計結果を取得する
+
+        Returns:
+            dict[str, float]: count, min, max, mean, p50, p95
+        """
+
+        if self.count == 0:
+            return {"count": 0, "min": 0, "max": 0, "mean": 0, "p50": 0, "p95": 0}
+
+        return {
+            "count": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": self.total / self.count,
+            **{name: self.sketch.quantile(q) for name, q in SUMMARY_QUANTILES.items()},
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """json に保存できる形式にする
+
+        Returns:
+            dict[str, Any]: 集計の内容
+        """
+
+        return {
+            "count": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "sum": self.total,
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> Aggregate:
+        """to_dict の結果から復元する
+
+        Args:
+            values (dict[str, Any]): 集計の内容
+
+        Returns:
+            Aggregate: 集計
+        """
+
+        aggregate = cls()
+        aggregate.count = values["count"]
+        aggregate.minimum = values["min"]
+        aggregate.maximum = values["max"]
+        aggregate.total = values["sum"]
+        aggregate.sketch = QuantileSketch.from_dict(values["sketch"])
+
+        return aggregate
+
+
+class DayRollup:
+    """1 日分の計測結果を計測対象毎に時間別と日別で集計する
+
+    列は NUMERIC_COLUMNS とし、速度は記録時と同じ M オーダーとする。
+
+    Args:
+        target_date (date): 集計する日付
+    """
+
+    def __init__(self, target_date: date) -> None:
+        self.target_date: date = target_date
+        self.days: dict[str, dict[str, Aggregate]] = {}
+        self.hours: dict[str, dict[int, dict[str, Aggregate]]] = {}
+
+    def add(
+        self, target: str, tested_datetime: datetime, values: tuple[float, ...]
+    ) -> None:
+        """計測結果を 1 件追加する
+
+        Args:
+            target (str): 計測対象のラベル
+            tested_datetime (datetime): 計測日時
+            values (tuple[float, ...]): NUMERIC_COLUMNS の列順に並べた数値
+        """
+
+        if target not in self.days:
+            self.days[target] = {name: Aggregate() for name in NUMERIC_COLUMNS}
+            self.hours[target] = {}
+
+        hours: dict[int, dict[str, Aggregate]] = self.hours[target]
+
+        if tested_datetime.hour not in hours:
+            hours[tested_datetime.hour] = {
+                name: Aggregate() for name in NUMERIC_COLUMNS
+            }
+
+        day: dict[str, Aggregate] = self.days[target]
+        hour: dict[str, Aggregate] = hours[tested_datetime.hour]
+
+        for name, value in zip(NUMERIC_COLUMNS, values):
+            day[name].add(value)
+            hour[name].add(value)
+
+    def to_dict(self) -> dict[str, Any]:
+        """json に保存できる形式にする
+
+        Returns:
+            dict[str, Any]: 集計の内容
+        """
+
+        return {
+            "version": ROLLUP_VERSION,
+            "date": self.target_date.strftime(utility.FORMAT_DATE_SHORT),
+            "targets": {
+                target: {
+                    "day": {
+                        name: aggregate.to_dict() for name, aggregate in day.items()
+                    },
+                    "hours": {
+                        str(hour): {
+                            name: aggregate.to_dict()
+                            for name, aggregate in aggregates.items()
+                        }
+                        for hour, aggregates in self.hours[target].items()
+                    },
+                }
+                for target, day in self.days.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> DayRollup:
+        """to_dict の結果から復元する
+
+        Args:
+            values (dict[str, Any]): 集計の内容
+
+        Returns:
+            DayRollup: 1 日分の集計
+        """
+
+        rollup = cls(date.fromisoformat(values["date"]))
+
+        for target, target_values in values["targets"].items():
+            rollup.days[target] = {
+                name: Aggregate.from_dict(aggregate)
+                for name, aggregate in target_values["day"].items()
+            }
+            rollup.hours[target] = {
+                int(hour): {
+                    name: Aggregate.from_dict(aggregate)
+                    for name, aggregate in aggregates.items()
+                }
+                for hour, aggregates in target_values["hours"].items()
+            }
+
+        return rollup
+
+
+def get_rollup_path(record_dir_path: str, target_date: date) -> str:
+    """指定日付の集計ファイルのパスを取得する
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        target_date (date): 日付
+
+    Returns:
+        str: 集計ファイルパス
+    """
+
+    return os.path.join(
+        record_dir_path,
+        "rollup",
+        f"{target_date.strftime(utility.FORMAT_DATE_SHORT)}_rollup.json",
+    )
+
+
+def load_rollup(file_path: str, target_date: date) -> DayRollup:
+    """集計ファイルを読み込む
+
+    Args:
+        file_path (str): 集計ファイルパス
+        target_date (date): 日付
+
+    Returns:
+        DayRollup: 1 日分の集計、ファイルが無い又は形式が古い場合は空の集計
+    """
+
+    if not os.path.exists(file_path):
+        return DayRollup(target_date)
+
+    with open(file_path, mode="r", encoding="utf-8") as f:
+        values: dict[str, Any] = json.load(f)
+
+    if values.get("version") != ROLLUP_VERSION:
+        logmng.logger.warning(f"形式の異なる集計ファイルは読み込みません。 >> {file_path}")
+        return DayRollup(target_date)
+
+    return DayRollup.from_dict(values)
+
+
+def save_rollup(file_path: str, rollup: DayRollup) -> None:
+    """集計ファイルを保存する
+
+    書き込み途中で中断しても壊れたファイルが残らないよう、一時ファイルに書いてから置き換える。
+
+    Args:
+        file_path (str): 集計ファイルパス
+        rollup (DayRollup): 1 日分の集計
+    """
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path: str = f"{file_path}.{os.getpid()}.tmp"
+
+    with open(temp_path, mode="w", encoding="utf-8") as f:
+        json.dump(rollup.to_dict(), f, separators=(",", ":"))
+
+    os.replace(temp_path, file_path)
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,725 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from speedtest_tool_fastcom.module import (
+    adaptive,
+    browserpool,
+    datacap,
+    httpengine,
+    logmng,
+    metrics,
+    speedtest,
+    utility,
+    watchdog,
+)
+from speedtest_tool_fastcom.module.result import (
+    FailureRecord,
+    PhaseTimings,
+    SpeedtestResult,
+)
+
+# 常駐モードでの計測間隔の既定値 [s]
+DEFAULT_INTERVAL: float = 900
+
+# 同時に計測する対象数の既定値
+DEFAULT_CONCURRENCY: int = 1
+
+
+@dataclass(frozen=True)
+class Target:
+    """計測対象の経路
+
+    Args:
+        label (str): 計測結果に付けるラベル
+        proxy (str): 計測に使うプロキシ、空文字の場合は直接接続する
+        interval (float): 常駐モードでの計測間隔 [s]
+    """
+
+    label: str
+    proxy: str = speedtest.DEFAULT_PROXY
+    interval: float = DEFAULT_INTERVAL
+
+
+@utility.recording
+def load_targets(file_path: str) -> list[Target]:
+    """計測対象定義 json ファイルを読み込む
+
+    ファイルは {"label": ..., "proxy": ..., "interval": ...} のリストとする。
+    proxy, interval は省略可能。
+
+    Args:
+        file_path (str): 計測対象定義 json ファイルパス
+
+    Returns:
+        list[Target]: 計測対象のリスト
+    """
+
+    with open(file_path, mode="r", encoding="utf-8") as f:
+        definitions: list[dict[str, Any]] = json.load(f)
+
+    return [Target(**definition) for definition in definitions]
+
+
+def make_pools(
+    targets: list[Target],
+    recycle_after: int,
+    engine: str = "browser",
+    launch_timeout: float = watchdog.DEFAULT_LAUNCH_TIMEOUT,
+) -> dict[str, browserpool.BrowserPool | None]:
+    """計測対象のプロキシ毎にブラウザプールを作成する
+
+    プロキシはブラウザの起動オプションで指定する為、プロキシが同じ計測対象で
+    ブラウザを共有する。ブラウザを使わない計測方式の場合、プールは None とする。
+
+    Args:
+        targets (list[Target]): 計測対象のリスト
+        recycle_after (int): ブラウザを再起動するまでの計測回数
+        engine (str): 計測方式（httpengine.ENGINES）
+        launch_timeout (float): ブラウザの起動を待つ時間 [s]
+
+    Returns:
+        dict[str, browserpool.BrowserPool | None]: プロキシに対するブラウザプール
+    """
+
+    if engine == "http":
+        return {target.proxy: None for target in targets}
+
+    return {
+        target.proxy: browserpool.BrowserPool(
+            target.proxy, recycle_after, launch_timeout
+        )
+        for target in targets
+    }
+
+
+def log_timings(target: Target, timings: PhaseTimings, is_success: bool) -> None:
+    """1 回の計測の段階毎の所要時間をまとめて 1 件のログに残す
+
+    Args:
+        target (Target): 計測対象
+        timings (PhaseTimings): 段階毎の所要時間
+        is_success (bool): 計測が成功したフラグ
+    """
+
+    logmng.logger.info(
+        {
+            "target": target.label,
+            "outcome": "success" if is_success else "failure",
+            "timings": timings.to_dict(),
+        }
+    )
+
+
+def make_failure(
+    target: Target,
+    test_datetime: datetime,
+    attempt: int,
+    error: Exception,
+    elapsed: float,
+) -> FailureRecord:
+    """失敗した計測の記録を作成する
+
+    Args:
+        target (Target): 計測対象
+        test_datetime (datetime): 計測日時
+        attempt (int): 何回目の試行か（1 始まり）
+        error (Exception): 計測に失敗した原因
+        elapsed (float): 失敗するまでの所要時間 [s]
+
+    Returns:
+        FailureRecord: 失敗した計測の記録
+    """
+
+    if isinstance(error, watchdog.PhaseError):
+        phase: str = error.phase
+        reason: str = error.reason
+    else:
+        phase = ""
+        reason = f"{type(error).__name__}: {error}"
+
+    return FailureRecord(test_datetime, target.label, attempt, phase, reason, elapsed)
+
+
+async def run_once(
+    target: Target,
+    pool: browserpool.BrowserPool | None,
+    convert_byte: bool,
+    timeout: float,
+    stop_rule: datacap.StopRule | None = None,
+    ledger: datacap.BudgetLedger | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    attempt: int = 1,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> SpeedtestResult | None:
+    """1 日の転送量の残りが有れば 1 回計測し、転送した量を記録する
+
+    1 回の計測の転送量の上限は、stop_rule の上限と 1 日の残りの転送量の小さい方とする。
+
+    Args:
+        target (Target): 計測対象
+        pool (browserpool.BrowserPool | None): 計測対象のプロキシのブラウザプール、
+            None の場合はブラウザを使わずに httpengine で計測する
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        ledger (datacap.BudgetLedger | None): 計測を跨いで記録する 1 日の転送量
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        attempt (int): 何回目の試行か（1 始まり）
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+
+    Returns:
+        SpeedtestResult | None: 計測結果、計測に失敗したか転送量の上限に達している場合は None
+    """
+
+    if ledger is None:
+        return await measure_once(
+            target,
+            pool,
+            convert_byte,
+            timeout,
+            stop_rule,
+            phase_timeouts,
+            attempt,
+            on_failure,
+        )
+
+    remaining_mb: float = ledger.get_remaining_mb(datetime.now())
+
+    if remaining_mb <= 0:
+        logmng.logger.warning(
+            f"1 日の転送量の上限（{ledger.budget.daily_mb} MB）に達した為、{target.label} を計測しません。"
+        )
+        return None
+
+    tested_network_data: SpeedtestResult | None = await measure_once(
+        target,
+        pool,
+        convert_byte,
+        timeout,
+        (stop_rule or datacap.StopRule()).limit(remaining_mb),
+        phase_timeouts,
+        attempt,
+        on_failure,
+    )
+
+    if tested_network_data is not None:
+        ledger.consume(
+            tested_network_data.downloaded + tested_network_data.uploaded,
+            datetime.now(),
+        )
+
+    return tested_network_data
+
+
+async def measure_once(
+    target: Target,
+    pool: browserpool.BrowserPool | None,
+    convert_byte: bool,
+    timeout: float,
+    stop_rule: datacap.StopRule | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    attempt: int = 1,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> SpeedtestResult | None:
+    """ブラウザプールのブラウザで 1 回計測する
+
+    段階毎の所要時間は計測結果の timings に記録する。
+    計測に失敗した場合はその時点までの所要時間をログに残し、失敗した計測の記録を on_failure に渡す。
+    失敗したブラウザは固まっている場合が有る為、タイムアウトでも再起動させる。
+
+    Args:
+        target (Target): 計測対象
+        pool (browserpool.BrowserPool | None): 計測対象のプロキシのブラウザプール、
+            None の場合はブラウザを使わずに httpengine で計測する
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        attempt (int): 何回目の試行か（1 始まり）
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+
+    Returns:
+        SpeedtestResult | None: 計測結果、計測に失敗した場合は None
+    """
+
+    test_datetime: datetime = datetime.now()
+    timings = PhaseTimings()
+
+    if pool is None:
+        return await run_once_without_browser(
+            target,
+            test_datetime,
+            timings,
+            convert_byte,
+            timeout,
+            stop_rule,
+            phase_timeouts,
+            attempt,
+            on_failure,
+        )
+
+    started: float = time.perf_counter()
+    launch_count: int = pool.launch_count
+
+    try:
+        with timings.measure("launch"):
+            browser = await pool.acquire()
+    except Exception as e:
+        logmng.logger.exception(f"{target.label} の計測に使うブラウザを起動できませんでした。")
+        metrics.registry.observe_run(target.label, timings.launch, None)
+        log_timings(target, timings, False)
+        if on_failure is not None:
+            on_failure(
+                make_failure(
+                    target, test_datetime, attempt, e, time.perf_counter() - started
+                )
+            )
+        return None
+
+    # 起動済みのブラウザを使い回した場合は、起動時間として数えない
+    launch_seconds: float | None = (
+        timings.launch if pool.launch_count > launch_count else None
+    )
+    started = time.perf_counter()
+
+    try:
+        result: dict[str, float | str] = await speedtest.measure_on_browser(
+            browser,
+            timeout,
+            timings,
+            stop_rule=stop_rule,
+            phase_timeouts=phase_timeouts,
+        )
+    except Exception as e:
+        # 常駐を続ける為、ブラウザの異常は再起動で回復させる
+        if not isinstance(e, asyncio.TimeoutError):
+            logmng.logger.exception(f"{target.label} の計測中にブラウザが異常終了しました。")
+        await pool.release(is_crashed=True)
+        metrics.registry.observe_run(target.label, launch_seconds, None)
+        log_timings(target, timings, False)
+        if on_failure is not None:
+            on_failure(
+                make_failure(
+                    target, test_datetime, attempt, e, time.perf_counter() - started
+                )
+            )
+        return None
+
+    measure_seconds: float = time.perf_counter() - started
+    await pool.release()
+
+    tested_network_data: SpeedtestResult = speedtest.format_result(
+        test_datetime, result, convert_byte, target.label, timings
+    )
+    metrics.registry.observe_run(target.label, launch_seconds, measure_seconds)
+    metrics.registry.set_result(tested_network_data, convert_byte)
+
+    return tested_network_data
+
+
+async def run_once_without_browser(
+    target: Target,
+    test_datetime: datetime,
+    timings: PhaseTimings,
+    convert_byte: bool,
+    timeout: float,
+    stop_rule: datacap.StopRule | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    attempt: int = 1,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> SpeedtestResult | None:
+    """ブラウザを使わずに httpengine で 1 回計測する
+
+    Args:
+        target (Target): 計測対象
+        test_datetime (datetime): 計測日時
+        timings (PhaseTimings): 段階毎の所要時間
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        attempt (int): 何回目の試行か（1 始まり）
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+
+    Returns:
+        SpeedtestResult | None: 計測結果、計測に失敗した場合は None
+    """
+
+    started: float = time.perf_counter()
+
+    try:
+        result: dict[str, float | str] = await httpengine.get_network_info(
+            timeout,
+            target.proxy,
+            timings,
+            stop_rule=stop_rule,
+            phase_timeouts=phase_timeouts,
+        )
+    except Exception as e:
+        if not isinstance(e, asyncio.TimeoutError):
+            logmng.logger.exception(f"{target.label} の計測に失敗しました。")
+        metrics.registry.observe_run(target.label, None, None)
+        log_timings(target, timings, False)
+        if on_failure is not None:
+            on_failure(
+                make_failure(
+                    target, test_datetime, attempt, e, time.perf_counter() - started
+                )
+            )
+        return None
+
+    measure_seconds: float = time.perf_counter() - started
+
+    tested_network_data: SpeedtestResult = speedtest.format_result(
+        test_datetime, result, convert_byte, target.label, timings
+    )
+    metrics.registry.observe_run(target.label, None, measure_seconds)
+    metrics.registry.set_result(tested_network_data, convert_byte)
+
+    return tested_network_data
+
+
+async def deliver_result(
+    target: Target,
+    tested_network_data: SpeedtestResult,
+    on_result: Callable[[SpeedtestResult], None],
+    executor: Executor,
+) -> None:
+    """計測結果を受け取る処理をイベントループの外で実行し、計測の所要時間を記録する
+
+    記録やレポート作成の間も他の計測対象の計測を進め、失敗しても計測は続ける。
+
+    Args:
+        target (Target): 計測対象
+        tested_network_data (SpeedtestResult): 計測結果
+        on_result (Callable[[SpeedtestResult], None]): 計測結果を受け取る処理
+        executor (Executor): on_result を実行するスレッド
+    """
+
+    try:
+        await asyncio.get_event_loop().run_in_executor(
+            executor, on_result, tested_network_data
+        )
+    except Exception:
+        logmng.logger.exception(f"{target.label} の計測結果の記録に失敗しました。")
+
+    log_timings(target, tested_network_data.timings, True)
+
+
+def make_result_executor() -> ThreadPoolExecutor:
+    """計測結果を受け取る処理を実行するスレッドを作成する
+
+    計測結果の記録ファイルやレポートを複数の計測対象から同時に書かないよう、1 つのスレッドで順に実行する。
+
+    Returns:
+        ThreadPoolExecutor: 計測結果を受け取る処理を実行するスレッド
+    """
+
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="on_result")
+
+
+async def run_with_retry(
+    target: Target,
+    pool: browserpool.BrowserPool | None,
+    semaphore: asyncio.Semaphore,
+    convert_byte: bool,
+    timeout: float,
+    stop_rule: datacap.StopRule | None = None,
+    ledger: datacap.BudgetLedger | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    retry: watchdog.RetryPolicy | None = None,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> SpeedtestResult | None:
+    """計測に失敗した場合は待ち時間を延ばしながらやり直す
+
+    同時計測数の枠は試行毎に取り、やり直すまでの待ち時間は枠を空けて待つ。
+    転送量の上限に達して計測しなかった場合はやり直さない。
+
+    Args:
+        target (Target): 計測対象
+        pool (browserpool.BrowserPool | None): 計測対象のプロキシのブラウザプール
+        semaphore (asyncio.Semaphore): 同時計測数の制限
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        ledger (datacap.BudgetLedger | None): 計測を跨いで記録する 1 日の転送量
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        retry (watchdog.RetryPolicy | None): やり直し方、None の場合はやり直さない
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+
+    Returns:
+        SpeedtestResult | None: 計測結果、全ての試行に失敗したか転送量の上限に達している場合は None
+    """
+
+    retries: int = retry.retries if retry is not None else 0
+    failures: list[FailureRecord] = []
+
+    def record_failure(failure: FailureRecord) -> None:
+        failures.append(failure)
+
+        if on_failure is not None:
+            on_failure(failure)
+
+    for attempt in range(1, retries + 2):
+        async with semaphore:
+            tested_network_data: SpeedtestResult | None = await run_once(
+                target,
+                pool,
+                convert_byte,
+                timeout,
+                stop_rule,
+                ledger,
+                phase_timeouts,
+                attempt,
+                record_failure,
+            )
+
+        if tested_network_data is not None or len(failures) < attempt:
+            return tested_network_data
+
+        if attempt <= retries:
+            delay: float = retry.get_delay(attempt)
+            logmng.logger.warning(
+                f"{target.label} の計測に失敗した為、{delay:.0f} 秒後にやり直します。"
+                f"（{attempt}/{retries}）"
+            )
+            await asyncio.sleep(delay)
+
+    logmng.logger.error(f"{target.label} の計測に {retries + 1} 回失敗しました。")
+
+    return None
+
+
+async def run_target_loop(
+    target: Target,
+    on_result: Callable[[SpeedtestResult], None],
+    pool: browserpool.BrowserPool | None,
+    semaphore: asyncio.Semaphore,
+    convert_byte: bool,
+    timeout: float,
+    executor: Executor,
+    schedule: adaptive.AdaptiveSchedule | None = None,
+    stop_rule: datacap.StopRule | None = None,
+    ledger: datacap.BudgetLedger | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    retry: watchdog.RetryPolicy | None = None,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> None:
+    """計測対象の計測間隔で計測を繰り返す
+
+    schedule が有る場合は、計測結果に応じて計測間隔を変える。
+
+    Args:
+        target (Target): 計測対象
+        on_result (Callable[[SpeedtestResult], None]): 計測結果を受け取る処理
+        pool (browserpool.BrowserPool | None): 計測対象のプロキシのブラウザプール
+        semaphore (asyncio.Semaphore): 同時計測数の制限
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        executor (Executor): on_result を実行するスレッド
+        schedule (adaptive.AdaptiveSchedule | None): 計測対象の計測間隔の調整
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        ledger (datacap.BudgetLedger | None): 計測を跨いで記録する 1 日の転送量
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        retry (watchdog.RetryPolicy | None): 失敗した計測のやり直し方、None の場合はやり直さない
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+    """
+
+    next_run: float = time.monotonic()
+
+    while True:
+        tested_network_data: SpeedtestResult | None = await run_with_retry(
+            target,
+            pool,
+            semaphore,
+            convert_byte,
+            timeout,
+            stop_rule,
+            ledger,
+            phase_timeouts,
+            retry,
+            on_failure,
+        )
+
+        if tested_network_data is not None:
+            await deliver_result(target, tested_network_data, on_result, executor)
+
+        interval: float = target.interval
+
+        if schedule is not None:
+            interval = schedule.next_interval(tested_network_data, datetime.now())
+            logmng.logger.info(
+                {
+                    "target": target.label,
+                    "adaptive": {
+                        "score": schedule.score,
+                        "interval": round(interval, 1),
+                        "used_mb": round(schedule.budget.used_mb, 2),
+                    },
+                }
+            )
+
+        # 計測に掛かった時間に依らず、開始時刻の間隔を一定にする
+        next_run = max(next_run + interval, time.monotonic())
+        await asyncio.sleep(max(0, next_run - time.monotonic()))
+
+
+async def run_daemon(
+    targets: list[Target],
+    on_result: Callable[[SpeedtestResult], None],
+    convert_byte: bool,
+    timeout: float = speedtest.DEFAULT_TIMEOUT,
+    recycle_after: int = browserpool.DEFAULT_RECYCLE_AFTER,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    engine: str = "browser",
+    adaptive_config: adaptive.AdaptiveConfig | None = None,
+    stop_rule: datacap.StopRule | None = None,
+    ledger: datacap.BudgetLedger | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    retry: watchdog.RetryPolicy | None = None,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> None:
+    """ブラウザを起動したまま、計測対象毎の計測間隔で計測を繰り返す
+
+    全ての計測対象を 1 つのイベントループ上のタスクとして並行に動かし、
+    同時に計測する数は concurrency までに制限する。
+    ledger が有る場合、計測間隔の調整は ledger の転送量の上限を共有する。
+
+    Args:
+        targets (list[Target]): 計測対象のリスト
+        on_result (Callable[[SpeedtestResult], None]): 計測結果を受け取る処理
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        recycle_after (int): ブラウザを再起動するまでの計測回数
+        concurrency (int): 同時に計測する対象数
+        engine (str): 計測方式（httpengine.ENGINES）
+        adaptive_config (adaptive.AdaptiveConfig | None): 計測間隔の調整の設定、None の場合は間隔を変えない
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        ledger (datacap.BudgetLedger | None): 計測を跨いで記録する 1 日の転送量
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        retry (watchdog.RetryPolicy | None): 失敗した計測のやり直し方、None の場合はやり直さない
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+    """
+
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
+
+    pools: dict[str, browserpool.BrowserPool | None] = make_pools(
+        targets, recycle_after, engine, phase_timeouts.launch
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    schedules: list[adaptive.AdaptiveSchedule | None] = (
+        [None] * len(targets)
+        if adaptive_config is None
+        else adaptive.make_schedules(
+            adaptive_config,
+            [target.interval for target in targets],
+            ledger.budget if ledger is not None else None,
+        )
+    )
+    executor: ThreadPoolExecutor = make_result_executor()
+
+    try:
+        await asyncio.gather(
+            *(
+                run_target_loop(
+                    target,
+                    on_result,
+                    pools[target.proxy],
+                    semaphore,
+                    convert_byte,
+                    timeout,
+                    executor,
+                    schedule,
+                    stop_rule,
+                    ledger,
+                    phase_timeouts,
+                    retry,
+                    on_failure,
+                )
+                for target, schedule in zip(targets, schedules)
+            )
+        )
+    finally:
+        executor.shutdown()
+
+        for pool in pools.values():
+            if pool is not None:
+                await pool.close()
+
+
+async def run_targets_once(
+    targets: list[Target],
+    on_result: Callable[[SpeedtestResult], None],
+    convert_byte: bool,
+    timeout: float = speedtest.DEFAULT_TIMEOUT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    engine: str = "browser",
+    stop_rule: datacap.StopRule | None = None,
+    ledger: datacap.BudgetLedger | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+    retry: watchdog.RetryPolicy | None = None,
+    on_failure: Callable[[FailureRecord], None] | None = None,
+) -> None:
+    """全ての計測対象を 1 回ずつ計測する
+
+    Args:
+        targets (list[Target]): 計測対象のリスト
+        on_result (Callable[[SpeedtestResult], None]): 計測結果を受け取る処理
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        concurrency (int): 同時に計測する対象数
+        engine (str): 計測方式（httpengine.ENGINES）
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        ledger (datacap.BudgetLedger | None): 計測を跨いで記録する 1 日の転送量
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+        retry (watchdog.RetryPolicy | None): 失敗した計測のやり直し方、None の場合はやり直さない
+        on_failure (Callable[[FailureRecord], None] | None): 失敗した計測の記録を受け取る処理
+    """
+
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
+
+    pools: dict[str, browserpool.BrowserPool | None] = make_pools(
+        targets, len(targets), engine, phase_timeouts.launch
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_target(target: Target) -> None:
+        tested_network_data: SpeedtestResult | None = await run_with_retry(
+            target,
+            pools[target.proxy],
+            semaphore,
+            convert_byte,
+            timeout,
+            stop_rule,
+            ledger,
+            phase_timeouts,
+            retry,
+            on_failure,
+        )
+
+        if tested_network_data is not None:
+            await deliver_result(target, tested_network_data, on_result, executor)
+
+    executor: ThreadPoolExecutor = make_result_executor()
+
+    try:
+        await asyncio.gather(*(run_target(target) for target in targets))
+    finally:
+        executor.shutdown()
+
+        for pool in pools.values():
+            if pool is not None:
+                await pool.close()
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -2,13 +2,112 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import subprocess
+import time
 from datetime import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any, Awaitable
+
+from speedtest_tool_fastcom.module import (
+    datacap,
+    interception,
+    logmng,
+    utility,
+    watchdog,
+)
+from speedtest_tool_fastcom.module.result import PhaseTimings, SpeedtestResult
+
+if TYPE_CHECKING:
+    # pyppeteer は読み込みに時間が掛かる為、ブラウザを起動する関数の中で読み込む
+    from pyppeteer.browser import Browser
+    from pyppeteer.network_manager import Response
+    from pyppeteer.page import Page, Request
+
+# 計測に使うプロキシの既定値
+DEFAULT_PROXY: str = "http://vproxy.cns.tayoreru.com:8080"
+
+# 計測するページの URL
+FASTCOM_URL: str = "https://fast.com/"
+
+# 1 回の計測全体のタイムアウト既定値 [s]
+DEFAULT_TIMEOUT: float = 180
+
+# ダウンロードの計測完了を判定するスクリプト
+DOWNLOAD_DONE_SCRIPT: str = """
+() => document.querySelector("#speed-value.succeeded") !== null
+"""
+
+# ダウンロードとアップロードの計測完了を判定するスクリプト
+DONE_SCRIPT: str = """
+() => document.querySelector("#speed-value.succeeded") !== null
+    && document.querySelector("#upload-value.succeeded") !== null
+"""
+
+# Fast.com の計測値と完了フラグをページ内で一括取得するスクリプト
+# 数値でない表示は NaN となり CDP では null で届く為、0 とする
+SNAPSHOT_SCRIPT: str = """
+() => {
+    const text = (selector) => {
+        const elm = document.querySelector(selector);
+        return elm === null ? "" : elm.textContent.trim();
+    };
+    const succeeded = (selector) =>
+        document.querySelector(selector + ".succeeded") !== null;
 
-from pyppeteer import launch
-from pyppeteer.page import Request
-
-from speedtest_tool_fastcom.module import logmng, utility
+    return {
+        download_speed: Number(text("#speed-value")) || 0,
+        download_units: text("#speed-units"),
+        downloaded: Number(text("#down-mb-value")) || 0,
+        upload_speed: Number(text("#upload-value")) || 0,
+        upload_units: text("#upload-units"),
+        uploaded: Number(text("#up-mb-value")) || 0,
+        latency: Number(text("#latency-value")) || 0,
+        buffer_bloat: Number(text("#bufferbloat-value")) || 0,
+        user_location: text("#user-location"),
+        user_ip: text("#user-ip"),
+        is_download_done: succeeded("#speed-value"),
+        is_done: succeeded("#speed-value") && succeeded("#upload-value"),
+        phases: window.__fastcomPhases || {},
+    };
+}
+"""
+
+# ページ遷移開始からの各段階の経過時間 [ms] をページ内で記録するスクリプト
+# ページのスクリプトより先に実行させ、DOM の変更を監視して最初に満たした時刻を残す
+PHASE_SCRIPT: str = """
+() => {
+    const phases = {};
+    window.__fastcomPhases = phases;
+
+    const mark = (name, isReached) => {
+        if (phases[name] === undefined && isReached) {
+            phases[name] = performance.now();
+        }
+    };
+    const observer = new MutationObserver(() => {
+        const speed = document.querySelector("#speed-value");
+        const upload = document.querySelector("#upload-value");
+
+        if (speed !== null) {
+            mark("first_download", Number(speed.textContent) > 0);
+            mark("download_done", speed.classList.contains("succeeded"));
+        }
+        if (upload !== null) {
+            mark("upload_done", upload.classList.contains("succeeded"));
+        }
+        if (phases.upload_done !== undefined) {
+            observer.disconnect();
+        }
+    });
+
+    observer.observe(document, {
+        subtree: true,
+        childList: true,
+        characterData: true,
+        attributes: true,
+        attributeFilter: ["class"],
+    });
+}
+"""
 
 
 async def handle_request(request: Request) -> Any:
@@ -31,8 +130,120 @@ async def handle_request(request: Request) -> Any:
         return await request.abort()
 
 
+async def get_snapshot(page: Page) -> dict[str, Any]:
+    """Fast.com の計測値と完了フラグを 1 回の evaluate でまとめて取得する
+
+    要素毎に querySelector と evaluate を行うと 1 回のポーリングで 20 往復以上の
+    CDP メッセージが発生する為、ページ内で全て読み取ってから返す。
+
+    Args:
+        page (Page): Fast.com を開いているページ
+
+    Returns:
+        dict[str, Any]: get_network_info_from_fastcom の戻り値に
+                        ダウンロードと全体の完了フラグ（key: is_download_done, is_done）と
+                        ページ内の段階の経過時間 [ms]（key: phases）を加えたもの
+    """
+
+    return await page.evaluate(SNAPSHOT_SCRIPT)
+
+
+async def wait_for_done(page: Page, timeout: float = DEFAULT_TIMEOUT) -> dict[str, Any]:
+    """Fast.com の計測完了を待ち、完了時点の計測値を取得する
+
+    一定間隔でのポーリングではなく、DOM の変更（.succeeded の付与）を
+    ページ内で監視して完了を検知する。
+
+    Args:
+        page (Page): Fast.com を開いているページ
+        timeout (float): 計測完了待ちのタイムアウト [s]、0 の場合は待ち続ける
+
+    Raises:
+        pyppeteer.errors.TimeoutError: タイムアウトまでに計測が完了しなかった場合
+
+    Returns:
+        dict[str, Any]: get_snapshot の戻り値
+    """
+
+    await page.waitForFunction(
+        DONE_SCRIPT, {"polling": "mutation", "timeout": max(0, timeout) * 1000}
+    )
+
+    return await get_snapshot(page)
+
+
+async def wait_for_stop(
+    page: Page,
+    stop_rule: datacap.StopRule,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+) -> dict[str, Any]:
+    """Fast.com の計測完了か、計測を途中で止める条件を満たすまで待ち、その時点の計測値を取得する
+
+    ページがダウンロードとアップロードの計測時間を決め、ダウンロードだけを途中で
+    終わらせる手段が無い為、--quick でもダウンロードはページの完了を待ち、
+    アップロードの速度が安定した時点で止める。ダウンロード中に止めると
+    アップロードが 0 の計測結果となり、集計やレポートを歪める為である。
+    転送量の上限に達した場合はどの段階でも止め、その時点の表示値（未計測の値は 0）とする。
+
+    Args:
+        page (Page): Fast.com を開いているページ
+        stop_rule (datacap.StopRule): 計測を途中で止める条件
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+
+    Raises:
+        watchdog.PhaseTimeoutError: ダウンロード又はアップロードがタイムアウトした場合
+
+    Returns:
+        dict[str, Any]: get_snapshot の戻り値
+    """
+
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
+
+    started: float = time.perf_counter()
+    upload_started: float | None = None
+    upload_detector = datacap.StabilityDetector(stop_rule.tolerance)
+
+    while True:
+        snapshot: dict[str, Any] = await get_snapshot(page)
+        now: float = time.perf_counter()
+
+        if snapshot["is_done"]:
+            return snapshot
+
+        transferred_mb: float = snapshot["downloaded"] + snapshot["uploaded"]
+
+        if stop_rule.max_test_mb > 0 and transferred_mb >= stop_rule.max_test_mb:
+            logmng.logger.info(f"転送量が上限に達した為、{now - started:.1f} 秒で止めました。")
+            return snapshot
+
+        if snapshot["is_download_done"] and upload_started is None:
+            upload_started = now
+
+        if upload_started is None:
+            if 0 < phase_timeouts.download <= now - started:
+                raise watchdog.PhaseTimeoutError("download", phase_timeouts.download)
+        elif 0 < phase_timeouts.upload <= now - upload_started:
+            raise watchdog.PhaseTimeoutError("upload", phase_timeouts.upload)
+
+        if stop_rule.is_quick and upload_started is not None:
+            # 計測中に単位が変わりうる為、bit/s に揃えてから比べる
+            upload_detector.add(
+                utility.clear_order(snapshot["upload_speed"], snapshot["upload_units"]),
+                now - upload_started,
+            )
+
+            if upload_detector.is_stable():
+                logmng.logger.info(f"アップロード速度が安定した為、{now - started:.1f} 秒で止めました。")
+                return snapshot
+
+        await asyncio.sleep(datacap.SAMPLE_INTERVAL)
+
+
 @utility.recording
 async def get_screenshot(url: str) -> None:
+    from pyppeteer import launch
+
     browser = await launch(logLevel=logging.WARNING)
     page = await browser.newPage()
 
@@ -47,154 +258,246 @@ async def get_screenshot(url: str) -> None:
     await browser.close()
 
 
-@utility.recording
-async def get_network_info_from_fastcom() -> dict[str, float | str]:
-    """Fast.com でネットワーク速度結果を取得する
+async def launch_browser(
+    proxy: str = DEFAULT_PROXY,
+    timeout: float = watchdog.DEFAULT_LAUNCH_TIMEOUT,
+) -> Browser:
+    """計測用のブラウザを起動する
+
+    POSIX ではブラウザを新しいセッションで起動してプロセスグループのリーダーとする。
+    起動に失敗した場合は起動しかけたプロセスを子孫ごと強制終了し、
+    起動したブラウザは watchdog に登録して異常終了時にも残さない。
+
+    Args:
+        proxy (str): 計測に使うプロキシ、空文字の場合は直接接続する
+        timeout (float): 起動を待つ時間 [s]、0 の場合は待ち続ける
+
+    Raises:
+        watchdog.PhaseError: 起動に失敗した場合
 
     Returns:
-        dict[str, float | str]: "download_speed": ダウンロード速度
-                                "download_unit": ダウンロード速度単位
-                                "downloaded": ダウンロードサイズ
-                                "upload_speed": アップロード速度
-                                "upload_unit": アップロード速度単位
-                                "uploaded": アップロードサイズ
-                                "latency": 遅延
-                                "buffer_bloat": バッファブロート？
-                                "user_location": ユーザ地域
-                                "user_ip": ユーザIP
+        Browser: 起動したブラウザ
     """
 
-    target_url: str = "https://fast.com/"
+    from pyppeteer.launcher import Launcher
 
-    browser = await launch(
-        {"args": ["--proxy-server=http://vproxy.cns.tayoreru.com:8080"]},
+    args: list[str] = [f"--proxy-server={proxy}"] if proxy else []
+    launcher = Launcher(
+        {"args": args},
         ignoreDefaultArgs=["--disable-extensions"],
         logLevel=logging.WARNING,
+        timeout=max(0, timeout) * 1000,
     )
-    page = await browser.newPage()
+    # 孤立したレンダラ等もプロセスグループごと終了させられるよう、新しいセッションで起動する
+    launcher.cmd = watchdog.in_new_session(launcher.cmd)
 
-    # リソースタイプを指定するため割り込みを有効にする
-    await page.setRequestInterception(True)
-    page.on("request", lambda request: asyncio.ensure_future(handle_request(request)))
-
-    await page.goto(target_url)
-
-    is_done: bool = False
-    download_speed: float = 0
-    download_units: str = ""
-    downloaded: float = 0
-    upload_speed: float = 0
-    upload_units: str = ""
-    uploaded: float = 0
-    latency: float = 0
-    buffer_bloat: float = 0
-    user_location: str = ""
-    user_ip: str = ""
-
-    while not is_done:
-        download_speed = await page.evaluate(
-            "(elm) => Number(elm.textContent.trim())",
-            await page.querySelector("#speed-value"),
+    try:
+        browser: Browser = await watchdog.run_phase(
+            "launch", launcher.launch(), timeout
         )
+    except watchdog.PhaseError:
+        process: subprocess.Popen | None = getattr(launcher, "proc", None)
 
-        download_units = await page.evaluate(
-            "(elm) => elm.textContent.trim()", await page.querySelector("#speed-units")
-        )
+        if process is not None:
+            watchdog.kill_processes(watchdog.get_process_tree(process.pid))
+        raise
 
-        downloaded = await page.evaluate(
-            "(elm) => Number(elm.textContent.trim())",
-            await page.querySelector("#down-mb-value"),
-        )
+    watchdog.register_browser(browser.process.pid)
 
-        upload_speed = await page.evaluate(
-            "(elm) => Number(elm.textContent.trim())",
-            await page.querySelector("#upload-value"),
-        )
+    return browser
 
-        upload_units = await page.evaluate(
-            "(elm) => elm.textContent.trim()", await page.querySelector("#upload-units")
-        )
 
-        uploaded = await page.evaluate(
-            "(elm) => Number(elm.textContent.trim())",
-            await page.querySelector("#up-mb-value"),
-        )
+async def measure_on_browser(
+    browser: Browser,
+    timeout: float = DEFAULT_TIMEOUT,
+    timings: PhaseTimings | None = None,
+    url: str = FASTCOM_URL,
+    stop_rule: datacap.StopRule | None = None,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+) -> dict[str, float | str]:
+    """起動済みのブラウザで Fast.com のネットワーク速度結果を取得する
 
-        latency = await page.evaluate(
-            "(elm) => Number(elm.textContent.trim())",
-            await page.querySelector("#latency-value"),
-        )
+    計測毎にシークレットコンテキストを作成して破棄する為、ブラウザ自体は
+    起動したまま次の計測に使い回せる。途中で止めた場合もコンテキストを閉じて通信を止める。
+    遷移、ダウンロード、アップロードは段階毎のタイムアウトで、全体は timeout で打ち切る。
 
-        buffer_bloat = await page.evaluate(
-            "(elm) => Number(elm.textContent.trim())",
-            await page.querySelector("#bufferbloat-value"),
-        )
+    Args:
+        browser (Browser): 起動済みのブラウザ
+        timeout (float): 計測全体のタイムアウト [s]、0 の場合は待ち続ける
+        timings (PhaseTimings | None): 遷移、ページ内の段階、終了の所要時間を記録する先
+        url (str): 計測するページの URL
+        stop_rule (datacap.StopRule | None): 計測を途中で止める条件
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
 
-        user_location = await page.evaluate(
-            "(elm) => elm.textContent.trim()",
-            await page.querySelector("#user-location"),
-        )
+    Raises:
+        watchdog.PhaseError: いずれかの段階がタイムアウトしたか失敗した場合
 
-        user_ip = await page.evaluate(
-            "(elm) => elm.textContent.trim()",
-            await page.querySelector("#user-ip"),
-        )
+    Returns:
+        dict[str, float | str]: get_network_info_from_fastcom の戻り値
+    """
 
-        is_done = (
-            await page.querySelector("#speed-value.succeeded") is not None
-            and await page.querySelector("#upload-value.succeeded") is not None
-        )
+    if timings is None:
+        timings = PhaseTimings()
+
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
 
-        logmng.logger.info(
-            {
-                "download_speed": download_speed,
-                "download_units": download_units,
-                "downloaded": downloaded,
-                "upload_speed": upload_speed,
-                "upload_units": upload_units,
-                "uploaded": uploaded,
-                "latency": latency,
-                "buffer_bloat": buffer_bloat,
-                "user_location": user_location,
-                "user_ip": user_ip,
-                "is_done": is_done,
-            }
+    request_filter: interception.RequestFilter = interception.request_filter
+    stats = interception.InterceptStats()
+    context = await browser.createIncognitoBrowserContext()
+
+    # イベント毎に作った処理を持ち、コンテキストを閉じる前に止める
+    handlers: set[asyncio.Future] = set()
+
+    def finish_handler(future: asyncio.Future) -> None:
+        handlers.discard(future)
+
+        if not future.cancelled() and future.exception() is not None:
+            logmng.logger.warning(f"リクエストの処理に失敗しました。 >> {future.exception()!r}")
+
+    def start_handler(awaitable: Awaitable[None]) -> None:
+        future: asyncio.Future = asyncio.ensure_future(awaitable)
+        handlers.add(future)
+        future.add_done_callback(finish_handler)
+
+    def on_response(response: Response) -> None:
+        # 計測の XHR 毎に処理を作らないよう、数えるかキャッシュするリソースタイプのみ扱う
+        if response.request.resourceType in interception.STATIC_RESOURCE_TYPES:
+            start_handler(request_filter.handle_response(stats, response))
+
+    async def measure() -> dict[str, Any]:
+        page = await context.newPage()
+
+        # URL とリソースタイプで絞り込み、JS バンドルをキャッシュするため割り込みを有効にする
+        await page.setRequestInterception(True)
+        page.on(
+            "request",
+            lambda request: start_handler(
+                request_filter.handle_request(stats, request)
+            ),
+        )
+        page.on("response", on_response)
+
+        await page.evaluateOnNewDocument(PHASE_SCRIPT)
+
+        with timings.measure("navigation"):
+            await watchdog.run_phase(
+                "navigation",
+                page.goto(url, {"timeout": 0}),
+                phase_timeouts.navigation,
+            )
+
+        if stop_rule is not None and stop_rule.is_active():
+            return await wait_for_stop(page, stop_rule, phase_timeouts)
+
+        await watchdog.run_phase(
+            "download",
+            page.waitForFunction(
+                DOWNLOAD_DONE_SCRIPT, {"polling": "mutation", "timeout": 0}
+            ),
+            phase_timeouts.download,
         )
 
-        await asyncio.sleep(5)
+        return await watchdog.run_phase(
+            "upload", wait_for_done(page, 0), phase_timeouts.upload
+        )
 
-    await browser.close()
+    try:
+        snapshot: dict[str, Any] = await watchdog.run_phase("total", measure(), timeout)
+    except watchdog.PhaseError as e:
+        logmng.logger.error(f"計測を打ち切りました。 >> {e}")
+        raise
+    finally:
+        with timings.measure("close"):
+            for future in list(handlers):
+                future.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+            try:
+                await asyncio.wait_for(context.close(), watchdog.CLOSE_TIMEOUT)
+            except Exception:
+                logmng.logger.exception("シークレットコンテキストを閉じられませんでした。")
+
+    timings.set_page_phases(snapshot.pop("phases"))
+    logmng.logger.info(snapshot)
+    logmng.logger.info({"interception": stats.to_dict()})
 
     return {
-        "download_speed": download_speed,
-        "download_units": download_units,
-        "downloaded": downloaded,
-        "upload_speed": upload_speed,
-        "upload_units": upload_units,
-        "uploaded": uploaded,
-        "latency": latency,
-        "buffer_bloat": buffer_bloat,
-        "user_location": user_location,
-        "user_ip": user_ip,
+        key: value
+        for key, value in snapshot.items()
+        if key not in ("is_done", "is_download_done")
     }
 
 
 @utility.recording
-def run_speedtest(convert_byte: bool) -> tuple[datetime, float, float]:
-    """Fast.com によるネットワーク速度を計測し、計測結果を返す
+async def get_network_info_from_fastcom(
+    timeout: float = DEFAULT_TIMEOUT,
+    proxy: str = DEFAULT_PROXY,
+    timings: PhaseTimings | None = None,
+    url: str = FASTCOM_URL,
+    phase_timeouts: watchdog.PhaseTimeouts | None = None,
+) -> dict[str, float | str]:
+    """Fast.com でネットワーク速度結果を取得する
 
     Args:
-        convert_byte (bool): byte にするフラグ
+        timeout (float): 計測全体のタイムアウト [s]
+        proxy (str): 計測に使うプロキシ、空文字の場合は直接接続する
+        timings (PhaseTimings | None): 段階毎の所要時間を記録する先
+        url (str): 計測するページの URL
+        phase_timeouts (watchdog.PhaseTimeouts | None): 段階毎のタイムアウト
+
     Returns:
-        tuple[datetime, float, float]: 計測日時/ダウンロード速度[bit/s]/アップロード速度[bit/s]
+        dict[str, float | str]: "download_speed": ダウンロード速度
+                                "download_unit": ダウンロード速度単位
+                                "downloaded": ダウンロードサイズ
+                                "upload_speed": アップロード速度
+                                "upload_unit": アップロード速度単位
+                                "uploaded": アップロードサイズ
+                                "latency": 遅延
+                                "buffer_bloat": バッファブロート？
+                                "user_location": ユーザ地域
+                                "user_ip": ユーザIP
     """
 
-    test_datetime = datetime.now()
+    if timings is None:
+        timings = PhaseTimings()
+
+    if phase_timeouts is None:
+        phase_timeouts = watchdog.PhaseTimeouts()
+
+    with timings.measure("launch"):
+        browser = await launch_browser(proxy, phase_timeouts.launch)
+
+    try:
+        return await measure_on_browser(
+            browser, timeout, timings, url, phase_timeouts=phase_timeouts
+        )
+    finally:
+        with timings.measure("close"):
+            await watchdog.close_browser(browser)
+
+
+@utility.recording
+def format_result(
+    test_datetime: datetime,
+    result: dict[str, float | str],
+    convert_byte: bool,
+    target: str = "",
+    timings: PhaseTimings | None = None,
+) -> SpeedtestResult:
+    """Fast.com の計測値を記録用の計測結果に整形する
+
+    Args:
+        test_datetime (datetime): 計測日時
+        result (dict[str, float | str]): get_network_info_from_fastcom の戻り値
+        convert_byte (bool): byte にするフラグ
+        target (str): 計測対象のラベル
+        timings (PhaseTimings | None): 計測結果に付ける段階毎の所要時間
+
+    Returns:
+        SpeedtestResult: 計測結果（速度は [bit/s] 又は [byte/s]）
+    """
 
-    # 計測
-    result: dict[str, float | str] = asyncio.get_event_loop().run_until_complete(
-        get_network_info_from_fastcom()
-    )
     download_speed: float = float(result["download_speed"])
     upload_speed: float = float(result["upload_speed"])
 
@@ -210,7 +513,49 @@ def run_speedtest(convert_byte: bool) -> tuple[datetime, float, float]:
         download_speed = utility.bits_to_byte(download_speed)
         upload_speed = utility.bits_to_byte(upload_speed)
 
-    return (test_datetime, download_speed, upload_speed)
+    return SpeedtestResult(
+        tested_datetime=test_datetime,
+        download_speed=download_speed,
+        upload_speed=upload_speed,
+        target=target,
+        latency=float(result["latency"]),
+        buffer_bloat=float(result["buffer_bloat"]),
+        downloaded=float(result["downloaded"]),
+        uploaded=float(result["uploaded"]),
+        user_location=str(result["user_location"]),
+        user_ip=str(result["user_ip"]),
+        timings=timings if timings is not None else PhaseTimings(),
+    )
+
+
+@utility.recording
+def run_speedtest(
+    convert_byte: bool,
+    timeout: float = DEFAULT_TIMEOUT,
+    proxy: str = DEFAULT_PROXY,
+    url: str = FASTCOM_URL,
+) -> SpeedtestResult:
+    """Fast.com によるネットワーク速度を計測し、計測結果を返す
+
+    Args:
+        convert_byte (bool): byte にするフラグ
+        timeout (float): 1 回の計測全体のタイムアウト [s]
+        proxy (str): 計測に使うプロキシ、空文字の場合は直接接続する
+        url (str): 計測するページの URL
+    Returns:
+        SpeedtestResult: 計測結果（速度は [bit/s] 又は [byte/s]）
+    """
+
+    test_datetime = datetime.now()
+    timings = PhaseTimings()
+
+    # 計測
+    result: dict[str, float | str] = asyncio.get_event_loop().run_until_complete(
+        get_network_info_from_fastcom(timeout, proxy, timings, url)
+    )
+    logmng.logger.info({"timings": timings.to_dict()})
+
+    return format_result(test_datetime, result, convert_byte, timings=timings)
 
 
 if __name__ == "__main__":
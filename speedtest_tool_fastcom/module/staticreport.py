@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+from datetime import date
+from typing import Any
+
+from speedtest_tool_fastcom.module import logmng, uploadsync, utility
+from speedtest_tool_fastcom.module.result import CSV_SCHEMAS, get_schema_version
+
+# 日毎の計測レポートの形式
+REPORT_FORMATS: tuple[str, ...] = ("bokeh", "static")
+
+# 日毎のデータファイルの形式のバージョン、形式を変えたら上げると一括作成で作り直す
+DATA_VERSION: int = 2
+
+# 共通の閲覧ページのファイル名
+VIEWER_FILE_NAME: str = "fastcom_viewer.html"
+
+# 日毎のデータファイル名の接尾辞
+DATA_FILE_SUFFIX: str = "_fastcom.js"
+
+# データファイルに書き出す列
+DATA_COLUMNS: tuple[str, ...] = (
+    "download_speed",
+    "upload_speed",
+    "latency",
+    "buffer_bloat",
+)
+
+# 共通の閲覧ページ
+# file:// で開いても読み込めるよう、日毎のデータは fetch ではなく script 要素で読み込む
+VIEWER_PAGE: str = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Network Speed</title>
+<style>
+body { font-family: sans-serif; margin: 16px; }
+canvas { display: block; border: 1px solid #ddd; margin-top: 8px; }
+#tooltip { position: absolute; display: none; padding: 4px 8px; background: #fff;
+           border: 1px solid #999; font-size: 12px; pointer-events: none;
+           white-space: pre; }
+.legend span { display: inline-block; width: 12px; height: 12px; margin: 0 4px 0 12px; }
+</style>
+</head>
+<body>
+<div>
+<button id="prev">&lt;</button>
+<input id="date" type="date">
+<button id="next">&gt;</button>
+<span id="status"></span>
+</div>
+<h3 id="speed-title">Network Speed</h3>
+<div class="legend" id="speed-legend"></div>
+<canvas id="speed" width="1600" height="800"></canvas>
+<h3 id="latency-title">Latency</h3>
+<div class="legend" id="latency-legend"></div>
+<canvas id="latency" width="1600" height="400"></canvas>
+<div id="tooltip"></div>
+<script>
+"use strict";
+var fastcomViewer = (function () {
+  var days = {};
+  var current = null;
+  var MARGIN = { left: 60, right: 16, top: 16, bottom: 32 };
+  // 計測対象毎に系列の色の組を順に使う
+  var COLORS = [["#8682F5", "#F57E76"], ["#3BA272", "#E8A33D"], ["#2F7FC1", "#C0504D"],
+                ["#8C564B", "#17BECF"]];
+  var LABELS = {
+    download_speed: "Download speed [MByte/s]",
+    upload_speed: "Upload speed [MByte/s]",
+    latency: "Unloaded latency [ms]",
+    buffer_bloat: "Loaded latency (bufferbloat) [ms]"
+  };
+
+  function pad(value) { return (value < 10 ? "0" : "") + value; }
+
+  function formatTime(seconds) {
+    return pad(Math.floor(seconds / 3600)) + ":" + pad(Math.floor(seconds / 60) % 60) +
+      ":" + pad(seconds % 60);
+  }
+
+  function shiftDate(text, offset) {
+    var value = new Date(text + "T00:00:00Z");
+    value.setUTCDate(value.getUTCDate() + offset);
+    return value.toISOString().slice(0, 10);
+  }
+
+  function getSeries(data, names) {
+    var series = [];
+    // 計測対象毎に分ける前の形式（version 1）は 1 つの計測対象とみなす
+    var targets = data ? data.targets || [data] : [];
+    targets.forEach(function (target, targetIndex) {
+      names.forEach(function (name, nameIndex) {
+        series.push({
+          label: LABELS[name] + (target.target ? " (" + target.target + ")" : ""),
+          color: COLORS[targetIndex % COLORS.length][nameIndex],
+          seconds: target.seconds,
+          values: target[name]
+        });
+      });
+    });
+    return series;
+  }
+
+  function drawLegend(element, series) {
+    element.innerHTML = "";
+    series.forEach(function (item) {
+      var mark = document.createElement("span");
+      mark.style.background = item.color;
+      element.appendChild(mark);
+      element.appendChild(document.createTextNode(item.label));
+    });
+  }
+
+  function getScale(series) {
+    var top = 0;
+    series.forEach(function (item) {
+      item.values.forEach(function (value) {
+        if (value > top) { top = value; }
+      });
+    });
+    return top > 0 ? top * 1.1 : 1;
+  }
+
+  function findNearest(values, seconds) {
+    var nearest = -1;
+    values.forEach(function (value, row) {
+      if (nearest < 0 ||
+          Math.abs(value - seconds) < Math.abs(values[nearest] - seconds)) {
+        nearest = row;
+      }
+    });
+    return nearest;
+  }
+
+  function drawAxes(ctx, canvas, top) {
+    var width = canvas.width - MARGIN.left - MARGIN.right;
+    var height = canvas.height - MARGIN.top - MARGIN.bottom;
+    ctx.strokeStyle = "#ccc";
+    ctx.fillStyle = "#333";
+    ctx.font = "12px sans-serif";
+    for (var i = 0; i <= 4; i++) {
+      var y = MARGIN.top + height - height * i / 4;
+      ctx.beginPath();
+      ctx.moveTo(MARGIN.left, y);
+      ctx.lineTo(MARGIN.left + width, y);
+      ctx.stroke();
+      ctx.fillText((top * i / 4).toFixed(1), 4, y + 4);
+    }
+    for (var hour = 0; hour <= 24; hour += 3) {
+      var x = MARGIN.left + width * hour / 24;
+      ctx.fillText(pad(hour) + ":00", x - 16, canvas.height - 8);
+    }
+    return { width: width, height: height };
+  }
+
+  function draw(canvas, series, isBar) {
+    var ctx = canvas.getContext("2d");
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    var top = getScale(series);
+    var area = drawAxes(ctx, canvas, top);
+    var toX = function (seconds) {
+      return MARGIN.left + area.width * seconds / 86400;
+    };
+    var toY = function (value) {
+      return MARGIN.top + area.height - area.height * value / top;
+    };
+    series.forEach(function (item, index) {
+      ctx.fillStyle = item.color;
+      ctx.strokeStyle = item.color;
+      ctx.beginPath();
+      item.seconds.forEach(function (seconds, row) {
+        var x = toX(seconds), y = toY(item.values[row]);
+        if (isBar) {
+          ctx.globalAlpha = 0.6;
+          ctx.fillRect(x - series.length * 2 + index * 4, y, 4,
+                       MARGIN.top + area.height - y);
+        } else if (row === 0) {
+          ctx.moveTo(x, y);
+        } else {
+          ctx.lineTo(x, y);
+        }
+      });
+      ctx.globalAlpha = 1;
+      if (!isBar) { ctx.stroke(); }
+    });
+    canvas.onmousemove = function (event) {
+      var seconds = (event.offsetX - MARGIN.left) / area.width * 86400;
+      var lines = [];
+      series.forEach(function (item) {
+        var nearest = findNearest(item.seconds, seconds);
+        if (nearest >= 0) {
+          lines.push(formatTime(item.seconds[nearest]) + " " + item.label + ": " +
+            item.values[nearest]);
+        }
+      });
+      var tooltip = document.getElementById("tooltip");
+      if (lines.length === 0) { tooltip.style.display = "none"; return; }
+      // 計測対象のラベルを html として解釈させない
+      tooltip.textContent = lines.join("\\n");
+      tooltip.style.left = event.pageX + 12 + "px";
+      tooltip.style.top = event.pageY + 12 + "px";
+      tooltip.style.display = "block";
+    };
+    canvas.onmouseleave = function () {
+      document.getElementById("tooltip").style.display = "none";
+    };
+  }
+
+  function render(text) {
+    var data = days[text];
+    var speed = getSeries(data, ["download_speed", "upload_speed"]);
+    var latency = getSeries(data, ["latency", "buffer_bloat"]);
+    var results = 0;
+    speed.forEach(function (item, index) {
+      if (index % 2 === 0) { results += item.seconds.length; }
+    });
+    document.getElementById("status").textContent =
+      data ? results + " results" : "no data";
+    document.getElementById("speed-title").textContent = "Network Speed at " + text;
+    document.getElementById("latency-title").textContent = "Latency at " + text;
+    drawLegend(document.getElementById("speed-legend"), speed);
+    drawLegend(document.getElementById("latency-legend"), latency);
+    draw(document.getElementById("speed"), speed, true);
+    draw(document.getElementById("latency"), latency, false);
+  }
+
+  function show(text) {
+    current = text;
+    document.getElementById("date").value = text;
+    if (location.hash !== "#" + text) { location.hash = text; }
+    if (text in days) { render(text); return; }
+    document.getElementById("status").textContent = "loading";
+    var script = document.createElement("script");
+    script.src = text + "__DATA_FILE_SUFFIX__";
+    script.onerror = function () {
+      days[text] = null;
+      if (current === text) { render(text); }
+    };
+    document.head.appendChild(script);
+  }
+
+  function addDay(data) {
+    days[data.date] = data;
+    if (current === data.date) { render(data.date); }
+  }
+
+  window.addEventListener("load", function () {
+    document.getElementById("prev").onclick = function () {
+      show(shiftDate(current, -1));
+    };
+    document.getElementById("next").onclick = function () {
+      show(shiftDate(current, 1));
+    };
+    document.getElementById("date").onchange = function (event) {
+      show(event.target.value);
+    };
+    window.addEventListener("hashchange", function () {
+      if (location.hash.slice(1) !== current) { show(location.hash.slice(1)); }
+    });
+    var offset = new Date().getTimezoneOffset() * 60000;
+    var yesterday = new Date(Date.now() - 86400000 - offset);
+    show(location.hash.slice(1) || yesterday.toISOString().slice(0, 10));
+  });
+
+  return { addDay: addDay };
+})();
+</script>
+</body>
+</html>
+""".replace(
+    "__DATA_FILE_SUFFIX__", DATA_FILE_SUFFIX
+)
+
+
+def get_data_path(record_dir_path: str, target_date: date) -> str:
+    """指定日付のデータファイルパスを取得する
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+
+    Returns:
+        str: データファイルパス
+    """
+
+    file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+
+    return os.path.join(record_dir_path, file_name + DATA_FILE_SUFFIX)
+
+
+@utility.recording
+def make_day_data(csv_file_path: str, dest_path: str, target_date: date) -> None:
+    """ネットワーク速度計測結果から閲覧ページが読み込む日毎のデータファイルを出力する
+
+    計測対象毎に分け、計測日時は日付の 0 時からの秒数、数値は小数点第二位までとし、
+    列毎の配列にまとめる。計測対象の列の無い古いスキーマの行は計測対象を空文字とする。
+
+    Args:
+        csv_file_path (str): ネットワーク速度計測結果ファイルパス
+        dest_path (str): 出力データファイルパス
+        target_date (date): ネットワーク速度計測結果日付
+    """
+
+    targets: dict[str, dict[str, Any]] = {}
+
+    with open(csv_file_path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+
+        reader.__next__()
+
+        for row in reader:
+            version: int | None = get_schema_version(len(row))
+
+            if version is None:
+                continue
+
+            values: dict[str, str] = dict(zip(CSV_SCHEMAS[version], row))
+            tested_datetime: str = values["tested_datetime"]
+            target: str = values.get("target", "")
+
+            if target not in targets:
+                targets[target] = {
+                    "target": target,
+                    "seconds": [],
+                    **{name: [] for name in DATA_COLUMNS},
+                }
+
+            data: dict[str, Any] = targets[target]
+            data["seconds"].append(
+                int(tested_datetime[11:13]) * 3600
+                + int(tested_datetime[14:16]) * 60
+                + int(tested_datetime[17:19])
+            )
+
+            for name in DATA_COLUMNS:
+                data[name].append(round(float(values.get(name, 0)), 2))
+
+    content: str = json.dumps(
+        {
+            "date": target_date.isoformat(),
+            "version": DATA_VERSION,
+            "targets": list(targets.values()),
+        },
+        separators=(",", ":"),
+    )
+
+    temp_path: str = f"{dest_path}.{os.getpid()}.tmp"
+
+    with open(temp_path, mode="w", encoding="utf-8") as f:
+        f.write(f"fastcomViewer.addDay({content});\n")
+
+    os.replace(temp_path, dest_path)
+
+
+def save_viewer(record_dir_path: str) -> str:
+    """共通の閲覧ページを保存する、内容が同じ場合は書き込まない
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+
+    Returns:
+        str: 閲覧ページのファイルパス
+    """
+
+    viewer_path: str = os.path.join(record_dir_path, VIEWER_FILE_NAME)
+
+    if os.path.exists(viewer_path):
+        with open(viewer_path, mode="r", encoding="utf-8") as f:
+            if f.read() == VIEWER_PAGE:
+                return viewer_path
+
+    with open(viewer_path, mode="w", encoding="utf-8") as f:
+        f.write(VIEWER_PAGE)
+
+    return viewer_path
+
+
+@utility.recording
+def make_report(
+    record_dir_path: str, target_date: date, is_force: bool = False
+) -> list[str]:
+    """指定日付のデータファイルと共通の閲覧ページを作成する
+
+    bokeh を使わない為、bokeh の無い環境でも作成できる。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+        is_force (bool): 既にデータファイルが有っても作り直すフラグ
+
+    Returns:
+        list[str]: アップロードするファイルパス（計測データ記録ファイル、データファイル、閲覧ページ）、
+                   データファイルを作成しなかった場合は空のリスト
+    """
+
+    file_name: str = target_date.strftime(utility.FORMAT_DATE_SHORT)
+    file_path: str = os.path.join(record_dir_path, file_name + "_fastcom.csv")
+    data_path: str = get_data_path(record_dir_path, target_date)
+
+    if not os.path.exists(file_path):
+        logmng.logger.warn("指定日付のネットワーク速度計測結果ファイルが無い為データファイルは作成していません。")
+        logmng.logger.warn(f">> {file_path}")
+    elif not os.path.exists(data_path) or is_force:
+        make_day_data(file_path, data_path, target_date)
+        logmng.logger.info(f"{file_path} のデータファイルを {data_path} に作成しました。")
+
+        return [file_path, data_path, save_viewer(record_dir_path)]
+    else:
+        logmng.logger.warn("既にデータファイルが有り、強制作成フラグが False の為作成していません。")
+        logmng.logger.warn(f">> {file_path}")
+
+    return []
+
+
+@utility.recording
+def upload_report(
+    record_dir_path: str,
+    upload_dir_path: str,
+    target_date: date,
+    is_force: bool = False,
+) -> None:
+    """指定日付のネットワーク速度計測結果とデータファイル、閲覧ページをアップロードする
+
+    閲覧ページは内容が変わらない限り、アップロード先と同じ内容としてコピーしない。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        upload_dir_path (str): レポートをアップロード先ディレクトリパス
+        target_date (date): ネットワーク速度計測結果日付
+        is_force (bool): 既にデータファイルが有っても作り直すフラグ
+    """
+
+    upload_paths: list[str] = make_report(record_dir_path, target_date, is_force)
+
+    if upload_paths:
+        uploadsync.sync_files(upload_paths, upload_dir_path)
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,691 @@
+from __future__ import annotations
+
+import contextlib
+import csv
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Iterator
+from urllib.parse import quote, unquote
+
+from speedtest_tool_fastcom.module import logmng, recorder, rollup, utility
+from speedtest_tool_fastcom.module.result import (
+    NUMERIC_COLUMNS,
+    FailureRecord,
+    ResultColumns,
+    SpeedtestResult,
+    format_csv_row,
+    make_csv_header,
+)
+
+# 選択可能な保存形式
+STORAGE_KINDS: tuple[str, ...] = ("csv", "columnar", "sqlite")
+
+
+class Storage(ABC):
+    """計測結果の保存先の基底クラス
+
+    write と read を実装しない保存形式は作成時に TypeError となる。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+    """
+
+    def __init__(self, record_dir_path: str) -> None:
+        self.record_dir_path: str = record_dir_path
+
+    @abstractmethod
+    def write(self, tested_network_data: SpeedtestResult) -> None:
+        """計測結果を 1 件保存する
+
+        Args:
+            tested_network_data (SpeedtestResult): ネットワーク速度計測データ
+        """
+
+    @abstractmethod
+    def read(self, start: datetime, end: datetime) -> dict[str, ResultColumns]:
+        """期間内の計測結果を列毎の配列で読み込む
+
+        Args:
+            start (datetime): 開始日時（含む）
+            end (datetime): 終了日時（含まない）
+
+        Returns:
+            dict[str, ResultColumns]: 計測対象のラベルに対する計測結果
+        """
+
+    def get_csv_path(self, target_date: date) -> str:
+        """指定日付の計測データ記録ファイル（csv）のパスを取得する
+
+        Args:
+            target_date (date): 日付
+
+        Returns:
+            str: 計測データ記録ファイルパス
+        """
+
+        return os.path.join(
+            self.record_dir_path,
+            f"{target_date.strftime(utility.FORMAT_DATE_SHORT)}_fastcom.csv",
+        )
+
+    def get_failure_path(self, target_date: date) -> str:
+        """指定日付の計測失敗記録ファイル（csv）のパスを取得する
+
+        Args:
+            target_date (date): 日付
+
+        Returns:
+            str: 計測失敗記録ファイルパス
+        """
+
+        return os.path.join(
+            self.record_dir_path,
+            f"{target_date.strftime(utility.FORMAT_DATE_SHORT)}_fastcom_failures.csv",
+        )
+
+    def write_failure(self, failure: FailureRecord) -> None:
+        """失敗した計測を保存形式に依らず計測失敗記録ファイル（csv）に記録する
+
+        Args:
+            failure (FailureRecord): 失敗した計測の記録
+        """
+
+        recorder.record_failure(
+            self.get_failure_path(failure.tested_datetime.date()), failure
+        )
+
+    def export_csv(self, target_date: date, convert_byte: bool) -> str:
+        """指定日付の計測結果を計測データ記録ファイル（csv）に書き出す
+
+        Args:
+            target_date (date): 日付
+            convert_byte (bool): byte にするフラグ
+
+        Returns:
+            str: 計測データ記録ファイルパス、計測結果が無い場合は書き出さない
+        """
+
+        start: datetime = datetime.combine(target_date, datetime.min.time())
+        file_path: str = self.get_csv_path(target_date)
+        results: dict[str, ResultColumns] = self.read(start, start + timedelta(days=1))
+
+        if not results:
+            return file_path
+
+        os.makedirs(self.record_dir_path, exist_ok=True)
+
+        with open(file_path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(make_csv_header(convert_byte))
+
+            for target, columns in results.items():
+                writer.writerows(columns.iter_csv_rows(target))
+
+        return file_path
+
+    def update_rollup(self, tested_network_data: SpeedtestResult) -> None:
+        """保存した計測結果を計測日の集計ファイルに加える
+
+        集計ファイルが無い場合は、既に保存済みの同日の計測結果を取りこぼさないよう
+        計測日の分を保存先から集計し直す。
+
+        Args:
+            tested_network_data (SpeedtestResult): 保存済みのネットワーク速度計測データ
+        """
+
+        target_date: date = tested_network_data.tested_datetime.date()
+
+        if os.path.exists(rollup.get_rollup_path(self.record_dir_path, target_date)):
+            recorder.record_to_rollup(self.record_dir_path, tested_network_data)
+        else:
+            self.rebuild_rollup(target_date)
+
+    def rebuild_rollup(self, target_date: date) -> rollup.DayRollup:
+        """指定日付の集計ファイルを保存先の計測結果から作り直す
+
+        Args:
+            target_date (date): 日付
+
+        Returns:
+            rollup.DayRollup: 1 日分の集計
+        """
+
+        start: datetime = datetime.combine(target_date, datetime.min.time())
+        day_rollup = rollup.DayRollup(target_date)
+
+        for target, columns in self.read(start, start + timedelta(days=1)).items():
+            values: list[array] = [columns.columns[name] for name in NUMERIC_COLUMNS]
+
+            for timestamp, *row in zip(columns.timestamps, *values):
+                day_rollup.add(target, datetime.fromtimestamp(timestamp), tuple(row))
+
+        if day_rollup.days:
+            rollup.save_rollup(
+                rollup.get_rollup_path(self.record_dir_path, target_date), day_rollup
+            )
+
+        return day_rollup
+
+    def load_rollups(
+        self, start_date: date, end_date: date
+    ) -> Iterator[rollup.DayRollup]:
+        """期間内の集計を日付順に読み込む
+
+        集計ファイルが無い日は保存先の計測結果から作り直す。
+
+        Args:
+            start_date (date): 開始日付（含む）
+            end_date (date): 終了日付（含む）
+
+        Yields:
+            Iterator[rollup.DayRollup]: 1 日分の集計
+        """
+
+        target_date: date = start_date
+
+        while target_date <= end_date:
+            file_path: str = rollup.get_rollup_path(self.record_dir_path, target_date)
+
+            if os.path.exists(file_path):
+                yield rollup.load_rollup(file_path, target_date)
+            else:
+                yield self.rebuild_rollup(target_date)
+
+            target_date += timedelta(days=1)
+
+
+class CsvStorage(Storage):
+    """日付毎の計測データ記録ファイル（csv）に保存する
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        convert_byte (bool): byte にするフラグ（ヘッダ行の単位に使う）
+    """
+
+    def __init__(self, record_dir_path: str, convert_byte: bool) -> None:
+        super().__init__(record_dir_path)
+        self.convert_byte: bool = convert_byte
+
+    def write(self, tested_network_data: SpeedtestResult) -> None:
+        recorder.record_to_csv(
+            self.get_csv_path(tested_network_data.tested_datetime.date()),
+            tested_network_data,
+            self.convert_byte,
+        )
+
+    def read(self, start: datetime, end: datetime) -> dict[str, ResultColumns]:
+        results: dict[str, ResultColumns] = {}
+        start_ts: int = int(start.timestamp())
+        end_ts: int = int(end.timestamp())
+        target_date: date = start.date()
+
+        while target_date <= end.date():
+            file_path: str = self.get_csv_path(target_date)
+            target_date += timedelta(days=1)
+
+            if not os.path.exists(file_path):
+                continue
+
+            with open(file_path, mode="r", newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                reader.__next__()
+
+                for row in reader:
+                    if not row:
+                        continue
+
+                    loaded = SpeedtestResult.from_csv_row(row)
+                    timestamp: int = int(loaded.tested_datetime.timestamp())
+
+                    if start_ts <= timestamp < end_ts:
+                        results.setdefault(loaded.target, ResultColumns()).append(
+                            timestamp,
+                            tuple(getattr(loaded, name) for name in NUMERIC_COLUMNS),
+                        )
+
+        return results
+
+    def export_csv(self, target_date: date, convert_byte: bool) -> str:
+        # 記録ファイル自体が csv の為、書き出し不要
+        return self.get_csv_path(target_date)
+
+
+class ColumnarStorage(Storage):
+    """列毎の固定長バイナリファイルに保存する
+
+    <記録ディレクトリ>/columnar/<計測対象>/<yyyy-MM>/<列名>.bin に、計測日時は
+    エポック秒の 64bit 整数、数値は 64bit 浮動小数点でネイティブバイト順に追記する。
+    読み込みは列毎にファイルを 1 回読んでそのまま配列にする為、行毎の文字列解析が不要となる。
+    追記は保存先ディレクトリ毎のロックファイルで 1 プロセスずつに限り、中断された書き込みで
+    長さが揃っていない列は、追記前に最も短い列の長さに切り詰めて行の位置を揃える。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+    """
+
+    TIMESTAMP_COLUMN: str = "timestamp"
+
+    LOCK_FILE_NAME: str = "write.lock"
+
+    def __init__(self, record_dir_path: str) -> None:
+        super().__init__(record_dir_path)
+        self.root_path: str = os.path.join(record_dir_path, "columnar")
+
+    def get_partition_path(self, target: str, tested_datetime: datetime) -> str:
+        """計測対象と計測月の保存先ディレクトリパスを取得する
+
+        Args:
+            target (str): 計測対象のラベル
+            tested_datetime (datetime): 計測日時
+
+        Returns:
+            str: 保存先ディレクトリパス
+        """
+
+        return os.path.join(
+            self.root_path,
+            quote(target, safe="") or "_",
+            tested_datetime.strftime("%Y-%m"),
+        )
+
+    def write(self, tested_network_data: SpeedtestResult) -> None:
+        columns = ResultColumns()
+        columns.append(
+            int(tested_network_data.tested_datetime.timestamp()),
+            tested_network_data.to_record_values(),
+        )
+
+        self.write_columns(tested_network_data.target, columns)
+
+    def write_columns(self, target: str, columns: ResultColumns) -> None:
+        """計測日時の昇順に並んだ計測結果をまとめて保存する
+
+        Args:
+            target (str): 計測対象のラベル
+            columns (ResultColumns): 計測結果
+        """
+
+        index: int = 0
+
+        while index < len(columns):
+            first: datetime = datetime.fromtimestamp(columns.timestamps[index])
+            next_month: datetime = (first.replace(day=28) + timedelta(days=4)).replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
+            partition = columns.slice_by_time(
+                columns.timestamps[index], int(next_month.timestamp())
+            )
+            partition_path: str = self.get_partition_path(target, first)
+            os.makedirs(partition_path, exist_ok=True)
+
+            cells: list[tuple[str, array]] = [
+                (self.TIMESTAMP_COLUMN, partition.timestamps)
+            ] + list(partition.columns.items())
+
+            with open(
+                os.path.join(partition_path, self.LOCK_FILE_NAME), mode="ab"
+            ) as lock:
+                utility.lock_file(lock)
+
+                try:
+                    self.align_partition(partition_path)
+
+                    for name, cell in cells:
+                        with open(
+                            os.path.join(partition_path, f"{name}.bin"), mode="ab"
+                        ) as f:
+                            cell.tofile(f)
+                finally:
+                    utility.unlock_file(lock)
+
+            index += len(partition)
+
+    def align_partition(self, partition_path: str) -> None:
+        """中断された書き込みで長さが揃っていない列を最も短い列に合わせて切り詰める
+
+        途中までしか書かれなかった行を捨て、続けて追記する行が全ての列で同じ位置となるようにする。
+        書き込みのロックを持った状態で呼ぶ。
+
+        Args:
+            partition_path (str): 保存先ディレクトリパス
+        """
+
+        itemsizes: dict[str, int] = {
+            self.TIMESTAMP_COLUMN: array("q").itemsize,
+            **{name: array("d").itemsize for name in NUMERIC_COLUMNS},
+        }
+        sizes: dict[str, int] = {}
+
+        for name in itemsizes:
+            file_path: str = os.path.join(partition_path, f"{name}.bin")
+            sizes[name] = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+        length: int = min(sizes[name] // itemsizes[name] for name in itemsizes)
+
+        for name, itemsize in itemsizes.items():
+            if sizes[name] > length * itemsize:
+                logmng.logger.warning(
+                    f"{partition_path} の {name} 列を {length} 件に切り詰めます。"
+                )
+                os.truncate(
+                    os.path.join(partition_path, f"{name}.bin"), length * itemsize
+                )
+
+    def read(self, start: datetime, end: datetime) -> dict[str, ResultColumns]:
+        results: dict[str, ResultColumns] = {}
+
+        if not os.path.isdir(self.root_path):
+            return results
+
+        months: list[str] = utility.list_months(start, end)
+
+        for target_dir in sorted(os.listdir(self.root_path)):
+            target: str = "" if target_dir == "_" else unquote(target_dir)
+            columns = ResultColumns()
+
+            for month in months:
+                partition_path: str = os.path.join(self.root_path, target_dir, month)
+
+                if os.path.isdir(partition_path):
+                    columns.extend(self.read_partition(partition_path))
+
+            columns = columns.slice_by_time(
+                int(start.timestamp()), int(end.timestamp())
+            )
+
+            if len(columns) > 0:
+                results[target] = columns
+
+        return results
+
+    def read_partition(self, partition_path: str) -> ResultColumns:
+        """1 つの保存先ディレクトリの計測結果を読み込む
+
+        書き込み途中か中断された書き込みで列の長さが揃っていない場合は、短い列に合わせる。
+        追記は 1 プロセスずつ全ての列に同じ順で行う為、短い列までの行は揃っている。
+
+        Args:
+            partition_path (str): 保存先ディレクトリパス
+
+        Returns:
+            ResultColumns: 計測結果
+        """
+
+        columns = ResultColumns()
+        columns.timestamps = self._read_column(
+            partition_path, self.TIMESTAMP_COLUMN, "q"
+        )
+        columns.columns = {
+            name: self._read_column(partition_path, name, "d")
+            for name in NUMERIC_COLUMNS
+        }
+
+        length: int = min(
+            [len(columns.timestamps)]
+            + [len(column) for column in columns.columns.values()]
+        )
+
+        # 揃っていない列のみ切り詰め、揃っている列は読み込んだ配列をそのまま使う
+        if len(columns.timestamps) > length:
+            columns.timestamps = columns.timestamps[:length]
+        columns.columns = {
+            name: column[:length] if len(column) > length else column
+            for name, column in columns.columns.items()
+        }
+
+        return columns
+
+    @staticmethod
+    def _read_column(partition_path: str, name: str, typecode: str) -> array:
+        values: array = array(typecode)
+        file_path: str = os.path.join(partition_path, f"{name}.bin")
+
+        if not os.path.exists(file_path):
+            return values
+
+        # 書き込み途中の端数の byte は読まない
+        count: int = os.path.getsize(file_path) // values.itemsize
+
+        with open(file_path, mode="rb") as f:
+            values.fromfile(f, count)
+
+        return values
+
+
+class SqliteStorage(Storage):
+    """SQLite データベースに保存する
+
+    <記録ディレクトリ>/fastcom.sqlite3 の results テーブルに記録し、
+    (target, timestamp) の索引で計測対象毎の期間検索を行う。
+    WAL モードとする為、複数プロセスから同時に書き込み・読み込みしても
+    互いに待たされにくく、ファイル作成の競合も起こらない。
+
+    Args:
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        busy_timeout (float): 他プロセスの書き込み待ちのタイムアウト [s]
+    """
+
+    COLUMNS: tuple[str, ...] = (
+        ("target", "timestamp") + NUMERIC_COLUMNS + ("user_location", "user_ip")
+    )
+
+    def __init__(self, record_dir_path: str, busy_timeout: float = 30) -> None:
+        super().__init__(record_dir_path)
+        self.database_path: str = os.path.join(record_dir_path, "fastcom.sqlite3")
+        self.busy_timeout: float = busy_timeout
+
+        os.makedirs(record_dir_path, exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "target TEXT NOT NULL, timestamp INTEGER NOT NULL, "
+                + ", ".join(f"{name} REAL NOT NULL" for name in NUMERIC_COLUMNS)
+                + ", user_location TEXT NOT NULL, user_ip TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_target_timestamp "
+                "ON results (target, timestamp)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.database_path, timeout=self.busy_timeout)
+
+        try:
+            # with 文でトランザクションをまとめてコミットする
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def write(self, tested_network_data: SpeedtestResult) -> None:
+        self.write_many([tested_network_data])
+
+    def write_many(self, tested_network_data_list: list[SpeedtestResult]) -> None:
+        """複数の計測結果を 1 トランザクションでまとめて保存する
+
+        Args:
+            tested_network_data_list (list[SpeedtestResult]): ネットワーク速度計測データ
+        """
+
+        rows: list[tuple[Any, ...]] = [
+            (
+                tested_network_data.target,
+                int(tested_network_data.tested_datetime.timestamp()),
+                *tested_network_data.to_record_values(),
+                tested_network_data.user_location,
+                tested_network_data.user_ip,
+            )
+            for tested_network_data in tested_network_data_list
+        ]
+
+        self._insert(rows)
+
+    def write_columns(self, target: str, columns: ResultColumns) -> None:
+        """計測結果をまとめて保存する
+
+        Args:
+            target (str): 計測対象のラベル
+            columns (ResultColumns): 計測結果
+        """
+
+        values: list[array] = [columns.columns[name] for name in NUMERIC_COLUMNS]
+
+        self._insert(
+            (target, timestamp, *cells, "", "")
+            for timestamp, *cells in zip(columns.timestamps, *values)
+        )
+
+    def _insert(self, rows: Iterable[tuple[Any, ...]]) -> None:
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO results ({0}) VALUES ({1})".format(
+                    ", ".join(self.COLUMNS), ", ".join("?" * len(self.COLUMNS))
+                ),
+                rows,
+            )
+
+    def list_targets(self) -> list[str]:
+        """記録されている計測対象のラベルを列挙する
+
+        Returns:
+            list[str]: 計測対象のラベルのリスト
+        """
+
+        with self._connect() as connection:
+            return [
+                row[0]
+                for row in connection.execute(
+                    "SELECT DISTINCT target FROM results ORDER BY target"
+                )
+            ]
+
+    def read_target(self, target: str, start: datetime, end: datetime) -> ResultColumns:
+        """1 つの計測対象の期間内の計測結果を列毎の配列で読み込む
+
+        Args:
+            target (str): 計測対象のラベル
+            start (datetime): 開始日時（含む）
+            end (datetime): 終了日時（含まない）
+
+        Returns:
+            ResultColumns: 計測結果
+        """
+
+        columns = ResultColumns()
+
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "SELECT timestamp, {0} FROM results "
+                "WHERE target = ? AND timestamp >= ? AND timestamp < ? "
+                "ORDER BY timestamp".format(", ".join(NUMERIC_COLUMNS)),
+                (target, int(start.timestamp()), int(end.timestamp())),
+            )
+
+            for timestamp, *values in cursor:
+                columns.append(timestamp, tuple(values))
+
+        return columns
+
+    def read(self, start: datetime, end: datetime) -> dict[str, ResultColumns]:
+        results: dict[str, ResultColumns] = {}
+
+        # 計測対象毎に索引を使って期間検索する
+        for target in self.list_targets():
+            columns: ResultColumns = self.read_target(target, start, end)
+
+            if len(columns) > 0:
+                results[target] = columns
+
+        return results
+
+    def read_results(self, start: datetime, end: datetime) -> list[SpeedtestResult]:
+        """期間内の計測結果をユーザ地域・ユーザ IP も含めて読み込む
+
+        Args:
+            start (datetime): 開始日時（含む）
+            end (datetime): 終了日時（含まない）
+
+        Returns:
+            list[SpeedtestResult]: 計測日時順の計測結果（速度は M オーダー）
+        """
+
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "SELECT {0} FROM results "
+                "WHERE timestamp >= ? AND timestamp < ? "
+                "ORDER BY timestamp".format(", ".join(self.COLUMNS)),
+                (int(start.timestamp()), int(end.timestamp())),
+            )
+
+            return [
+                SpeedtestResult(
+                    tested_datetime=datetime.fromtimestamp(row[1]),
+                    target=row[0],
+                    **dict(zip(NUMERIC_COLUMNS, row[2:-2])),
+                    user_location=row[-2],
+                    user_ip=row[-1],
+                )
+                for row in cursor
+            ]
+
+    def export_csv(self, target_date: date, convert_byte: bool) -> str:
+        start: datetime = datetime.combine(target_date, datetime.min.time())
+        file_path: str = self.get_csv_path(target_date)
+        results: list[SpeedtestResult] = self.read_results(
+            start, start + timedelta(days=1)
+        )
+
+        if not results:
+            return file_path
+
+        with open(file_path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(make_csv_header(convert_byte))
+            writer.writerows(
+                format_csv_row(
+                    loaded.tested_datetime,
+                    loaded.target,
+                    tuple(getattr(loaded, name) for name in NUMERIC_COLUMNS),
+                    loaded.user_location,
+                    loaded.user_ip,
+                )
+                for loaded in results
+            )
+
+        return file_path
+
+
+@utility.recording
+def open_storage(kind: str, record_dir_path: str, convert_byte: bool) -> Storage:
+    """保存形式に応じた保存先を作成する
+
+    Args:
+        kind (str): 保存形式（STORAGE_KINDS のいずれか）
+        record_dir_path (str): ネットワーク速度計測結果ディレクトリパス
+        convert_byte (bool): byte にするフラグ
+
+    Raises:
+        ValueError: 不明な保存形式の場合
+
+    Returns:
+        Storage: 保存先
+    """
+
+    if kind == "csv":
+        return CsvStorage(record_dir_path, convert_byte)
+    elif kind == "columnar":
+        return ColumnarStorage(record_dir_path)
+    elif kind == "sqlite":
+        return SqliteStorage(record_dir_path)
+    else:
+        raise ValueError(f"不明な保存形式です。: {kind}")
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
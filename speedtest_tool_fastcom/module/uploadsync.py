@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from speedtest_tool_fastcom.module import logmng, utility
+
+# アップロード先に置く同期記録ファイル名
+SYNC_MANIFEST_FILE_NAME: str = ".fastcom_sync.json"
+
+# ハッシュを計算する時に 1 度に読み込む大きさ [byte]
+HASH_CHUNK_SIZE: int = 1024 * 1024
+
+
+@dataclass
+class SyncStats:
+    """1 回の同期の集計
+
+    Args:
+        copied (list[str]): コピーしたファイル名
+        skipped (list[str]): アップロード先と同じ内容の為コピーしなかったファイル名
+        copied_bytes (int): コピーした量 [byte]
+    """
+
+    copied: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    copied_bytes: int = 0
+
+
+def hash_file(file_path: str) -> str:
+    """ファイルの SHA-256 を計算する
+
+    Args:
+        file_path (str): ファイルパス
+
+    Returns:
+        str: 16 進数のハッシュ
+    """
+
+    digest = hashlib.sha256()
+
+    with open(file_path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def load_sync_manifest(upload_dir_path: str) -> dict[str, dict[str, Any]]:
+    """アップロード先の同期記録を読み込む
+
+    Args:
+        upload_dir_path (str): アップロード先ディレクトリパス
+
+    Returns:
+        dict[str, dict[str, Any]]: ファイル名毎の sha256, size
+    """
+
+    file_path: str = os.path.join(upload_dir_path, SYNC_MANIFEST_FILE_NAME)
+
+    if not os.path.exists(file_path):
+        return {}
+
+    try:
+        with open(file_path, mode="r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        logmng.logger.warning(f"同期記録が読めない為、全てのファイルをコピーします。 >> {file_path}")
+        return {}
+
+
+def replace_file(src_path: str, dest_path: str) -> None:
+    """一時ファイル名でコピーしてから置き換え、書き込み途中のファイルを読ませない
+
+    Args:
+        src_path (str): コピー元ファイルパス
+        dest_path (str): コピー先ファイルパス
+    """
+
+    dir_path, name = os.path.split(dest_path)
+    temp_path: str = os.path.join(dir_path, f".{name}.{os.getpid()}.tmp")
+
+    try:
+        shutil.copyfile(src_path, temp_path)
+        os.replace(temp_path, dest_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@utility.recording
+def sync_files(file_paths: Iterable[str], upload_dir_path: str) -> SyncStats:
+    """複数のファイルを、アップロード先と内容が異なるものだけコピーする
+
+    アップロード先の同期記録（ファイル名毎の SHA-256 と大きさ）と比べ、
+    同じ内容かつアップロード先に同じ大きさのファイルが有れば飛ばす。
+    コピーは一時ファイル名に書いてから置き換え、同期記録は最後に 1 度だけ書き込む為、
+    何日分ものファイルも 1 回の呼び出しでまとめて同期できる。
+
+    Args:
+        file_paths (Iterable[str]): コピー元ファイルパス
+        upload_dir_path (str): アップロード先ディレクトリパス
+
+    Returns:
+        SyncStats: 同期の集計
+    """
+
+    os.makedirs(upload_dir_path, exist_ok=True)
+
+    manifest: dict[str, dict[str, Any]] = load_sync_manifest(upload_dir_path)
+    stats = SyncStats()
+
+    for file_path in file_paths:
+        name: str = os.path.basename(file_path)
+        dest_path: str = os.path.join(upload_dir_path, name)
+        entry: dict[str, Any] = {
+            "sha256": hash_file(file_path),
+            "size": os.path.getsize(file_path),
+        }
+
+        if (
+            manifest.get(name) == entry
+            and os.path.exists(dest_path)
+            and os.path.getsize(dest_path) == entry["size"]
+        ):
+            stats.skipped.append(name)
+            continue
+
+        replace_file(file_path, dest_path)
+        manifest[name] = entry
+        stats.copied.append(name)
+        stats.copied_bytes += entry["size"]
+
+    if stats.copied:
+        manifest_path: str = os.path.join(upload_dir_path, SYNC_MANIFEST_FILE_NAME)
+        temp_path: str = os.path.join(
+            upload_dir_path, f"{SYNC_MANIFEST_FILE_NAME}.{os.getpid()}.tmp"
+        )
+
+        with open(temp_path, mode="w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+        os.replace(temp_path, manifest_path)
+
+    logmng.logger.info(
+        f"{upload_dir_path} に {len(stats.copied)} 件（{stats.copied_bytes} byte）をコピーし、"
+        f"{len(stats.skipped)} 件は同じ内容の為飛ばしました。"
+    )
+
+    return stats
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -2,11 +2,19 @@ from __future__ import annotations
 
 import functools
 import inspect
+import logging
+import os
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import IO, Any
 
 from speedtest_tool_fastcom.module import logmng
 
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
 FORMAT_DATE_LONG: str = "%Y-%m-%d %H:%M:%S"
 FORMAT_DATE_SHORT: str = "%Y-%m-%d"
 
@@ -24,44 +32,197 @@ class ValuePrefix(Enum):
     T = 12
 
 
-def recording(f):
+class TraceSetting:
+    """関数 (メソッド) 毎の呼び出し記録の設定
+
+    Args:
+        level (int): 記録するログレベル
+        sample_every (int): 何回の呼び出し毎に 1 回記録するか
+    """
+
+    __slots__ = ("enabled", "level", "sample_every", "calls", "signature")
+
+    def __init__(self, level: int = logging.INFO, sample_every: int = 1) -> None:
+        self.enabled: bool = True
+        self.level: int = level
+        self.sample_every: int = sample_every
+        self.calls: int = 0
+        self.signature: inspect.Signature | None = None
+
+    def should_trace(self) -> bool:
+        """今回の呼び出しを記録するか判定する
+
+        無効化されている、又はログレベルが出力されない場合は呼び出し回数も数えない。
+
+        Returns:
+            bool: 記録するフラグ
+        """
+
+        if not self.enabled or not logmng.logger.isEnabledFor(self.level):
+            return False
+
+        self.calls += 1
+
+        return self.sample_every <= 1 or self.calls % self.sample_every == 1
+
+
+# 呼び出しを記録する関数 (メソッド) の "<モジュール名>.<修飾名>" に対する設定
+trace_settings: dict[str, TraceSetting] = {}
+
+# set_tracing で指定した関数名と変更内容、後から読み込まれたモジュールの関数にも適用する
+trace_overrides: list[tuple[str, dict[str, Any]]] = []
+
+
+def _match_trace_name(key: str, name: str) -> bool:
+    # 空文字は全て、それ以外は "<モジュール名>.<修飾名>" か末尾の名前が一致するものとする
+    return not name or key == name or key.endswith("." + name)
+
+
+class _CallArguments:
+    """ログ出力時に初めて引数を文字列にする"""
+
+    __slots__ = ("f", "setting", "args", "kwargs")
+
+    def __init__(self, f, setting: TraceSetting, args: tuple, kwargs: dict) -> None:
+        self.f = f
+        self.setting: TraceSetting = setting
+        self.args: tuple = args
+        self.kwargs: dict = kwargs
+
+    def __str__(self) -> str:
+        # シグネチャは初めて記録する時に取得し、以降は使い回す
+        if self.setting.signature is None:
+            self.setting.signature = inspect.signature(self.f)
+
+        try:
+            arguments = self.setting.signature.bind(*self.args, **self.kwargs).arguments
+        except TypeError:
+            arguments = dict(enumerate(self.args), **self.kwargs)
+
+        return ",".join("{k}={v}".format(k=k, v=v) for k, v in arguments.items())
+
+
+def set_tracing(
+    name: str = "",
+    enabled: bool | None = None,
+    sample_every: int | None = None,
+    level: int | None = None,
+) -> None:
+    """関数 (メソッド) の呼び出し記録の設定を変更する
+
+    登録済みの関数に加え、この後に読み込まれたモジュールで recording が登録する関数にも適用する。
+
+    Args:
+        name (str): 関数名、"<モジュール名>.<修飾名>"、空文字の場合は全て
+        enabled (bool | None): 記録するフラグ、None の場合は変更しない
+        sample_every (int | None): 何回の呼び出し毎に 1 回記録するか、None の場合は変更しない
+        level (int | None): 記録するログレベル、None の場合は変更しない
+    """
+
+    changes: dict[str, Any] = {
+        attribute: value
+        for attribute, value in (
+            ("enabled", enabled),
+            ("sample_every", sample_every),
+            ("level", level),
+        )
+        if value is not None
+    }
+    trace_overrides.append((name, changes))
+
+    for key, setting in trace_settings.items():
+        if _match_trace_name(key, name):
+            for attribute, value in changes.items():
+                setattr(setting, attribute, value)
+
+
+def warn_unmatched_tracing() -> None:
+    """set_tracing で指定した関数名のうち、登録された関数に一致しなかったものを警告する
+
+    関数名の誤りに気付けるよう、対象のモジュールを読み込み終えた後に呼ぶ。
+    """
+
+    for name, _ in trace_overrides:
+        if name and not any(_match_trace_name(key, name) for key in trace_settings):
+            logmng.logger.warning(f"呼び出し記録の設定の {name} に一致する関数がありません。")
+
+
+def recording(f=None, *, level: int = logging.INFO, sample_every: int = 1):
     """関数 (メソッド) の呼び出しを記録するデコレータです。
 
     受け取ったパラメータと返り値をログに出力します。
+    ログレベルが出力されない場合や set_tracing で無効化された場合は、
+    引数のバインドや文字列への整形をせずにそのまま関数を呼び出します。
+    コルーチン関数は await した結果を記録します。
+    設定はデコレート後の関数の trace_setting 属性からも変更できます。
 
     https://blog.amedama.jp/entry/2016/10/31/225219
 
     Args:
         f (Any): 関数
+        level (int): 記録するログレベル
+        sample_every (int): 何回の呼び出し毎に 1 回記録するか
 
     Returns:
         Any: 結果
     """
 
+    if f is None:
+        return functools.partial(recording, level=level, sample_every=sample_every)
+
+    key: str = f"{f.__module__}.{f.__qualname__}"
+    setting = TraceSetting(level, sample_every)
+    trace_settings[key] = setting
+
+    # 先に set_tracing で指定された設定を適用する
+    for name, changes in trace_overrides:
+        if _match_trace_name(key, name):
+            for attribute, value in changes.items():
+                setattr(setting, attribute, value)
+    fmt: str = "★ called %s(%s) -> %s"
+
+    if inspect.iscoroutinefunction(f):
+
+        @functools.wraps(f)
+        async def _async_recording(*args, **kwargs):
+            result = await f(*args, **kwargs)
+
+            if setting.should_trace():
+                logmng.logger.log(
+                    setting.level,
+                    fmt,
+                    f.__name__,
+                    _CallArguments(f, setting, args, kwargs),
+                    result,
+                )
+
+            return result
+
+        _async_recording.trace_setting = setting  # type: ignore
+        return _async_recording
+
     @functools.wraps(f)
     def _recording(*args, **kwargs):
         # 表面上は元々の関数 (メソッド) がそのまま実行されたように振る舞う
         result = f(*args, **kwargs)
-        # デコレーションする関数のシグネチャを取得する
-        sig = inspect.signature(f)
-        # 受け取ったパラメータをシグネチャにバインドする
-        bound_args = sig.bind(*args, **kwargs)
-        # 関数名やバインドしたパラメータの対応関係を取得する
-        func_name = f.__name__
-        func_args = ",".join(
-            "{k}={v}".format(k=k, v=v) for k, v in bound_args.arguments.items()
-        )
-        # ログに残す
-        fmt = "★ called {func_name}({func_args}) -> {result}"
-        msg = fmt.format(func_name=func_name, func_args=func_args, result=result)
-        logmng.logger.info(msg)
-        # 結果を返す
+
+        # 記録しない場合は整形せずに結果を返す
+        if setting.should_trace():
+            logmng.logger.log(
+                setting.level,
+                fmt,
+                f.__name__,
+                _CallArguments(f, setting, args, kwargs),
+                result,
+            )
+
         return result
 
+    _recording.trace_setting = setting  # type: ignore
     return _recording
 
 
-@recording
+@recording(level=logging.DEBUG)
 def bits_to_byte(value_bits: float) -> float:
     """bit から byte に変換する
 
@@ -75,7 +236,7 @@ def bits_to_byte(value_bits: float) -> float:
     return value_bits / 8
 
 
-@recording
+@recording(level=logging.DEBUG)
 def change_order(value: float, value_prefix: ValuePrefix) -> float:
     """数値のオーダーを変換する
 
@@ -90,7 +251,7 @@ def change_order(value: float, value_prefix: ValuePrefix) -> float:
     return value / 10**value_prefix.value
 
 
-@recording
+@recording(level=logging.DEBUG)
 def clear_order(value: float, units: str) -> float:
     """値を指定の単位に合わせてオーダーを取り除く（kilo, mega とかを無くす）
 
@@ -143,5 +304,76 @@ def round_datetime(dt: datetime) -> datetime:
     return rounded_dt
 
 
+@recording
+def list_months(start: datetime, end: datetime) -> list[str]:
+    """期間に含まれる年月を列挙する
+
+    Args:
+        start (datetime): 開始日時（含む）
+        end (datetime): 終了日時（含まない）
+
+    Returns:
+        list[str]: yyyy-MM 形式の年月のリスト
+    """
+
+    months: list[str] = []
+    year: int = start.year
+    month: int = start.month
+
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    return months
+
+
+def lock_file(f: IO, blocking: bool = True) -> bool:
+    """開いているファイルに排他ロックを掛ける
+
+    ロックはファイルを閉じるかプロセスが終了すると OS が外す為、異常終了しても残らない。
+
+    Args:
+        f (IO): ロックするファイル
+        blocking (bool): 他のプロセスがロックを持っている場合に外れるまで待つフラグ
+
+    Returns:
+        bool: ロックを掛けたフラグ（待たない場合に他のプロセスが持っていると False）
+    """
+
+    if os.name != "nt":
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    # Windows はファイル先頭の 1 byte をロックし、LK_LOCK は約 10 秒で諦める為やり直す
+    while True:
+        f.seek(0)
+        try:
+            msvcrt.locking(
+                f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1
+            )
+        except OSError:
+            if not blocking:
+                return False
+            continue
+        return True
+
+
+def unlock_file(f: IO) -> None:
+    """lock_file で掛けたロックを外す
+
+    Args:
+        f (IO): ロックしたファイル
+    """
+
+    if os.name != "nt":
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
 if __name__ == "__main__":
     logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,693 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Any, Awaitable, Iterator
+
+from speedtest_tool_fastcom.module import logmng, utility
+
+if TYPE_CHECKING:
+    from pyppeteer.browser import Browser
+
+# 計測の段階
+PHASES: tuple[str, ...] = ("launch", "navigation", "download", "upload")
+
+# ブラウザの起動のタイムアウト既定値 [s]
+DEFAULT_LAUNCH_TIMEOUT: float = 60
+
+# Fast.com への遷移のタイムアウト既定値 [s]
+DEFAULT_NAVIGATION_TIMEOUT: float = 60
+
+# ダウンロードの計測のタイムアウト既定値 [s]
+DEFAULT_DOWNLOAD_TIMEOUT: float = 90
+
+# アップロードの計測のタイムアウト既定値 [s]
+DEFAULT_UPLOAD_TIMEOUT: float = 90
+
+# ブラウザ（コンテキスト）の終了を待つ時間 [s]、超えた場合はプロセスを強制終了する
+CLOSE_TIMEOUT: float = 10
+
+# 失敗した計測をやり直す回数の既定値
+DEFAULT_RETRIES: int = 2
+
+# 最初にやり直すまでの待ち時間の既定値 [s]、やり直す毎に 2 倍にする
+DEFAULT_RETRY_BACKOFF: float = 30
+
+# やり直すまでの待ち時間の上限 [s]
+MAX_RETRY_BACKOFF: float = 600
+
+# 多重起動を防ぐロックファイル名
+LOCK_FILE_NAME: str = "fastcom.lock"
+
+# 起動したブラウザのプロセス ID を記録するファイル名
+BROWSER_PIDS_FILE_NAME: str = "browser_pids.json"
+
+# Windows でプロセスが終了していないことを示す終了コード（STILL_ACTIVE）
+STILL_ACTIVE: int = 259
+
+# ブラウザを新しいセッション（プロセスグループ）で起動し直すスクリプト
+# setsid の後に exec する為、ブラウザのプロセス ID は起動したプロセスのものと変わらない
+NEW_SESSION_SCRIPT: str = (
+    "import os, sys; os.setsid(); os.execv(sys.argv[1], sys.argv[1:])"
+)
+
+# 起動したブラウザのプロセス ID を記録するファイルパス、空文字の場合はメモリ上のみで記録する
+browser_pids_path: str = ""
+
+# 起動して終了していないブラウザのプロセス ID とプロセスグループ ID（POSIX 以外は 0）
+browser_pids: dict[int, int] = {}
+
+
+class PhaseError(Exception):
+    """計測の段階の失敗
+
+    Args:
+        phase (str): 失敗した段階（PHASES 又は total）
+        reason (str): 失敗の理由
+    """
+
+    def __init__(self, phase: str, reason: str) -> None:
+        super().__init__(f"{phase}: {reason}")
+        self.phase: str = phase
+        self.reason: str = reason
+
+
+class PhaseTimeoutError(PhaseError, asyncio.TimeoutError):
+    """計測の段階のタイムアウト
+
+    asyncio.TimeoutError でも捕捉できる。
+
+    Args:
+        phase (str): タイムアウトした段階（PHASES 又は total）
+        timeout (float): タイムアウト [s]
+    """
+
+    def __init__(self, phase: str, timeout: float) -> None:
+        super().__init__(phase, f"{timeout} 秒以内に終わりませんでした。")
+        self.timeout: float = timeout
+
+
+class AlreadyRunningError(RuntimeError):
+    """他のプロセスが計測中の場合のエラー
+
+    Args:
+        lock_path (str): ロックファイルパス
+        owner_pid (int): ロックを持っているプロセス ID
+    """
+
+    def __init__(self, lock_path: str, owner_pid: int) -> None:
+        super().__init__(f"プロセス {owner_pid} が計測中です。 >> {lock_path}")
+        self.lock_path: str = lock_path
+        self.owner_pid: int = owner_pid
+
+
+@dataclass(frozen=True)
+class PhaseTimeouts:
+    """計測の段階毎のタイムアウト [s]、0 以下の場合は制限しない
+
+    Args:
+        launch (float): ブラウザの起動
+        navigation (float): Fast.com への遷移（http では計測先の取得）
+        download (float): ダウンロードの計測
+        upload (float): アップロードの計測
+    """
+
+    launch: float = DEFAULT_LAUNCH_TIMEOUT
+    navigation: float = DEFAULT_NAVIGATION_TIMEOUT
+    download: float = DEFAULT_DOWNLOAD_TIMEOUT
+    upload: float = DEFAULT_UPLOAD_TIMEOUT
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """失敗した計測のやり直し方
+
+    Args:
+        retries (int): やり直す回数
+        backoff (float): 最初にやり直すまでの待ち時間 [s]
+        factor (float): やり直す毎に待ち時間に掛ける倍率
+        max_backoff (float): 待ち時間の上限 [s]
+    """
+
+    retries: int = DEFAULT_RETRIES
+    backoff: float = DEFAULT_RETRY_BACKOFF
+    factor: float = 2.0
+    max_backoff: float = MAX_RETRY_BACKOFF
+
+    def get_delay(self, attempt: int) -> float:
+        """失敗した回数に応じたやり直すまでの待ち時間を取得する
+
+        Args:
+            attempt (int): 失敗した計測の回数（1 始まり）
+
+        Returns:
+            float: 待ち時間 [s]
+        """
+
+        return min(self.backoff * self.factor ** (attempt - 1), self.max_backoff)
+
+
+async def run_phase(phase: str, awaitable: Awaitable[Any], timeout: float) -> Any:
+    """計測の段階をタイムアウト付きで実行し、失敗を段階名付きのエラーにする
+
+    Args:
+        phase (str): 段階名（PHASES 又は total）
+        awaitable (Awaitable[Any]): 段階の処理
+        timeout (float): タイムアウト [s]、0 以下の場合は制限しない
+
+    Raises:
+        PhaseTimeoutError: タイムアウトした場合
+        PhaseError: 段階の処理が失敗した場合
+
+    Returns:
+        Any: 段階の処理の戻り値
+    """
+
+    try:
+        return await asyncio.wait_for(awaitable, timeout if timeout > 0 else None)
+    except PhaseError:
+        raise
+    except asyncio.TimeoutError as e:
+        raise PhaseTimeoutError(phase, timeout) from e
+    except Exception as e:
+        raise PhaseError(phase, f"{type(e).__name__}: {e}") from e
+
+
+def is_process_alive(pid: int) -> bool:
+    """プロセスが動いているか判定する
+
+    Args:
+        pid (int): プロセス ID
+
+    Returns:
+        bool: 動いている場合は True
+    """
+
+    if pid <= 0:
+        return False
+
+    if os.name == "nt":
+        import ctypes
+
+        # Windows の os.kill はシグナル 0 でもプロセスを終了させる為、API で確かめる
+        kernel32 = ctypes.windll.kernel32  # type: ignore
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+
+        if not handle:
+            return False
+
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+
+        return exit_code.value == STILL_ACTIVE
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    # 強制終了して親に回収されていないゾンビは終了済みとみなす
+    try:
+        with open(f"/proc/{pid}/stat", mode="r", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def iter_process_stats() -> Iterator[tuple[int, list[str]]]:
+    """/proc から全てのプロセスの状態を取得する
+
+    Yields:
+        Iterator[tuple[int, list[str]]]: プロセス ID と /proc/<pid>/stat のプロセス名より後ろの項目
+                                         （状態、親のプロセス ID、プロセスグループ ID の順）
+    """
+
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+
+        try:
+            with open(f"/proc/{name}/stat", mode="r", encoding="utf-8") as f:
+                # プロセス名に空白や括弧を含みうる為、最後の ")" の後ろから読む
+                fields: list[str] = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+
+        yield int(name), fields
+
+
+def get_process_tree(pid: int) -> list[int]:
+    """プロセスと子孫のプロセス ID を取得する
+
+    /proc が無い環境では子孫を辿らず、プロセス自身のみとする。
+
+    Args:
+        pid (int): プロセス ID
+
+    Returns:
+        list[int]: プロセス自身と子孫のプロセス ID
+    """
+
+    if not os.path.isdir("/proc"):
+        return [pid]
+
+    children: dict[int, list[int]] = {}
+
+    for child_pid, fields in iter_process_stats():
+        children.setdefault(int(fields[1]), []).append(child_pid)
+
+    tree: list[int] = [pid]
+    index: int = 0
+
+    while index < len(tree):
+        tree.extend(children.get(tree[index], []))
+        index += 1
+
+    return tree
+
+
+def get_process_group(pgid: int) -> list[int]:
+    """プロセスグループに属する動いているプロセス ID を取得する
+
+    /proc が無い環境ではグループのリーダーのみとする。
+
+    Args:
+        pgid (int): プロセスグループ ID
+
+    Returns:
+        list[int]: プロセスグループに属するプロセス ID
+    """
+
+    if not os.path.isdir("/proc"):
+        return [pgid] if is_process_alive(pgid) else []
+
+    return [
+        pid
+        for pid, fields in iter_process_stats()
+        if fields[0] != "Z" and int(fields[2]) == pgid
+    ]
+
+
+def get_process_group_id(pid: int) -> int:
+    """プロセスのプロセスグループ ID を取得する
+
+    Args:
+        pid (int): プロセス ID
+
+    Returns:
+        int: プロセスグループ ID、Windows の場合と取得できない場合は 0
+    """
+
+    if os.name == "nt":
+        return 0
+
+    try:
+        return os.getpgid(pid)
+    except (ProcessLookupError, PermissionError):
+        return 0
+
+
+def in_new_session(cmd: list[str]) -> list[str]:
+    """コマンドを新しいセッションで実行するコマンドにする
+
+    ブラウザをプロセスグループのリーダーとして起動し、本体が先に終了して孤立した
+    レンダラ等のプロセスもグループごと強制終了できるようにする。Windows ではそのまま返す。
+
+    Args:
+        cmd (list[str]): コマンド
+
+    Returns:
+        list[str]: 新しいセッションで実行するコマンド
+    """
+
+    if os.name == "nt":
+        return cmd
+
+    return [sys.executable, "-c", NEW_SESSION_SCRIPT, *cmd]
+
+
+def is_browser_process(pid: int) -> bool:
+    """プロセスが Chromium か判定する（記録したプロセス ID が他のプロセスに再利用されていないか）
+
+    Args:
+        pid (int): プロセス ID
+
+    Returns:
+        bool: コマンドラインに chrom を含む場合は True
+    """
+
+    if os.name == "nt":
+        completed = subprocess.run(
+            ["tasklist", "/FI", f"PID eq {pid}", "/NH"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=False,
+        )
+        return "chrom" in completed.stdout.lower()
+
+    try:
+        with open(f"/proc/{pid}/cmdline", mode="rb") as f:
+            return b"chrom" in f.read().lower()
+    except OSError:
+        # /proc が無い環境では確かめられない為、ブラウザとみなす
+        return not os.path.isdir("/proc")
+
+
+def kill_processes(pids: list[int]) -> list[int]:
+    """プロセスを強制終了する
+
+    POSIX ではプロセスが自身のプロセスグループのリーダーであればグループごと終了させ、
+    Windows では taskkill で子孫ごと終了させる。
+
+    Args:
+        pids (list[int]): プロセス ID（get_process_tree の戻り値）
+
+    Returns:
+        list[int]: 強制終了したプロセス ID
+    """
+
+    killed: list[int] = []
+
+    for pid in pids:
+        if not is_process_alive(pid):
+            continue
+
+        try:
+            if os.name == "nt":
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(pid)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    check=False,
+                )
+            elif os.getpgid(pid) == pid:
+                os.killpg(pid, signal.SIGKILL)
+            else:
+                os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            continue
+
+        killed.append(pid)
+
+    if killed:
+        logmng.logger.warning(
+            f"終了しないブラウザのプロセスを強制終了しました。 >> {killed}",
+        )
+
+    return killed
+
+
+def kill_process_group(pgid: int) -> list[int]:
+    """ブラウザのプロセスグループを強制終了する
+
+    グループ ID が再利用されている場合に他のプロセスを巻き込まないよう、
+    グループに Chromium のプロセスが残っている場合のみ終了させる。
+
+    Args:
+        pgid (int): プロセスグループ ID（0 の場合は何もしない）
+
+    Returns:
+        list[int]: 強制終了したプロセス ID
+    """
+
+    if os.name == "nt" or pgid <= 0:
+        return []
+
+    members: list[int] = get_process_group(pgid)
+
+    if not any(is_browser_process(pid) for pid in members):
+        return []
+
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        return []
+
+    logmng.logger.warning(
+        "終了しないブラウザのプロセスグループを強制終了しました。 >> %s: %s",
+        pgid,
+        members,
+    )
+
+    return members
+
+
+def save_browser_pids() -> None:
+    """起動して終了していないブラウザのプロセス ID を記録ファイルに保存する"""
+
+    if not browser_pids_path:
+        return
+
+    temp_path: str = f"{browser_pids_path}.{os.getpid()}.tmp"
+
+    with open(temp_path, mode="w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "owner": os.getpid(),
+                "browsers": [[pid, pgid] for pid, pgid in sorted(browser_pids.items())],
+            },
+            f,
+        )
+
+    os.replace(temp_path, browser_pids_path)
+
+
+def register_browser(pid: int) -> None:
+    """起動したブラウザのプロセス ID とプロセスグループ ID を記録する
+
+    Args:
+        pid (int): ブラウザのプロセス ID
+    """
+
+    browser_pids[pid] = get_process_group_id(pid)
+    save_browser_pids()
+
+
+def unregister_browser(pid: int) -> None:
+    """終了したブラウザのプロセス ID を記録から除く
+
+    Args:
+        pid (int): ブラウザのプロセス ID
+    """
+
+    browser_pids.pop(pid, None)
+    save_browser_pids()
+
+
+def kill_orphan_browsers(file_path: str) -> list[int]:
+    """前回までのプロセスが終了させずに残したブラウザを強制終了する
+
+    ロックを取得した後に呼ぶ為、記録ファイルに残っているのは
+    異常終了したプロセスが起動したブラウザのみとなる。
+
+    Args:
+        file_path (str): ブラウザのプロセス ID の記録ファイルパス
+
+    Returns:
+        list[int]: 強制終了したプロセス ID
+    """
+
+    if not os.path.exists(file_path):
+        return []
+
+    try:
+        with open(file_path, mode="r", encoding="utf-8") as f:
+            stored: dict[str, Any] = json.load(f)
+    except ValueError:
+        logmng.logger.warning(
+            f"ブラウザのプロセス ID の記録が読めない為、無視します。 >> {file_path}",
+        )
+        return []
+
+    if stored.get("owner") == os.getpid():
+        return []
+
+    killed: list[int] = []
+    pids: list[int] = []
+
+    # プロセスグループ ID を記録していなかった版の記録ファイルはプロセス ID のみで終了させる
+    browsers: list[list[int]] = stored.get(
+        "browsers", [[pid, 0] for pid in stored.get("pids", [])]
+    )
+
+    for pid, pgid in browsers:
+        killed.extend(kill_process_group(pgid))
+
+        if is_process_alive(pid) and is_browser_process(pid):
+            pids.extend(get_process_tree(pid))
+
+    return killed + kill_processes(pids)
+
+
+def watch_browsers(file_path: str) -> list[int]:
+    """前回までの残りのブラウザを強制終了し、起動するブラウザのプロセス ID を記録し始める
+
+    Args:
+        file_path (str): ブラウザのプロセス ID の記録ファイルパス
+
+    Returns:
+        list[int]: 強制終了したプロセス ID
+    """
+
+    global browser_pids_path
+
+    killed: list[int] = kill_orphan_browsers(file_path)
+    browser_pids_path = file_path
+    save_browser_pids()
+
+    return killed
+
+
+def kill_browsers() -> list[int]:
+    """終了していない全てのブラウザを子孫ごと強制終了する（異常終了時の後始末）
+
+    Returns:
+        list[int]: 強制終了したプロセス ID
+    """
+
+    killed: list[int] = []
+    pids: list[int] = []
+
+    for pid, pgid in sorted(browser_pids.items()):
+        pids.extend(get_process_tree(pid))
+        killed.extend(kill_process_group(pgid))
+
+    killed += kill_processes(pids)
+    browser_pids.clear()
+    save_browser_pids()
+
+    return killed
+
+
+def exit_on_terminate() -> None:
+    """SIGTERM を受けたら SystemExit を送出し、finally でのブラウザの後始末とロックの解放を行わせる
+
+    Windows では SIGTERM で終了させる手段が無い為、何もしない。
+    """
+
+    if os.name == "nt":
+        return
+
+    def handle(signum: int, frame: Any) -> None:
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handle)
+
+
+async def close_browser(browser: Browser, timeout: float = CLOSE_TIMEOUT) -> None:
+    """ブラウザを終了し、終了しなかったプロセスをプロセスグループと子孫ごと強制終了する
+
+    終了させる前に子孫のプロセスを辿っておき、起動時のプロセスグループも終了させる為、
+    ブラウザ本体が先に終了して孤立したレンダラ等のプロセスも強制終了できる。
+
+    Args:
+        browser (Browser): 終了するブラウザ
+        timeout (float): 終了を待つ時間 [s]
+    """
+
+    process: subprocess.Popen | None = getattr(browser, "process", None)
+    pids: list[int] = get_process_tree(process.pid) if process is not None else []
+
+    try:
+        await asyncio.wait_for(browser.close(), timeout)
+    except Exception:
+        logmng.logger.exception("ブラウザの終了に失敗した為、強制終了します。")
+    finally:
+        if process is not None:
+            # 終了を回収済みのブラウザ本体は、プロセス ID が再利用されうる為に除く
+            if process.poll() is not None:
+                pids = [pid for pid in pids if pid != process.pid]
+
+            kill_process_group(browser_pids.get(process.pid, 0))
+            kill_processes(pids)
+            unregister_browser(process.pid)
+
+
+class RunLock:
+    """ロックファイルで計測の多重起動を防ぐ
+
+    ロックファイルを開いたまま OS のファイルロック（Windows は msvcrt）を掛け、
+    取得したプロセス ID を書く。ロックはプロセスが異常終了しても OS が外す為、
+    残ったロックファイルを消して取り直す必要が無く、複数のプロセスが同時に取り直して
+    共に計測することも無い。ロックファイル自体は消さずに残す。
+
+    Args:
+        file_path (str): ロックファイルパス
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path: str = file_path
+        self.is_locked: bool = False
+        self._file: IO | None = None
+
+    def acquire(self) -> None:
+        """ロックを取得する
+
+        Raises:
+            AlreadyRunningError: 動いている他のプロセスがロックを持っている場合
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+
+        f: IO = os.fdopen(
+            os.open(self.file_path, os.O_CREAT | os.O_RDWR, 0o644),
+            mode="r+",
+            encoding="utf-8",
+        )
+
+        if not utility.lock_file(f, blocking=False):
+            f.close()
+            raise AlreadyRunningError(self.file_path, self._read_owner())
+
+        f.seek(0)
+        f.truncate()
+        json.dump({"pid": os.getpid(), "started": time.time()}, f)
+        f.flush()
+
+        self._file = f
+        self.is_locked = True
+
+    def release(self) -> None:
+        """取得したロックを解放する"""
+
+        if not self.is_locked or self._file is None:
+            return
+
+        self.is_locked = False
+
+        # 次に取得するプロセスが同じファイルをロックするよう、消さずに中身だけ空にする
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.flush()
+        utility.unlock_file(self._file)
+        self._file.close()
+        self._file = None
+
+    def _read_owner(self) -> int:
+        try:
+            with open(self.file_path, mode="r", encoding="utf-8") as f:
+                return int(json.load(f)["pid"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # 書き込み途中か空の場合は、持ち主が分からないものとする
+            return 0
+
+    def __enter__(self) -> RunLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
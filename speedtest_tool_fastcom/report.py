@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+import sys
+from argparse import ArgumentParser, Namespace
+from datetime import date, timedelta
+
+from speedtest_tool_fastcom.module import batchreport, logmng, staticreport
+
+
+def get_option() -> Namespace:
+    """オプション引数
+
+    :return: オプション引数の名前空間
+    :rtype: Namespace
+    """
+    argparser = ArgumentParser()
+    argparser.add_argument(
+        "-s",
+        "--save_path",
+        type=str,
+        default="",
+        help="collecting data save to path",
+    )
+    argparser.add_argument(
+        "-u",
+        "--upload_path",
+        type=str,
+        default="",
+        help="collected data upload to path",
+    )
+    argparser.add_argument(
+        "--from",
+        dest="range_from",
+        type=date.fromisoformat,
+        required=True,
+        help="first date (yyyy-MM-dd) of the reports to regenerate",
+    )
+    argparser.add_argument(
+        "--to",
+        dest="range_to",
+        type=date.fromisoformat,
+        default=None,
+        help="last date (yyyy-MM-dd) of the reports to regenerate, yesterday by default",
+    )
+    argparser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of processes regenerating reports in parallel",
+    )
+    argparser.add_argument(
+        "--report_format",
+        type=str,
+        choices=staticreport.REPORT_FORMATS,
+        default="bokeh",
+        help="daily report as a bokeh html"
+        " or as data files for the shared static viewer",
+    )
+    argparser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate reports even if their record files are unchanged",
+    )
+    return argparser.parse_args()
+
+
+def print_progress(progress: batchreport.ReportProgress) -> None:
+    """進捗を 1 行で標準エラー出力に上書きして出す
+
+    Args:
+        progress (batchreport.ReportProgress): 一括作成の進捗
+    """
+
+    sys.stderr.write(
+        f"\r{progress.done + progress.failed}/{progress.total} "
+        f"({progress.reports_per_second:.2f} reports/s, "
+        f"{progress.megabytes_per_second:.2f} MB/s, failed {progress.failed})"
+    )
+    sys.stderr.flush()
+
+
+def main() -> None:
+    """
+    期間内の日毎の計測レポートを並行に作り直す。
+    """
+
+    args: Namespace = get_option()
+
+    logmng.set_logger(
+        os.path.abspath("{0}/log/speedtest_fastcom.log".format(args.save_path))
+    )
+
+    logmng.logger.info("Start Report")
+
+    record_dir_path: str = os.path.abspath("{0}/dest".format(args.save_path))
+
+    progress: batchreport.ReportProgress = batchreport.regenerate_reports(
+        record_dir_path,
+        args.upload_path,
+        args.range_from,
+        args.range_to or date.today() - timedelta(days=1),
+        args.jobs,
+        args.force,
+        print_progress,
+        args.report_format,
+    )
+
+    sys.stderr.write(
+        f"\nregenerated {progress.done}, skipped {progress.skipped}, "
+        f"failed {progress.failed} in {progress.elapsed:.1f} s\n"
+    )
+
+    logmng.logger.info("End Report")
+
+    if progress.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
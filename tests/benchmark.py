@@ -0,0 +1,1149 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import functools
+import inspect
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+try:
+    import resource
+except ImportError:
+    # Windows では CPU 時間のみ計測し、最大 RSS は記録しない
+    resource = None
+
+from speedtest_tool_fastcom.module import (
+    datacap,
+    httpengine,
+    logmng,
+    recorder,
+    reporter,
+    speedtest,
+    staticreport,
+    storage,
+    utility,
+)
+from speedtest_tool_fastcom.module.result import (
+    ResultColumns,
+    SpeedtestResult,
+    make_csv_header,
+)
+from tests import stubserver
+
+if TYPE_CHECKING:
+    # pyppeteer が無い環境でもブラウザを使わないケースは実行できるよう、使うケースの中で読み込む
+    from pyppeteer.page import Page
+
+# 旧実装で 1 回のポーリング毎に読み取っていた要素（セレクタ, 数値フラグ）
+LEGACY_SELECTORS: tuple[tuple[str, bool], ...] = (
+    ("#speed-value", True),
+    ("#speed-units", False),
+    ("#down-mb-value", True),
+    ("#upload-value", True),
+    ("#upload-units", False),
+    ("#up-mb-value", True),
+    ("#latency-value", True),
+    ("#bufferbloat-value", True),
+    ("#user-location", False),
+    ("#user-ip", False),
+)
+
+# suite ケースで計測する関数
+SUITE_FUNCTIONS: tuple[str, ...] = (
+    "run_speedtest",
+    "record_to_csv",
+    "get_result_csv",
+    "make_network_speed_graph",
+    "make_streaming_graph",
+    "make_day_data",
+)
+
+# suite ケースの計測データ記録ファイルの行数の既定値
+SUITE_ROWS: str = "1440,14400,100000"
+
+# suite ケースでスタブサーバから転送する量の既定値 [byte]
+SUITE_PAYLOAD_BYTES: str = "1048576,8388608"
+
+# suite ケースでスタブサーバが転送する速度の上限の既定値 [byte/s]
+SUITE_RATE: float = 16 * 1024 * 1024
+
+# suite ケースで前回より悪化したとみなす割合の既定値
+SUITE_TOLERANCE: float = 0.2
+
+# suite ケースで行数に依らず最大 RSS が一定となるべき関数
+SUITE_CONSTANT_MEMORY_FUNCTIONS: tuple[str, ...] = ("make_streaming_graph",)
+
+# importtime ケースでのサブコマンド毎の読み込み時間の上限の既定値 [ms]
+IMPORT_BUDGET_MS: float = 300
+
+# importtime ケースでサブコマンド毎に読み込んではいけない重いモジュール
+IMPORT_FORBIDDEN: dict[str, tuple[str, ...]] = {
+    "measure": ("bokeh", "numpy", "pyppeteer"),
+    "report": ("pyppeteer",),
+    "upload": ("bokeh", "numpy", "pyppeteer"),
+}
+
+
+class CdpMessageCounter:
+    """ページの CDP セッションから送信されたメッセージ数を数える
+
+    Args:
+        page (Page): 計数対象のページ
+    """
+
+    def __init__(self, page: Page) -> None:
+        self.count: int = 0
+        self._client = page._client
+        self._send = self._client.send
+        self._client.send = self._counting_send
+
+    def _counting_send(self, method: str, params: dict | None = None) -> Awaitable:
+        self.count += 1
+        return self._send(method, params)
+
+    def restore(self) -> None:
+        """計数を止めて元の送信処理に戻す"""
+
+        self._client.send = self._send
+
+
+async def legacy_poll(page: Page) -> None:
+    """要素毎に querySelector と evaluate を行う旧実装のポーリング
+
+    Args:
+        page (Page): Fast.com を開いているページ
+    """
+
+    for selector, is_number in LEGACY_SELECTORS:
+        script: str = (
+            "(elm) => Number(elm.textContent.trim())"
+            if is_number
+            else "(elm) => elm.textContent.trim()"
+        )
+        await page.evaluate(script, await page.querySelector(selector))
+
+    await page.querySelector("#speed-value.succeeded")
+    await page.querySelector("#upload-value.succeeded")
+
+
+async def bench_cdp_messages_per_poll(polls: int) -> dict[str, Any]:
+    """1 回のポーリング当たりの CDP メッセージ数と所要時間を計測する
+
+    Args:
+        polls (int): ポーリング回数
+
+    Returns:
+        dict[str, Any]: ポーリング方式毎の計測結果
+    """
+
+    from pyppeteer import launch
+
+    browser = await launch(logLevel=logging.WARNING)
+    page = await browser.newPage()
+    await page.setContent(stubserver.make_stub_page())
+
+    pollers: dict[str, Callable[[Page], Awaitable[Any]]] = {
+        "legacy": legacy_poll,
+        "snapshot": speedtest.get_snapshot,
+    }
+    results: dict[str, Any] = {}
+
+    for name, poll in pollers.items():
+        counter = CdpMessageCounter(page)
+        started: float = time.perf_counter()
+
+        for _ in range(polls):
+            await poll(page)
+
+        elapsed: float = time.perf_counter() - started
+        counter.restore()
+
+        results[name] = {
+            "messages_per_poll": counter.count / polls,
+            "seconds_per_poll": elapsed / polls,
+        }
+
+    await browser.close()
+
+    return results
+
+
+async def legacy_wait(page: Page) -> dict[str, float | str | bool]:
+    """5 秒毎にポーリングする旧実装の計測完了待ち
+
+    Args:
+        page (Page): Fast.com を開いているページ
+
+    Returns:
+        dict[str, float | str | bool]: 完了時点の計測値
+    """
+
+    snapshot: dict[str, float | str | bool] = {"is_done": False}
+
+    while not snapshot["is_done"]:
+        snapshot = await speedtest.get_snapshot(page)
+        await asyncio.sleep(5)
+
+    return snapshot
+
+
+async def bench_completion(done_ms: int) -> dict[str, Any]:
+    """スタブページの計測完了から検知までの時間とブラウザ起動時間を計測する
+
+    Args:
+        done_ms (int): スタブページが計測完了となるまでの時間 [ms]
+
+    Returns:
+        dict[str, Any]: 完了待ち方式毎の計測結果
+    """
+
+    from pyppeteer import launch
+
+    waiters: dict[str, Callable[[Page], Awaitable[Any]]] = {
+        "legacy": legacy_wait,
+        "event": speedtest.wait_for_done,
+    }
+    results: dict[str, Any] = {}
+
+    for name, wait in waiters.items():
+        started: float = time.perf_counter()
+        browser = await launch(logLevel=logging.WARNING)
+        page = await browser.newPage()
+        await page.setContent(
+            stubserver.make_stub_page(
+                download_done_ms=done_ms // 2, upload_done_ms=done_ms
+            )
+        )
+        loaded: float = time.perf_counter()
+
+        await wait(page)
+        detected: float = time.perf_counter()
+
+        await browser.close()
+        closed: float = time.perf_counter()
+
+        results[name] = {
+            "detection_lag_seconds": detected - loaded - done_ms / 1000,
+            "browser_resident_seconds": closed - started,
+        }
+
+    return results
+
+
+def make_sample_columns(
+    start: datetime, days: int, interval_minutes: int
+) -> ResultColumns:
+    """ベンチマーク用の計測結果を作成する
+
+    Args:
+        start (datetime): 開始日時
+        days (int): 日数
+        interval_minutes (int): 計測間隔 [min]
+
+    Returns:
+        ResultColumns: 計測結果
+    """
+
+    columns = ResultColumns()
+    first: int = int(start.timestamp())
+    step: int = interval_minutes * 60
+
+    for index in range(days * 24 * 60 // interval_minutes):
+        phase: float = math.sin(index / 96)
+        columns.append(
+            first + index * step,
+            (120 + 40 * phase, 45 + 10 * phase, 8.0, 24 + 6 * phase, 250.0, 90.0),
+        )
+
+    return columns
+
+
+def bench_storage_read(
+    days: int, targets: int, interval_minutes: int
+) -> dict[str, Any]:
+    """保存形式毎に期間内の全計測結果を読み込む時間を計測する
+
+    Args:
+        days (int): 日数
+        targets (int): 計測対象数
+        interval_minutes (int): 計測間隔 [min]
+
+    Returns:
+        dict[str, Any]: 保存形式毎の計測結果
+    """
+
+    start = datetime(2022, 1, 1)
+    end: datetime = start + timedelta(days=days)
+    columns: ResultColumns = make_sample_columns(start, days, interval_minutes)
+    results: dict[str, Any] = {"rows": len(columns) * targets}
+
+    with tempfile.TemporaryDirectory() as record_dir_path:
+        csv_storage = storage.CsvStorage(record_dir_path, False)
+        columnar_storage = storage.ColumnarStorage(record_dir_path)
+        sqlite_storage = storage.SqliteStorage(record_dir_path)
+
+        for day in range(days):
+            day_start: datetime = start + timedelta(days=day)
+            day_columns: ResultColumns = columns.slice_by_time(
+                int(day_start.timestamp()),
+                int((day_start + timedelta(days=1)).timestamp()),
+            )
+
+            with open(
+                csv_storage.get_csv_path(day_start.date()),
+                mode="w",
+                newline="",
+                encoding="utf-8",
+            ) as f:
+                writer = csv.writer(f)
+                writer.writerow(make_csv_header(False))
+
+                for target in range(targets):
+                    writer.writerows(day_columns.iter_csv_rows(f"target{target}"))
+
+        for target in range(targets):
+            columnar_storage.write_columns(f"target{target}", columns)
+            sqlite_storage.write_columns(f"target{target}", columns)
+
+        record_storages: dict[str, storage.Storage] = {
+            "csv": csv_storage,
+            "columnar": columnar_storage,
+            "sqlite": sqlite_storage,
+        }
+
+        for name, record_storage in record_storages.items():
+            started: float = time.perf_counter()
+            record_storage.read(start, end)
+            results[f"{name}_read_seconds"] = time.perf_counter() - started
+
+    return results
+
+
+def legacy_get_result_csv(file_path: str) -> dict[str, list[Any]]:
+    """行毎に strptime を 2 回行う旧実装の計測データ記録ファイル読み込み
+
+    Args:
+        file_path (str): ネットワーク速度計測結果 csv ファイルパス
+
+    Returns:
+        dict[str, list[Any]]: グラフの x, y に分けたダウンロード/アップロード速度
+    """
+
+    with open(file_path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+
+        reader.__next__()
+
+        download_speed_list: list[tuple[datetime, float]] = []
+        upload_speed_list: list[tuple[datetime, float]] = []
+
+        for row in reader:
+            download_speed_list.append(
+                (datetime.strptime(row[0], utility.FORMAT_DATE_LONG), float(row[1]))
+            )
+            upload_speed_list.append(
+                (datetime.strptime(row[0], utility.FORMAT_DATE_LONG), float(row[2]))
+            )
+
+    # 旧実装ではグラフ作成時に更に x, y のリストへ分けていた
+    return {
+        f"{name}_{axis}": [value[index] for value in speed_list]
+        for name, speed_list in (
+            ("download_speed", download_speed_list),
+            ("upload_speed", upload_speed_list),
+        )
+        for axis, index in (("x", 0), ("y", 1))
+    }
+
+
+def bench_csv_load(rows: int) -> dict[str, Any]:
+    """計測データ記録ファイルの読み込み時間を旧実装と比較する
+
+    Args:
+        rows (int): 計測データ記録ファイルの行数
+
+    Returns:
+        dict[str, Any]: 読み込み方式毎の計測結果
+    """
+
+    columns: ResultColumns = make_sample_columns(
+        datetime(2022, 1, 1), rows // (24 * 60) + 1, 1
+    )
+    columns = columns.slice_by_time(0, columns.timestamps[rows - 1] + 1)
+
+    loaders: dict[str, Callable[[str], Any]] = {
+        "legacy": legacy_get_result_csv,
+        # ログ出力の負荷を除いて読み込み自体の時間を比べる
+        "columnar": reporter.get_result_csv.__wrapped__,  # type: ignore
+    }
+    results: dict[str, Any] = {"rows": len(columns)}
+
+    with tempfile.TemporaryDirectory() as record_dir_path:
+        file_path: str = os.path.join(record_dir_path, "bench_fastcom.csv")
+
+        with open(file_path, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(make_csv_header(False))
+            writer.writerows(columns.iter_csv_rows("bench"))
+
+        for name, loader in loaders.items():
+            started: float = time.perf_counter()
+            loader(file_path)
+            results[f"{name}_seconds"] = time.perf_counter() - started
+
+    return results
+
+
+def legacy_recording(f):
+    """呼び出し毎にシグネチャの取得と整形を行い INFO で記録する旧実装のデコレータ
+
+    Args:
+        f (Any): 関数
+
+    Returns:
+        Any: 結果
+    """
+
+    @functools.wraps(f)
+    def _recording(*args, **kwargs):
+        result = f(*args, **kwargs)
+        sig = inspect.signature(f)
+        bound_args = sig.bind(*args, **kwargs)
+        func_name = f.__name__
+        func_args = ",".join(
+            "{k}={v}".format(k=k, v=v) for k, v in bound_args.arguments.items()
+        )
+        fmt = "★ called {func_name}({func_args}) -> {result}"
+        msg = fmt.format(func_name=func_name, func_args=func_args, result=result)
+        logmng.logger.info(msg)
+        return result
+
+    return _recording
+
+
+def bench_trace(calls: int) -> dict[str, Any]:
+    """呼び出し記録のデコレータの 1 回当たりの負荷を比較する
+
+    ログは INFO 以上を /dev/null に書き出す設定で計測する。
+
+    Args:
+        calls (int): 呼び出し回数
+
+    Returns:
+        dict[str, Any]: 方式毎の 1 回当たりの時間 [ns]
+    """
+
+    bare: Callable[..., float] = utility.change_order.__wrapped__  # type: ignore
+
+    disabled = utility.recording(bare)
+    disabled.trace_setting.enabled = False  # type: ignore
+
+    functions: dict[str, Callable[..., float]] = {
+        "bare": bare,
+        "legacy": legacy_recording(bare),
+        "disabled": disabled,
+        "level_disabled": utility.recording(bare, level=logging.DEBUG),
+        "sampled_1_in_100": utility.recording(bare, sample_every=100),
+        "enabled": utility.recording(bare),
+    }
+    results: dict[str, Any] = {"calls": calls}
+
+    logger: logging.Logger = logmng.logger
+    saved: tuple[int, bool, list[logging.Handler]] = (
+        logger.level,
+        logger.propagate,
+        logger.handlers,
+    )
+
+    with open(os.devnull, mode="w", encoding="utf-8") as devnull:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(logging.Formatter(logmng.log_formatter))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.handlers = [handler]
+
+        try:
+            for name, function in functions.items():
+                started: float = time.perf_counter()
+
+                for _ in range(calls):
+                    function(123456789.0, utility.ValuePrefix.M)
+
+                results[f"{name}_ns_per_call"] = (
+                    (time.perf_counter() - started) / calls * 1e9
+                )
+        finally:
+            logger.setLevel(saved[0])
+            logger.propagate = saved[1]
+            logger.handlers = saved[2]
+
+    return results
+
+
+def write_sample_csv(file_path: str, rows: int) -> None:
+    """1 分間隔の計測結果を rows 行書いた計測データ記録ファイルを作成する
+
+    Args:
+        file_path (str): 計測データ記録ファイルパス
+        rows (int): 行数
+    """
+
+    columns: ResultColumns = make_sample_columns(
+        datetime(2022, 1, 1), rows // (24 * 60) + 1, 1
+    )
+    columns = columns.slice_by_time(0, columns.timestamps[rows - 1] + 1)
+
+    with open(file_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(make_csv_header(False))
+        writer.writerows(columns.iter_csv_rows("bench"))
+
+
+def get_peak_rss_mb(is_children: bool = False) -> float | None:
+    """最大 RSS を取得する
+
+    Args:
+        is_children (bool): 終了した子プロセス（ブラウザ）の最大 RSS を取得するフラグ
+
+    Returns:
+        float | None: 最大 RSS [MiB]、取得できない環境の場合は None
+    """
+
+    if resource is None:
+        return None
+
+    peak: int = resource.getrusage(
+        resource.RUSAGE_CHILDREN if is_children else resource.RUSAGE_SELF
+    ).ru_maxrss
+
+    # macOS は byte、その他は KiB で返す
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def get_children_cpu_seconds() -> float:
+    """終了した子プロセス（ブラウザ）の CPU 時間を取得する
+
+    Returns:
+        float: CPU 時間 [s]、取得できない環境の場合は 0
+    """
+
+    if resource is None:
+        return 0.0
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_suite_case(function: str, size: int, work_dir_path: str, url: str) -> dict:
+    """新しいプロセスの中で関数を 1 回実行し、所要時間と CPU 時間と最大 RSS を計測する
+
+    最大 RSS はプロセスの生涯での最大値の為、関数毎に spawn した子プロセスで実行する。
+
+    Args:
+        function (str): SUITE_FUNCTIONS の関数名
+        size (int): run_speedtest は転送量 [byte]、それ以外は計測データ記録ファイルの行数
+        work_dir_path (str): 入力ファイルを置いた作業ディレクトリパス
+        url (str): run_speedtest が計測するスタブサーバの URL
+
+    Returns:
+        dict: 計測結果
+    """
+
+    logmng.logger.disabled = True
+
+    csv_file_path: str = os.path.join(work_dir_path, f"{size}_fastcom.csv")
+    actions: dict[str, Callable[[], Any]] = {
+        "run_speedtest": lambda: speedtest.run_speedtest(False, 120, "", url),
+        "record_to_csv": lambda: [
+            recorder.record_to_csv(
+                os.path.join(work_dir_path, f"{size}_record_fastcom.csv"),
+                SpeedtestResult(
+                    tested_datetime=datetime(2022, 1, 1) + timedelta(minutes=index),
+                    download_speed=120e6,
+                    upload_speed=45e6,
+                    target="bench",
+                ),
+                False,
+            )
+            for index in range(size)
+        ],
+        "get_result_csv": lambda: reporter.get_result_csv(csv_file_path),
+        "make_network_speed_graph": lambda: reporter.make_network_speed_graph(
+            csv_file_path, os.path.join(work_dir_path, f"{size}_fastcom.html")
+        ),
+        "make_streaming_graph": lambda: reporter.make_streaming_graph(
+            csv_file_path, os.path.join(work_dir_path, f"{size}_stream_fastcom.html")
+        ),
+        "make_day_data": lambda: staticreport.make_day_data(
+            csv_file_path,
+            os.path.join(work_dir_path, f"{size}_fastcom.js"),
+            date(2022, 1, 1),
+        ),
+    }
+
+    cpu_started: float = time.process_time()
+    children_cpu_started: float = get_children_cpu_seconds()
+    started: float = time.perf_counter()
+
+    actions[function]()
+
+    return {
+        "function": function,
+        "size": size,
+        "wall_seconds": time.perf_counter() - started,
+        "cpu_seconds": time.process_time() - cpu_started,
+        "children_cpu_seconds": get_children_cpu_seconds() - children_cpu_started,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "children_peak_rss_mb": get_peak_rss_mb(is_children=True),
+    }
+
+
+def find_regressions(
+    results: list[dict], baseline: list[dict], tolerance: float
+) -> list[dict]:
+    """前回の計測結果より tolerance の割合を超えて悪化した項目を探す
+
+    Args:
+        results (list[dict]): 今回の計測結果
+        baseline (list[dict]): 前回の計測結果
+        tolerance (float): 許容する悪化の割合
+
+    Returns:
+        list[dict]: 悪化した項目（関数名、大きさ、指標、前回値、今回値）
+    """
+
+    previous: dict[tuple[str, int], dict] = {
+        (case["function"], case["size"]): case for case in baseline
+    }
+    regressions: list[dict] = []
+
+    for case in results:
+        before: dict | None = previous.get((case["function"], case["size"]))
+
+        if before is None:
+            continue
+
+        for metric in ("wall_seconds", "cpu_seconds", "peak_rss_mb"):
+            if not before.get(metric) or case[metric] is None:
+                continue
+
+            if case[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    {
+                        "function": case["function"],
+                        "size": case["size"],
+                        "metric": metric,
+                        "baseline": before[metric],
+                        "current": case[metric],
+                    }
+                )
+
+    return regressions
+
+
+def find_memory_growth(results: list[dict], tolerance: float) -> list[dict]:
+    """行数に依らず最大 RSS が一定となるべき関数で、最小の行数より tolerance の割合を超えて
+    最大 RSS が増えた大きさを探す
+
+    前回の計測結果が無くても判定できる為、CI でそのまま検知に使える。
+
+    Args:
+        results (list[dict]): 今回の計測結果
+        tolerance (float): 許容する増加の割合
+
+    Returns:
+        list[dict]: 増えた項目（関数名、大きさ、指標、最小の行数での値、今回値）
+    """
+
+    regressions: list[dict] = []
+
+    for function in SUITE_CONSTANT_MEMORY_FUNCTIONS:
+        cases: list[dict] = sorted(
+            (
+                case
+                for case in results
+                if case["function"] == function and case["peak_rss_mb"] is not None
+            ),
+            key=lambda case: case["size"],
+        )
+
+        for case in cases[1:]:
+            if case["peak_rss_mb"] > cases[0]["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(
+                    {
+                        "function": function,
+                        "size": case["size"],
+                        "metric": "peak_rss_mb",
+                        "baseline": cases[0]["peak_rss_mb"],
+                        "current": case["peak_rss_mb"],
+                    }
+                )
+
+    return regressions
+
+
+def bench_suite(
+    functions: list[str],
+    rows: list[int],
+    payload_bytes: list[int],
+    rate: float,
+    baseline_path: str,
+    tolerance: float,
+) -> dict[str, Any]:
+    """計測から記録、読み込み、グラフ作成までの関数を大きさ毎に計測する
+
+    run_speedtest はローカルのスタブサーバのページを計測し、ページは payload_bytes を
+    rate 以下の速度でダウンロード・アップロードし終えた時点で完了となる。
+    前回の計測結果との比較に加え、行数に依らず最大 RSS が一定となるべき関数の
+    最大 RSS の増加は前回の計測結果が無くても悪化した項目とする。
+
+    Args:
+        functions (list[str]): 計測する関数名
+        rows (list[int]): 計測データ記録ファイルの行数
+        payload_bytes (list[int]): run_speedtest の転送量 [byte]
+        rate (float): スタブサーバの転送速度の上限 [byte/s]
+        baseline_path (str): 比較する前回の計測結果の json ファイルパス、空文字の場合は比較しない
+        tolerance (float): 前回より悪化したとみなす割合
+
+    Returns:
+        dict[str, Any]: 実行環境、計測結果、悪化した項目
+    """
+
+    results: list[dict] = []
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as work_dir_path:
+        # Linux では子プロセスの最大 RSS が親プロセスの値から始まる為、
+        # 入力ファイルの作成も子プロセスで行い親プロセスのメモリを増やさない
+        with context.Pool(1) as pool:
+            for size in rows:
+                pool.apply(
+                    write_sample_csv,
+                    (os.path.join(work_dir_path, f"{size}_fastcom.csv"), size),
+                )
+
+        for function in functions:
+            sizes: list[int] = payload_bytes if function == "run_speedtest" else rows
+
+            for size in sizes:
+                # スタブサーバは計測対象に含めないよう、親プロセスで動かす
+                server = stubserver.StubServer(
+                    rate=rate, page=stubserver.make_stub_page(payload_bytes=size)
+                )
+
+                with server, context.Pool(1) as pool:
+                    results.append(
+                        pool.apply(
+                            run_suite_case,
+                            (function, size, work_dir_path, server.url),
+                        )
+                    )
+
+    regressions: list[dict] = find_memory_growth(results, tolerance)
+
+    if baseline_path:
+        with open(baseline_path, mode="r", encoding="utf-8") as f:
+            baseline: dict[str, Any] = json.load(f)
+
+        regressions += find_regressions(
+            results, baseline["suite"]["results"], tolerance
+        )
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+
+
+def parse_import_time(output: str) -> dict[str, float]:
+    """-X importtime の出力からモジュール毎の読み込み時間を取得する
+
+    Args:
+        output (str): -X importtime を指定したプロセスの標準エラー出力
+
+    Returns:
+        dict[str, float]: モジュール名毎の読み込み時間（依存先を含む）[ms]、
+                          最上位で読み込んだモジュールのみ名前の先頭に空白が無い
+    """
+
+    modules: dict[str, float] = {}
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.rstrip()[1:]] = int(cumulative) / 1000
+
+    return modules
+
+
+def bench_import_time(
+    commands: list[str], repeat: int, budget_ms: float
+) -> dict[str, Any]:
+    """サブコマンド毎の起動時のモジュールの読み込み時間を計測する
+
+    新しいプロセスで -X importtime を指定してサブコマンドのヘルプを表示させ、
+    オプション引数を組み立てるまでに読み込んだモジュールの時間を合計する。
+    repeat 回の最小値が budget_ms を超えるか、IMPORT_FORBIDDEN のモジュールを
+    読み込んだサブコマンドを regressions に出す。
+
+    Args:
+        commands (list[str]): 計測するサブコマンド
+        repeat (int): サブコマンド毎の計測回数
+        budget_ms (float): 読み込み時間の上限 [ms]
+
+    Returns:
+        dict[str, Any]: 計測結果
+    """
+
+    results: list[dict] = []
+    regressions: list[dict] = []
+
+    for command in commands:
+        runs: list[dict[str, float]] = []
+
+        for _ in range(max(1, repeat)):
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    "-X",
+                    "importtime",
+                    "-m",
+                    "speedtest_tool_fastcom.main",
+                    command,
+                    "--help",
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                check=True,
+            )
+            runs.append(parse_import_time(completed.stderr))
+
+        top_level: list[dict[str, float]] = [
+            {name: ms for name, ms in modules.items() if not name.startswith(" ")}
+            for modules in runs
+        ]
+        fastest: dict[str, float] = min(
+            top_level, key=lambda modules: sum(modules.values())
+        )
+        import_ms: float = sum(fastest.values())
+        heavy_modules: list[str] = sorted(
+            {
+                name.strip().split(".")[0]
+                for name in runs[0]
+                if name.strip().split(".")[0] in IMPORT_FORBIDDEN.get(command, ())
+            }
+        )
+
+        results.append(
+            {
+                "command": command,
+                "import_ms": import_ms,
+                "module_count": len(runs[0]),
+                "slowest": sorted(fastest.items(), key=lambda item: -item[1])[:5],
+                "heavy_modules": heavy_modules,
+            }
+        )
+
+        if import_ms > budget_ms:
+            regressions.append(
+                {"command": command, "import_ms": import_ms, "budget_ms": budget_ms}
+            )
+
+        if heavy_modules:
+            regressions.append({"command": command, "heavy_modules": heavy_modules})
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+
+
+def bench_quick(rate: float, repeat: int, max_test_mb: float) -> dict[str, Any]:
+    """途中で止める計測の転送量・時間と、通常の計測との速度の差を比べる
+
+    ローカルのスタブサーバ（速度上限 rate）に対し、ブラウザを使わずに
+    通常の計測、--quick、--max_test_mb の順に repeat 回ずつ計測する。
+
+    Args:
+        rate (float): スタブサーバの速度上限 [byte/s]
+        repeat (int): 方式毎の計測回数
+        max_test_mb (float): 1 回の計測の転送量の上限 [MB]
+
+    Returns:
+        dict[str, Any]: 方式毎の平均の所要時間、転送量、速度と、通常の計測に対する速度の差の割合
+    """
+
+    rules: dict[str, datacap.StopRule | None] = {
+        "full": None,
+        "quick": datacap.StopRule(is_quick=True),
+        "capped": datacap.StopRule(max_test_mb=max_test_mb),
+    }
+    results: dict[str, Any] = {"rate": rate, "repeat": repeat}
+
+    with stubserver.StubServer(rate=rate) as server:
+        for name, rule in rules.items():
+            runs: list[dict[str, float]] = []
+
+            for _ in range(max(1, repeat)):
+                started: float = time.perf_counter()
+                result: dict[
+                    str, float | str
+                ] = asyncio.get_event_loop().run_until_complete(
+                    httpengine.get_network_info(
+                        speedtest.DEFAULT_TIMEOUT,
+                        "",
+                        base_url=server.url,
+                        api_url=server.api_url,
+                        stop_rule=rule,
+                    )
+                )
+                runs.append(
+                    {
+                        "seconds": time.perf_counter() - started,
+                        "transferred_mb": float(result["downloaded"])
+                        + float(result["uploaded"]),
+                        "download_mbps": float(result["download_speed"]),
+                        "upload_mbps": float(result["upload_speed"]),
+                    }
+                )
+
+            results[name] = {
+                key: sum(run[key] for run in runs) / len(runs) for key in runs[0]
+            }
+
+    for name in ("quick", "capped"):
+        for key in ("download_mbps", "upload_mbps"):
+            results[name][f"{key}_error"] = (
+                results[name][key] / results["full"][key] - 1
+                if results["full"][key] > 0
+                else None
+            )
+
+    return results
+
+
+def parse_int_list(value: str) -> list[int]:
+    """カンマ区切りの整数のオプション引数を解釈する
+
+    Args:
+        value (str): カンマ区切りの整数
+
+    Returns:
+        list[int]: 整数のリスト
+    """
+
+    return [int(item) for item in value.split(",") if item]
+
+
+def get_option() -> Namespace:
+    """オプション引数
+
+    :return: オプション引数の名前空間
+    :rtype: Namespace
+    """
+    argparser = ArgumentParser()
+    argparser.add_argument(
+        "case",
+        type=str,
+        choices=[
+            "cdp",
+            "completion",
+            "storage",
+            "csvload",
+            "trace",
+            "suite",
+            "importtime",
+            "quick",
+        ],
+        help="benchmark case",
+    )
+    argparser.add_argument(
+        "-n",
+        "--polls",
+        type=int,
+        default=50,
+        help="number of polls for cdp case",
+    )
+    argparser.add_argument(
+        "--done_ms",
+        type=int,
+        default=3000,
+        help="time until the stub page completes for completion case",
+    )
+    argparser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="number of days of generated data for storage case",
+    )
+    argparser.add_argument(
+        "--targets",
+        type=int,
+        default=4,
+        help="number of targets of generated data for storage case",
+    )
+    argparser.add_argument(
+        "--interval_minutes",
+        type=int,
+        default=1,
+        help="interval minutes of generated data for storage case",
+    )
+    argparser.add_argument(
+        "--rows",
+        type=int,
+        default=100000,
+        help="number of rows of generated csv for csvload case",
+    )
+    argparser.add_argument(
+        "--calls",
+        type=int,
+        default=100000,
+        help="number of calls for trace case",
+    )
+    argparser.add_argument(
+        "--functions",
+        type=lambda value: [item for item in value.split(",") if item],
+        default=list(SUITE_FUNCTIONS),
+        help="comma separated functions measured in suite case",
+    )
+    argparser.add_argument(
+        "--sizes",
+        type=parse_int_list,
+        default=parse_int_list(SUITE_ROWS),
+        help="comma separated csv row counts for suite case",
+    )
+    argparser.add_argument(
+        "--payload_bytes",
+        type=parse_int_list,
+        default=parse_int_list(SUITE_PAYLOAD_BYTES),
+        help="comma separated bytes transferred by run_speedtest in suite case",
+    )
+    argparser.add_argument(
+        "--rate",
+        type=float,
+        default=SUITE_RATE,
+        help="bytes per second served by the stub server in suite case",
+    )
+    argparser.add_argument(
+        "--baseline",
+        type=str,
+        default="",
+        help="previous json output of suite case to compare with",
+    )
+    argparser.add_argument(
+        "--tolerance",
+        type=float,
+        default=SUITE_TOLERANCE,
+        help="ratio of slowdown reported as a regression in suite case",
+    )
+    argparser.add_argument(
+        "--commands",
+        type=lambda value: [item for item in value.split(",") if item],
+        default=["measure", "upload"],
+        help="comma separated subcommands measured in importtime case",
+    )
+    argparser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of runs per subcommand in importtime case (the fastest is used) "
+        "and per mode in quick case",
+    )
+    argparser.add_argument(
+        "--max_test_mb",
+        type=float,
+        default=100,
+        help="megabytes one measurement may transfer in the capped mode of quick case",
+    )
+    argparser.add_argument(
+        "--budget_ms",
+        type=float,
+        default=IMPORT_BUDGET_MS,
+        help="import time limit per subcommand in importtime case",
+    )
+    argparser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="",
+        help="also write the json results to this file",
+    )
+    return argparser.parse_args()
+
+
+def main() -> None:
+    """
+    ベンチマークを実行し、結果を JSON で標準出力に出す。
+    """
+
+    args: Namespace = get_option()
+
+    results: dict[str, Any] = {}
+
+    if args.case == "cdp":
+        results = asyncio.get_event_loop().run_until_complete(
+            bench_cdp_messages_per_poll(args.polls)
+        )
+    elif args.case == "completion":
+        results = asyncio.get_event_loop().run_until_complete(
+            bench_completion(args.done_ms)
+        )
+    elif args.case == "storage":
+        results = bench_storage_read(args.days, args.targets, args.interval_minutes)
+    elif args.case == "csvload":
+        results = bench_csv_load(args.rows)
+    elif args.case == "trace":
+        results = bench_trace(args.calls)
+    elif args.case == "suite":
+        results = bench_suite(
+            args.functions,
+            args.sizes,
+            args.payload_bytes,
+            args.rate,
+            args.baseline,
+            args.tolerance,
+        )
+    elif args.case == "importtime":
+        results = bench_import_time(args.commands, args.repeat, args.budget_ms)
+    elif args.case == "quick":
+        results = bench_quick(args.rate, args.repeat, args.max_test_mb)
+
+    output: str = json.dumps({args.case: results}, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    # 前回より悪化した項目が有れば CI で検知できるよう異常終了する
+    if results.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+import pytest
+
+from tests.stubserver import StubServer
+
+# スタブサーバの 1 接続当たりの速度上限 [byte/s]、計測の安定と所要時間の釣り合いを取る
+STUB_RATE: float = 8 * 1024 * 1024
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubServer]:
+    """Fast.com と計測先を模したスタブサーバを起動する
+
+    Yields:
+        Iterator[StubServer]: 待ち受け中のスタブサーバ
+    """
+
+    with StubServer(rate=STUB_RATE) as server:
+        yield server
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from speedtest_tool_fastcom.module import logmng
+
+# スタブサーバがトークンとして返す文字列
+STUB_TOKEN: str = "stubtoken"
+
+# ダウンロードで返す本文の元になる塊 [byte]
+STUB_PAYLOAD: bytes = bytes(range(256)) * 256
+
+# Fast.com の計測結果表示部分と同じ id を持つスタブページ
+STUB_PAGE_TEMPLATE: str = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>fast.com stub</title></head>
+<body>
+<div id="speed-value" class="speed-results-container">{download_speed}</div>
+<div id="speed-units">Mbps</div>
+<div id="down-mb-value">{downloaded}</div>
+<div id="upload-value">{upload_speed}</div>
+<div id="upload-units">Mbps</div>
+<div id="up-mb-value">{uploaded}</div>
+<div id="latency-value">{latency}</div>
+<div id="bufferbloat-value">{buffer_bloat}</div>
+<div id="user-location">Tokyo, JP</div>
+<div id="user-ip">192.0.2.1</div>
+<script src="/app-stub.js"></script>
+<script>
+function markDone(selector, delay) {{
+    setTimeout(() => {{
+        document.querySelector(selector).classList.add("succeeded");
+    }}, delay);
+}}
+function transfer(method, body) {{
+    return new Promise((resolve) => {{
+        const xhr = new XMLHttpRequest();
+        xhr.open(method, "/speedtest/range/0-{last_byte}");
+        xhr.onloadend = resolve;
+        xhr.send(body);
+    }});
+}}
+if ({payload_bytes} > 0) {{
+    transfer("GET", null)
+        .then(() => markDone("#speed-value", 0))
+        .then(() => transfer("POST", new Uint8Array({payload_bytes})))
+        .then(() => markDone("#upload-value", 0));
+}} else {{
+    markDone("#speed-value", {download_done_ms});
+    markDone("#upload-value", {upload_done_ms});
+}}
+</script>
+</body>
+</html>
+"""
+
+
+def make_stub_page(
+    download_speed: float = 120.0,
+    upload_speed: float = 45.0,
+    latency: float = 8.0,
+    buffer_bloat: float = 24.0,
+    downloaded: float = 250.0,
+    uploaded: float = 90.0,
+    download_done_ms: int = 0,
+    upload_done_ms: int = 0,
+    payload_bytes: int = 0,
+) -> str:
+    """Fast.com の DOM を模したスタブページの html を作成する
+
+    payload_bytes を指定した場合は時間ではなく、StubServer から payload_bytes を
+    ダウンロードし終えた時点でダウンロード、同じ量をアップロードし終えた時点で
+    アップロードの計測完了とする。
+
+    Args:
+        download_speed (float): ダウンロード速度 [Mbps]
+        upload_speed (float): アップロード速度 [Mbps]
+        latency (float): 遅延 [ms]
+        buffer_bloat (float): バッファブロート [ms]
+        downloaded (float): ダウンロードサイズ [MB]
+        uploaded (float): アップロードサイズ [MB]
+        download_done_ms (int): ダウンロード計測完了（.succeeded 付与）までの時間 [ms]
+        upload_done_ms (int): アップロード計測完了（.succeeded 付与）までの時間 [ms]
+        payload_bytes (int): 計測完了までに転送する量 [byte]、0 の場合は転送しない
+
+    Returns:
+        str: スタブページの html
+    """
+
+    return STUB_PAGE_TEMPLATE.format(
+        download_speed=download_speed,
+        upload_speed=upload_speed,
+        latency=latency,
+        buffer_bloat=buffer_bloat,
+        downloaded=downloaded,
+        uploaded=uploaded,
+        download_done_ms=download_done_ms,
+        upload_done_ms=upload_done_ms,
+        payload_bytes=payload_bytes,
+        last_byte=max(payload_bytes - 1, 0),
+    )
+
+
+class StubServer:
+    """Fast.com と計測先を模した HTTP サーバを別スレッドのイベントループで動かす
+
+    下記に応答し、Keep-Alive で同じ接続の複数のリクエストを受け付ける。
+
+    - ``/``: page、省略時は make_stub_page のスタブページ
+    - ``/app-stub.js``: トークンを含むスクリプト
+    - ``/netflix/speedtest/v2``: 自身の ``/speedtest`` を計測先とする API の応答
+    - ``/speedtest/range/0-<n>``: GET は n + 1 byte を返し、POST は本文を読み捨てる
+      （range_status が 200 以外の場合、GET はその状態コードのエラーページを返す）
+
+    Args:
+        host (str): 待ち受けるアドレス
+        port (int): 待ち受けるポート、0 の場合は空いているポート
+        rate (float): ダウンロード・アップロードの速度の上限 [byte/s]、0 の場合は制限しない
+        page (str | None): ``/`` で返す html
+        token (str): スクリプトに含めるトークン、空文字の場合はトークンを含めない
+        range_status (int): 計測先のダウンロードの応答の状態コード
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        rate: float = 0,
+        page: str | None = None,
+        token: str = STUB_TOKEN,
+        range_status: int = 200,
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.rate: float = rate
+        self.page: str = make_stub_page() if page is None else page
+        self.token: str = token
+        self.range_status: int = range_status
+        self.requests: int = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="stub-server", daemon=True
+        )
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        """スタブサーバのトップページの URL"""
+
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def api_url(self) -> str:
+        """スタブサーバの計測先 URL を払い出す API の URL"""
+
+        return f"http://{self.host}:{self.port}/netflix/speedtest/v2"
+
+    def start(self) -> StubServer:
+        """待ち受けを始める
+
+        Returns:
+            StubServer: 自身
+        """
+
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle, self.host, self.port),
+            self._loop,
+        ).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+
+        return self
+
+    def stop(self) -> None:
+        """待ち受けを止めてスレッドを終了する"""
+
+        async def close() -> None:
+            if self._server is not None:
+                self._server.close()
+
+            # 接続中のハンドラを止めてからイベントループを止める
+            handlers: list[asyncio.Task] = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+
+            for task in handlers:
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self) -> StubServer:
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line: bytes = await reader.readline()
+
+                if not request_line:
+                    break
+
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+
+                while True:
+                    line: bytes = await reader.readline()
+
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                await self._respond(
+                    method, urlsplit(target).path, headers, reader, writer
+                )
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.CancelledError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        if method == "POST":
+            remaining: int = int(headers.get("content-length", "0"))
+
+            while remaining > 0:
+                chunk: bytes = await reader.read(min(65536, remaining))
+
+                if not chunk:
+                    raise ConnectionError
+                remaining -= len(chunk)
+                await self._throttle(len(chunk))
+
+            await self._write(writer, "text/plain", b"")
+        elif path == "/":
+            await self._write(writer, "text/html", self.page.encode("utf-8"))
+        elif path == "/app-stub.js":
+            script: str = (
+                f'var config={{token:"{self.token}",urlCount:5}};'
+                if self.token
+                else "var config={urlCount:5};"
+            )
+            await self._write(writer, "application/javascript", script.encode("utf-8"))
+        elif path == "/netflix/speedtest/v2":
+            body: dict = {
+                "client": {
+                    "ip": "192.0.2.1",
+                    "location": {"city": "Tokyo", "country": "JP"},
+                },
+                "targets": [
+                    {"url": f"http://{self.host}:{self.port}/speedtest?n={index}"}
+                    for index in range(5)
+                ],
+            }
+            await self._write(
+                writer, "application/json", json.dumps(body).encode("utf-8")
+            )
+        elif path.startswith("/speedtest/range/0-") and self.range_status != 200:
+            # プロキシや計測先のエラーページを模し、本文は転送量より大きくする
+            await self._write(
+                writer, "text/html", STUB_PAYLOAD, status=self.range_status
+            )
+        elif path.startswith("/speedtest/range/0-"):
+            size: int = int(path.rsplit("-", 1)[1]) + 1
+            writer.write(self._head("application/octet-stream", size))
+
+            while size > 0:
+                chunk = STUB_PAYLOAD[: min(len(STUB_PAYLOAD), size)]
+                writer.write(chunk)
+                await writer.drain()
+                size -= len(chunk)
+                await self._throttle(len(chunk))
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+
+    async def _throttle(self, size: int) -> None:
+        # 転送した量に応じて待ち、速度を rate 以下に抑える
+        if self.rate > 0:
+            await asyncio.sleep(size / self.rate)
+
+    @staticmethod
+    def _head(content_type: str, content_length: int, status: int = 200) -> bytes:
+        return (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {content_length}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+    async def _write(
+        self,
+        writer: asyncio.StreamWriter,
+        content_type: str,
+        body: bytes,
+        status: int = 200,
+    ) -> None:
+        writer.write(self._head(content_type, len(body), status) + body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    logmng.logger.info(f"{__file__} はモジュールをインポートして使ってください。")
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from speedtest_tool_fastcom.module import datacap, httpengine, utility, watchdog
+from speedtest_tool_fastcom.module.result import PhaseTimings
+from tests.stubserver import StubServer
+
+# テストでのダウンロード・アップロードそれぞれの計測時間 [s]
+DURATION: float = 2.0
+
+
+def measure(server: StubServer, **kwargs) -> dict[str, float | str]:
+    """スタブサーバに対して get_network_info で計測する"""
+
+    options: dict = {
+        "base_url": server.url,
+        "api_url": server.api_url,
+        "duration": DURATION,
+        **kwargs,
+    }
+
+    return asyncio.run(httpengine.get_network_info(60, "", **options))
+
+
+def test_result_shape(stub_server: StubServer) -> None:
+    """ブラウザでの計測と同じキーと単位で、スタブの地域と IP を返す"""
+
+    timings = PhaseTimings()
+    result = measure(stub_server, timings=timings)
+
+    assert set(result) == {
+        "download_speed",
+        "download_units",
+        "downloaded",
+        "upload_speed",
+        "upload_units",
+        "uploaded",
+        "latency",
+        "buffer_bloat",
+        "user_location",
+        "user_ip",
+    }
+    assert result["download_units"] == result["upload_units"] == "Mbps"
+    assert float(result["download_speed"]) > 0
+    assert float(result["upload_speed"]) > 0
+    assert float(result["downloaded"]) > 0
+    assert float(result["uploaded"]) > 0
+    assert result["user_location"] == "Tokyo, JP"
+    assert result["user_ip"] == "192.0.2.1"
+    assert timings.navigation is not None
+    assert timings.download_done is not None and timings.upload_done is not None
+
+
+def test_max_test_mb_caps_transfer(stub_server: StubServer) -> None:
+    """1 回の計測の転送量が上限に収まる（ダウンロードは接続毎に読み書きの単位 1 つ分まで超えうる）"""
+
+    max_test_mb: float = 4
+    result = measure(stub_server, stop_rule=datacap.StopRule(max_test_mb=max_test_mb))
+    overshoot_mb: float = (
+        httpengine.DEFAULT_CONNECTIONS
+        * httpengine.CHUNK_SIZE
+        / 10**utility.ValuePrefix.M.value
+    )
+
+    assert 0 < float(result["uploaded"]) <= max_test_mb / 2 + overshoot_mb
+    assert (
+        float(result["downloaded"]) + float(result["uploaded"])
+        <= max_test_mb + overshoot_mb
+    )
+    assert float(result["upload_speed"]) > 0
+
+
+def test_quick_stops_before_duration(stub_server: StubServer) -> None:
+    """スループットが安定すると計測時間を待たずに止め、速度は通常の計測と大きく変わらない"""
+
+    duration: float = 10
+    full = measure(stub_server, duration=duration)
+
+    started: float = time.perf_counter()
+    quick = measure(
+        stub_server, duration=duration, stop_rule=datacap.StopRule(is_quick=True)
+    )
+    elapsed: float = time.perf_counter() - started
+
+    assert elapsed < 2 * duration - 2
+    assert float(quick["downloaded"]) < float(full["downloaded"])
+    for key in ("download_speed", "upload_speed"):
+        assert float(quick[key]) == pytest.approx(float(full[key]), rel=0.25)
+
+
+def test_bad_status_from_api(stub_server: StubServer) -> None:
+    """計測先を払い出す API がエラーを返すと計測先の取得段階の失敗になる"""
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            httpengine.get_targets("", 1, stub_server.url, stub_server.url + "missing")
+        )
+
+    with pytest.raises(watchdog.PhaseError) as error:
+        measure(stub_server, api_url=stub_server.url + "missing")
+
+    assert error.value.phase == "navigation"
+
+
+@pytest.mark.parametrize("status", [403, 404, 502])
+def test_bad_status_from_target(status: int) -> None:
+    """計測先がエラーを返すと、エラーページの転送量を速度に数えずダウンロード段階の失敗になる"""
+
+    with StubServer(range_status=status) as server:
+        with pytest.raises(watchdog.PhaseError) as error:
+            measure(server)
+
+    assert error.value.phase == "download"
+    assert str(status) in error.value.reason
+
+
+def test_missing_token() -> None:
+    """スクリプトにトークンが無いと計測先の取得段階の失敗になる"""
+
+    with StubServer(token="") as server:
+        with pytest.raises(ValueError):
+            asyncio.run(httpengine.get_targets("", 1, server.url, server.api_url))
+
+        with pytest.raises(watchdog.PhaseError) as error:
+            measure(server)
+
+    assert error.value.phase == "navigation"
+    assert "トークン" in error.value.reason
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# サブコマンド毎に起動時に読み込んではいけない重いモジュール
+FORBIDDEN_MODULES: dict[str, tuple[str, ...]] = {
+    "measure": ("bokeh", "numpy", "pyppeteer"),
+    "report": ("pyppeteer",),
+    "upload": ("bokeh", "numpy", "pyppeteer"),
+}
+
+# 子プロセスをリポジトリのルートで実行し、パッケージとして読み込めるようにする
+REPO_DIR_PATH: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# サブコマンドのヘルプを表示させた後に読み込み済みの最上位のパッケージ名を出力する
+MODULES_SCRIPT: str = """
+import runpy
+import sys
+
+sys.argv = ["speedtest_tool_fastcom", sys.argv[1], "--help"]
+
+try:
+    runpy.run_module("speedtest_tool_fastcom.main", run_name="__main__")
+except SystemExit:
+    pass
+
+print(" ".join(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+@pytest.mark.parametrize("command", sorted(FORBIDDEN_MODULES))
+def test_startup_skips_heavy_modules(command: str) -> None:
+    """サブコマンドはオプション引数を組み立てるまでに不要な重いモジュールを読み込まない"""
+
+    if (
+        "bokeh" not in FORBIDDEN_MODULES[command]
+        and subprocess.run(
+            [sys.executable, "-c", "import bokeh.plotting"], stderr=subprocess.DEVNULL
+        ).returncode
+    ):
+        pytest.skip("bokeh を読み込めません。")
+
+    completed = subprocess.run(
+        [sys.executable, "-c", MODULES_SCRIPT, command],
+        cwd=REPO_DIR_PATH,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    assert completed.returncode == 0, completed.stderr
+
+    loaded: set[str] = set(completed.stdout.splitlines()[-1].split())
+
+    assert not loaded & set(FORBIDDEN_MODULES[command])
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import csv
+import os
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any
+
+import pytest
+
+from speedtest_tool_fastcom.module.result import (
+    NUMERIC_COLUMNS,
+    ResultColumns,
+    make_csv_header,
+)
+
+pytest.importorskip("resource")
+
+# 試験する計測データ記録ファイルの行数、逐次読み込みの 1 度の行数を跨ぐ大きさにする
+SIZES: tuple[int, ...] = (2000, 50000)
+
+# 行数を増やした時に許す最大 RSS の増加 [MiB]
+RSS_MARGIN_MB: float = 16
+
+# 子プロセスをリポジトリのルートで実行し、パッケージとして読み込めるようにする
+REPO_DIR_PATH: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WRITE_SCRIPT: str = """
+import sys
+from tests import benchmark
+
+benchmark.write_sample_csv(sys.argv[1], int(sys.argv[2]))
+"""
+
+GRAPH_SCRIPT: str = """
+import sys
+from tests import benchmark
+from speedtest_tool_fastcom.module import logmng, reporter
+
+logmng.logger.disabled = True
+reporter.make_streaming_graph(sys.argv[1], sys.argv[2])
+print(benchmark.get_peak_rss_mb())
+"""
+
+
+def run_python(script: str, *args: str) -> str:
+    """新しいプロセスで script を実行し、標準出力を返す"""
+
+    completed = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        cwd=REPO_DIR_PATH,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    assert completed.returncode == 0, completed.stderr
+
+    return completed.stdout
+
+
+def test_streaming_graph_peak_rss(tmp_path) -> None:
+    """make_streaming_graph の最大 RSS は計測データ記録ファイルの行数に依らず一定となる"""
+
+    if subprocess.run(
+        [sys.executable, "-c", "import bokeh.plotting"], stderr=subprocess.DEVNULL
+    ).returncode:
+        pytest.skip("bokeh を読み込めません。")
+
+    peaks: list[float] = []
+
+    # 入力ファイルの作成と計測は別プロセスで行い、最大 RSS に他の処理を含めない
+    for size in SIZES:
+        csv_file_path: str = str(tmp_path / "2022-01-01_fastcom.csv")
+        run_python(WRITE_SCRIPT, csv_file_path, str(size))
+        peaks.append(
+            float(
+                run_python(
+                    GRAPH_SCRIPT, csv_file_path, str(tmp_path / f"{size}_fastcom.html")
+                )
+            )
+        )
+
+    assert peaks[-1] <= peaks[0] + RSS_MARGIN_MB
+
+
+def import_reporter() -> Any:
+    """reporter を読み込む（bokeh を読み込めない環境では試験を飛ばす）"""
+
+    try:
+        from speedtest_tool_fastcom.module import reporter
+    except (ImportError, AttributeError) as e:
+        pytest.skip(f"bokeh を読み込めません。 >> {e}")
+
+    return reporter
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_downsample_range_per_target(tmp_path, method: str) -> None:
+    """期間のレポートは計測対象毎に間引き、別の経路の値が混ざらない"""
+
+    reporter = import_reporter()
+    speeds: dict[str, float] = {"home": 100.0, "vpn": 10.0}
+
+    with open(
+        tmp_path / "2022-01-01_fastcom.csv", mode="w", newline="", encoding="utf-8"
+    ) as f:
+        writer = csv.writer(f)
+        writer.writerow(make_csv_header(False))
+
+        # 計測対象を交互に記録する
+        for minute in range(0, 24 * 60, 10):
+            for target, speed in speeds.items():
+                columns = ResultColumns()
+                columns.append(
+                    int((datetime(2022, 1, 1) + timedelta(minutes=minute)).timestamp()),
+                    tuple(speed for _ in NUMERIC_COLUMNS),
+                )
+                writer.writerows(columns.iter_csv_rows(target))
+
+    sampled: dict = reporter.downsample_range(
+        str(tmp_path), date(2022, 1, 1), date(2022, 1, 1), 50, method
+    )
+
+    assert list(sampled) == list(speeds)
+    for target, speed in speeds.items():
+        values: dict[str, list[float]] = sampled[target]["download_speed"]
+
+        assert values["x"]
+        for key in ("min", "max", "mean"):
+            assert set(values.get(key, [speed])) == {speed}
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Iterator
+
+import pytest
+
+from speedtest_tool_fastcom.module import datacap, speedtest, watchdog
+from tests.stubserver import StubServer, make_stub_page
+
+pyppeteer = pytest.importorskip("pyppeteer")
+
+# 計測完了の検知に許す遅れ [s]、旧実装の 5 秒毎のポーリングより十分短くする
+MAX_DETECTION_LAG: float = 1.0
+
+
+@pytest.fixture(scope="module")
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    """ブラウザと同じイベントループで試験する為、モジュールで 1 つのイベントループを使う"""
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def browser(loop: asyncio.AbstractEventLoop) -> Iterator[Any]:
+    """ダウンロード済みの Chromium を起動する（無ければ試験を飛ばす）"""
+
+    from pyppeteer import chromium_downloader
+
+    if not chromium_downloader.check_chromium():
+        pytest.skip("Chromium がダウンロードされていません。")
+
+    try:
+        browser = loop.run_until_complete(speedtest.launch_browser(""))
+    except watchdog.PhaseError as e:
+        pytest.skip(f"Chromium を起動できません。 >> {e}")
+
+    yield browser
+    loop.run_until_complete(watchdog.close_browser(browser))
+
+
+def test_wait_for_done_detects_completion(
+    loop: asyncio.AbstractEventLoop, browser: Any
+) -> None:
+    """スタブページが計測完了となってから、ポーリングの間隔を待たずに検知する"""
+
+    done_ms: int = 300
+
+    async def wait() -> tuple[float, dict[str, Any]]:
+        page = await browser.newPage()
+
+        try:
+            await page.setContent(
+                make_stub_page(download_done_ms=done_ms // 2, upload_done_ms=done_ms)
+            )
+            started: float = time.perf_counter()
+            snapshot: dict[str, Any] = await speedtest.wait_for_done(page, 10)
+
+            return time.perf_counter() - started, snapshot
+        finally:
+            await page.close()
+
+    elapsed, snapshot = loop.run_until_complete(wait())
+
+    assert snapshot["is_done"]
+    assert elapsed < done_ms / 1000 + MAX_DETECTION_LAG
+
+
+def test_measure_on_browser(loop: asyncio.AbstractEventLoop, browser: Any) -> None:
+    """スタブページの表示値を計測結果として取得する"""
+
+    page: str = make_stub_page(download_done_ms=100, upload_done_ms=200)
+
+    with StubServer(page=page) as server:
+        started: float = time.perf_counter()
+        result = loop.run_until_complete(
+            speedtest.measure_on_browser(browser, 10, url=server.url)
+        )
+
+    assert time.perf_counter() - started < 5
+    assert result["download_speed"] == 120.0
+    assert result["upload_speed"] == 45.0
+    assert result["user_location"] == "Tokyo, JP"
+    assert "is_done" not in result
+
+
+def test_measure_on_browser_timeout(
+    loop: asyncio.AbstractEventLoop, browser: Any
+) -> None:
+    """計測が完了しないページでは、計測全体のタイムアウトで打ち切る"""
+
+    page: str = make_stub_page(download_done_ms=60000, upload_done_ms=60000)
+
+    with StubServer(page=page) as server:
+        started: float = time.perf_counter()
+
+        with pytest.raises(watchdog.PhaseTimeoutError) as error:
+            loop.run_until_complete(
+                speedtest.measure_on_browser(browser, 1, url=server.url)
+            )
+
+    assert error.value.phase == "total"
+    assert time.perf_counter() - started < 1 + watchdog.CLOSE_TIMEOUT
+
+
+def test_wait_for_stop_during_upload(
+    loop: asyncio.AbstractEventLoop, browser: Any
+) -> None:
+    """--quick ではダウンロードの完了を待ち、アップロード速度が安定した時点で止める"""
+
+    download_done_ms: int = 1000
+
+    async def wait() -> tuple[float, dict[str, Any]]:
+        page = await browser.newPage()
+
+        try:
+            await page.setContent(
+                make_stub_page(download_done_ms=download_done_ms, upload_done_ms=60000)
+            )
+            started: float = time.perf_counter()
+            snapshot: dict[str, Any] = await speedtest.wait_for_stop(
+                page, datacap.StopRule(is_quick=True)
+            )
+
+            return time.perf_counter() - started, snapshot
+        finally:
+            await page.close()
+
+    elapsed, snapshot = loop.run_until_complete(wait())
+
+    assert snapshot["is_download_done"] and not snapshot["is_done"]
+    assert snapshot["download_speed"] == 120.0
+    assert snapshot["upload_speed"] == 45.0
+    assert elapsed >= download_done_ms / 1000
+    assert (
+        elapsed
+        < download_done_ms / 1000 + datacap.MIN_QUICK_DURATION + MAX_DETECTION_LAG + 1
+    )
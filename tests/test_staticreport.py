@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import csv
+import json
+from datetime import date
+
+from speedtest_tool_fastcom.module import staticreport
+from speedtest_tool_fastcom.module.result import make_csv_header
+
+
+def test_make_day_data_groups_targets(tmp_path) -> None:
+    """データファイルは計測対象毎に列をまとめ、古いスキーマの行は計測対象を空文字とする"""
+
+    csv_file_path = tmp_path / "2022-01-01_fastcom.csv"
+    data_path = tmp_path / "2022-01-01_fastcom.js"
+
+    with open(csv_file_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(make_csv_header(False))
+        writer.writerows(
+            [
+                ["2022-01-01 00:00:10", "100", "40"],
+                ["2022-01-01 00:01:00", "101", "41", "home", "8", "20"] + [""] * 4,
+                ["2022-01-01 00:02:00", "300", "90", "office", "5", "9"] + [""] * 4,
+                ["2022-01-01 00:03:00", "102", "42", "home", "8", "21"] + [""] * 4,
+            ]
+        )
+
+    staticreport.make_day_data(str(csv_file_path), str(data_path), date(2022, 1, 1))
+
+    content: str = data_path.read_text(encoding="utf-8")
+    prefix: str = "fastcomViewer.addDay("
+    data: dict = json.loads(content[len(prefix) : content.rindex(")")])
+
+    assert data["version"] == staticreport.DATA_VERSION
+    assert [target["target"] for target in data["targets"]] == ["", "home", "office"]
+    assert data["targets"][1]["seconds"] == [60, 180]
+    assert data["targets"][1]["download_speed"] == [101.0, 102.0]
+    assert data["targets"][2]["buffer_bloat"] == [9.0]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+from array import array
+from datetime import datetime, timedelta
+
+import pytest
+
+from speedtest_tool_fastcom.module import storage
+from speedtest_tool_fastcom.module.result import (
+    NUMERIC_COLUMNS,
+    ResultColumns,
+    SpeedtestResult,
+)
+
+# 試験する計測結果の先頭の計測日時
+START: datetime = datetime(2022, 1, 1)
+
+
+def make_columns(first: int, count: int) -> ResultColumns:
+    """1 分間隔で、全ての数値の列が行番号となる計測結果を作成する"""
+
+    columns = ResultColumns()
+
+    for index in range(first, first + count):
+        columns.append(
+            int((START + timedelta(minutes=index)).timestamp()),
+            tuple(float(index) for _ in NUMERIC_COLUMNS),
+        )
+
+    return columns
+
+
+@pytest.mark.parametrize("kind", storage.STORAGE_KINDS)
+def test_read_returns_written_results(tmp_path, kind: str) -> None:
+    """保存形式に依らず、保存した計測結果を計測対象毎に期間で絞り込んで読み込める"""
+
+    record_storage: storage.Storage = storage.open_storage(kind, str(tmp_path), False)
+
+    # 月と日を跨ぐよう、前日の深夜から 2 つの計測対象を交互に保存する
+    for index in range(6):
+        record_storage.write(
+            SpeedtestResult(
+                tested_datetime=datetime(2022, 1, 31, 23, 57)
+                + timedelta(minutes=index),
+                download_speed=(index + 1) * 1e6,
+                upload_speed=0.5e6,
+                target=("home", "vpn")[index % 2],
+                latency=float(index),
+            )
+        )
+
+    results: dict[str, ResultColumns] = record_storage.read(
+        datetime(2022, 1, 31, 23, 58), datetime(2022, 2, 2)
+    )
+
+    assert sorted(results) == ["home", "vpn"]
+    assert list(results["home"].columns["download_speed"]) == [3.0, 5.0]
+    assert list(results["vpn"].columns["download_speed"]) == [2.0, 4.0, 6.0]
+    assert list(results["vpn"].columns["latency"]) == [1.0, 3.0, 5.0]
+    assert list(results["vpn"].columns["upload_speed"]) == [0.5, 0.5, 0.5]
+
+
+def test_columnar_realigns_after_interrupted_write(tmp_path) -> None:
+    """中断された書き込みで列の長さが揃っていなくても、続く追記の行がずれない"""
+
+    columnar = storage.ColumnarStorage(str(tmp_path))
+    columnar.write_columns("target", make_columns(0, 3))
+
+    # 計測日時と最初の数値の列だけ書いた所で中断された書き込みを再現する
+    partition_path: str = columnar.get_partition_path("target", START)
+    for name, typecode, value in (
+        (columnar.TIMESTAMP_COLUMN, "q", 0),
+        (NUMERIC_COLUMNS[0], "d", -1.0),
+    ):
+        with open(os.path.join(partition_path, f"{name}.bin"), mode="ab") as f:
+            array(typecode, [value]).tofile(f)
+            f.write(b"\0\0")
+
+    columnar.write_columns("target", make_columns(3, 2))
+
+    columns: ResultColumns = columnar.read(START, START + timedelta(days=1))["target"]
+
+    assert list(columns.timestamps) == list(make_columns(0, 5).timestamps)
+    for name in NUMERIC_COLUMNS:
+        assert list(columns.columns[name]) == [0.0, 1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+
+from speedtest_tool_fastcom.module import utility
+
+
+@pytest.fixture(autouse=True)
+def isolated_tracing(monkeypatch: pytest.MonkeyPatch) -> None:
+    """他の試験やモジュールの登録済みの設定を変えないよう、設定を空にして試験する"""
+
+    monkeypatch.setattr(utility, "trace_settings", {})
+    monkeypatch.setattr(utility, "trace_overrides", [])
+
+
+def test_set_tracing_applies_to_later_functions() -> None:
+    """後から読み込まれたモジュールの関数にも、先に指定した設定を適用する"""
+
+    utility.set_tracing(sample_every=10)
+    utility.set_tracing("make_report", enabled=False)
+
+    @utility.recording
+    def make_report() -> None:
+        pass
+
+    @utility.recording
+    def make_day_data() -> None:
+        pass
+
+    assert not make_report.trace_setting.enabled
+    assert make_report.trace_setting.sample_every == 10
+    assert make_day_data.trace_setting.enabled
+    assert make_day_data.trace_setting.sample_every == 10
+
+
+def test_warn_unmatched_tracing(caplog: pytest.LogCaptureFixture) -> None:
+    """登録された関数に一致しない関数名を警告する"""
+
+    @utility.recording
+    def make_report() -> None:
+        pass
+
+    utility.set_tracing("make_report", enabled=False)
+    utility.set_tracing("make_reprot", enabled=False)
+
+    utility.warn_unmatched_tracing()
+
+    warnings: list[str] = [
+        record.getMessage()
+        for record in caplog.records
+        if record.levelno == logging.WARNING
+    ]
+
+    assert len(warnings) == 1
+    assert "make_reprot" in warnings[0]
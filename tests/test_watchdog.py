@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from speedtest_tool_fastcom.module import watchdog
+
+# 子プロセスをリポジトリのルートで実行し、パッケージとして読み込めるようにする
+REPO_DIR_PATH: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ロックを取得したことを知らせてから、終了させられるまで持ち続ける
+HOLD_SCRIPT: str = """
+import sys
+from speedtest_tool_fastcom.module import watchdog
+
+run_lock = watchdog.RunLock(sys.argv[1])
+run_lock.acquire()
+print("locked", flush=True)
+sys.stdin.read()
+"""
+
+
+def test_run_lock_survives_killed_owner(tmp_path) -> None:
+    """ロックを持つプロセスが動いている間は取得できず、強制終了されると取得できる"""
+
+    lock_path: str = str(tmp_path / watchdog.LOCK_FILE_NAME)
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLD_SCRIPT, lock_path],
+        cwd=REPO_DIR_PATH,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    try:
+        assert holder.stdout.readline().strip() == "locked"  # type: ignore
+
+        with pytest.raises(watchdog.AlreadyRunningError) as error:
+            watchdog.RunLock(lock_path).acquire()
+
+        assert error.value.owner_pid == holder.pid
+    finally:
+        holder.kill()
+        holder.wait()
+
+    # 異常終了したプロセスのロックファイルが残っていても取得でき、同時には 1 つしか取れない
+    with watchdog.RunLock(lock_path) as run_lock:
+        assert run_lock.is_locked
+
+        with pytest.raises(watchdog.AlreadyRunningError):
+            watchdog.RunLock(lock_path).acquire()
+
+    with watchdog.RunLock(lock_path) as run_lock:
+        assert run_lock.is_locked